@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+# ATTENTION: Do not import the ev3dev.ev3 module in this file.
+"""Time the main operations of `Planet` on generated planets of growing size.
+
+Run as ``python3 benchmark.py --output results.json`` to keep the
+results for comparison with later runs.
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+from time import perf_counter
+from typing import Callable, Iterable, Optional, TextIO
+
+from planet import PathEngine, Planet
+from planet_generator import SyntheticPlanet, generate_planet
+
+# The operations timed, in the order reported.
+OPERATIONS = (
+    "add_path", "shortest_path", "next_direction", "exploration_completed",
+)
+
+
+def _time(calls: Iterable[Callable[[], object]]) -> tuple[int, float]:
+    """Call all `calls`, return their number and the total seconds taken."""
+    count = 0
+    total = 0.0
+    for call in calls:
+        started = perf_counter()
+        call()
+        total += perf_counter() - started
+        count += 1
+    return count, total
+
+
+def _result(count: int, total: float) -> dict[str, float]:
+    """Return the JSON result of `count` calls taking `total` seconds."""
+    return {
+        "calls": count,
+        "total_seconds": total,
+        "per_call_seconds": total / count if count else 0.0,
+    }
+
+
+def benchmark_planet(
+    synthetic: SyntheticPlanet,
+    engine: PathEngine,
+    queries: int,
+    seed: int,
+) -> dict[str, dict[str, float]]:
+    """Time the operations once on `synthetic`, see `run`."""
+    planet = Planet()
+    planet.engine = engine
+    results = {}
+    results["add_path"] = _result(*_time(
+        lambda path=path: planet.add_path(*path) for path in synthetic.paths
+    ))
+    for node, directions in synthetic.node_directions.items():
+        planet.set_available_node_directions(node, directions)
+
+    # The robot only ever stands on scanned nodes.
+    rng = random.Random(seed)
+    starts = sorted(synthetic.node_directions)
+    nodes = synthetic.nodes
+    pairs = [(rng.choice(starts), rng.choice(nodes)) for _ in range(queries)]
+    results["shortest_path"] = _result(*_time(
+        lambda start=start, target=target: planet.shortest_path(start, target)
+        for start, target in pairs
+    ))
+    results["next_direction"] = _result(*_time(
+        lambda start=start: planet.next_direction(start) for start, _ in pairs
+    ))
+    results["exploration_completed"] = _result(*_time(
+        lambda start=start: planet.exploration_completed(start)
+        for start, _ in pairs
+    ))
+    return results
+
+
+def run(
+    sizes: Iterable[int],
+    seed: int = 0,
+    repeat: int = 1,
+    queries: int = 10,
+    engine: PathEngine = PathEngine.HEAP,
+) -> dict:
+    """Time the operations on a generated planet of each of the `sizes`.
+
+    All paths of the planet are added, then the queries are each called
+    with `queries` random scanned start nodes (and target nodes).  Of
+    `repeat` runs the fastest is reported for each operation.  Returns a
+    `dict` ready for `json.dump`.
+    """
+    results = []
+    for size in sizes:
+        synthetic = generate_planet(size, seed)
+        best: dict[str, dict[str, float]] = {}
+        for _ in range(repeat):
+            timings = benchmark_planet(synthetic, engine, queries, seed)
+            for operation, timing in timings.items():
+                if (
+                    operation not in best
+                    or timing["total_seconds"] < best[operation]["total_seconds"]
+                ):
+                    best[operation] = timing
+        results.append({
+            "nodes": len(synthetic.nodes),
+            "paths": len(synthetic.paths),
+            "operations": {operation: best[operation] for operation in OPERATIONS},
+        })
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "engine": engine.value,
+        "seed": seed,
+        "repeat": repeat,
+        "queries": queries,
+        "results": results,
+    }
+
+
+def _print_table(report: dict, file: TextIO) -> None:
+    """Print the microseconds per call of each operation and size."""
+    print("nodes".rjust(8), *(name.rjust(22) for name in OPERATIONS), file=file)
+    for result in report["results"]:
+        print(
+            str(result["nodes"]).rjust(8),
+            *(
+                f"{result['operations'][name]['per_call_seconds'] * 1e6:19.1f} µs"
+                for name in OPERATIONS
+            ),
+            file=file,
+        )
+
+
+def main(arguments: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000],
+        help="numbers of nodes of the planets",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="runs per planet, fastest counts",
+    )
+    parser.add_argument(
+        "--queries", type=int, default=10, help="calls of each query per run",
+    )
+    parser.add_argument(
+        "--engine", choices=[engine.value for engine in PathEngine],
+        default=PathEngine.HEAP.value,
+        help="path engine (scan takes quadratic time on large planets)",
+    )
+    parser.add_argument(
+        "--output", help="write the results as JSON to this file",
+    )
+    options = parser.parse_args(arguments)
+    report = run(
+        options.sizes,
+        seed=options.seed,
+        repeat=options.repeat,
+        queries=options.queries,
+        engine=PathEngine(options.engine),
+    )
+    _print_table(report, sys.stdout)
+    if options.output:
+        with open(options.output, "w") as file:
+            json.dump(report, file, indent=2)
+            file.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@
 import ssl
 from collections.abc import Callable, Mapping
 from dataclasses import dataclass, asdict
+from functools import cached_property
 from json import dumps, loads
 from logging import Logger
 from typing import Any, Final, Union
@@ -74,6 +75,11 @@ class StartCoordinatesRecord:
     startX: int
     startY: int
 
+    @cached_property
+    def start_node(self) -> tuple[int, int]:
+        """The starting coordinates as node, built once per record."""
+        return (self.startX, self.startY)
+
 
 @FrozenDataClass
 class DirectionRecord:
@@ -94,6 +100,11 @@ class EndRecord:
     endY: int
     endDirection: Direction
 
+    @cached_property
+    def end_node(self) -> tuple[int, int]:
+        """The ending coordinates as node, built once per record."""
+        return (self.endX, self.endY)
+
 
 @FrozenDataClass
 class PlanetRecord(StartCoordinatesRecord):
@@ -127,6 +138,11 @@ class TargetRecord:
     targetX: int
     targetY: int
 
+    @cached_property
+    def target_node(self) -> tuple[int, int]:
+        """The target coordinates as node, built once per record."""
+        return (self.targetX, self.targetY)
+
 
 # The payload record types corresponding to the message types received
 # from the server.
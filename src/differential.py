@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+
+# ATTENTION: Do not import the ev3dev.ev3 module in this file.
+"""Compare the path engines of `Planet` against the scan engine.
+
+Run as ``python3 differential.py --cases 200`` to check all engines on
+random planets; mismatches are reported with the smallest planet still
+showing them.
+"""
+import argparse
+import dataclasses
+import random
+import sys
+from typing import Callable, Optional
+
+from planet import CompactPlanet, Direction, PathEngine, Planet, Weight
+from planet_generator import SyntheticPlanet, generate_planet
+
+# A node no path leads to, to check queries with unknown nodes.
+_UNKNOWN_NODE = (-1, -1)
+
+
+def _planet(
+    engine: PathEngine,
+    planet_class: type = Planet,
+    hierarchy_min_nodes: Optional[int] = None,
+) -> Callable[[], Planet]:
+    """Return a function creating empty planets using `engine`."""
+    def make_planet() -> Planet:
+        planet = planet_class()
+        planet.engine = engine
+        planet.hierarchy_min_nodes = hierarchy_min_nodes
+        return planet
+    return make_planet
+
+
+# The planets the results are taken as correct of.
+reference_planet: Callable[[], Planet] = _planet(PathEngine.SCAN)
+
+# The planets checked, by name.
+VARIANTS: dict[str, Callable[[], Planet]] = {
+    **{
+        engine.value: _planet(engine)
+        for engine in PathEngine if engine is not PathEngine.SCAN
+    },
+    **{
+        f"compact-{engine.value}": _planet(engine, CompactPlanet)
+        for engine in PathEngine
+    },
+    # Contraction hierarchy, used for all planets completely explored.
+    "hierarchy": _planet(PathEngine.SCAN, hierarchy_min_nodes=0),
+}
+
+
+class _Checker:
+    """Checks the answers of a planet against those of the reference."""
+
+    __slots__ = ("reference", "planet", "paths", "_exploration_weights")
+
+    def __init__(self, reference: Planet, planet: Planet) -> None:
+        self.reference = reference
+        self.planet = planet
+        self.paths = reference.get_paths()
+        self._exploration_weights: dict[tuple[int, int], Optional[Weight]] = {}
+
+    def path_weight(
+        self,
+        path: Optional[list[tuple[tuple[int, int], Direction]]],
+        start: tuple[int, int],
+        is_end: Callable[[tuple[int, int]], bool],
+    ) -> Optional[Weight]:
+        """Return the weight of `path`, raise `AssertionError` if invalid.
+
+        `path` has to lead over free paths from `start` to a node
+        accepted by `is_end`.
+        """
+        if path is None:
+            return None
+        weight = 0
+        node = start
+        for path_node, direction in path:
+            if path_node != node:
+                raise AssertionError(f"{path} does not continue at {node}")
+            try:
+                node, _, path_weight = self.paths[node][direction]
+            except KeyError:
+                raise AssertionError(f"{path} takes unknown paths") from None
+            if path_weight < 0:
+                raise AssertionError(f"{path} takes blocked paths")
+            weight += path_weight
+        if not is_end(node):
+            raise AssertionError(f"{path} ends at wrong node {node}")
+        return weight
+
+    def target_weight(
+        self,
+        start: tuple[int, int],
+        target: tuple[int, int],
+    ) -> Optional[Weight]:
+        """Return the weight of the shortest path of the reference."""
+        return self.path_weight(
+            self.reference.shortest_path(start, target), start, target.__eq__,
+        )
+
+    def exploration_weight(self, start: tuple[int, int]) -> Optional[Weight]:
+        """Return the weight of the path to explore of the reference."""
+        try:
+            return self._exploration_weights[start]
+        except KeyError:
+            pass
+        weight = self.path_weight(
+            self.reference._shortest_path(start),
+            start,
+            self.reference.frontier.__contains__,
+        )
+        self._exploration_weights[start] = weight
+        return weight
+
+    def check_shortest_path(
+        self,
+        start: tuple[int, int],
+        target: tuple[int, int],
+    ) -> None:
+        """Check the path from `start` to `target`."""
+        expected = self.reference.shortest_path(start, target)
+        path = self.planet.shortest_path(start, target)
+        if (path is None, path == []) != (expected is None, expected == []):
+            raise AssertionError(f"{path} instead of {expected}")
+        weight = self.path_weight(path, start, target.__eq__)
+        if weight != self.target_weight(start, target):
+            raise AssertionError(f"{path} is longer than {expected}")
+
+    def check_exploration(self, start: tuple[int, int]) -> None:
+        """Check the path from `start` to the next unexplored node."""
+        path = self.planet._shortest_path(start)
+        weight = self.path_weight(
+            path, start, self.reference.frontier.__contains__,
+        )
+        if weight != self.exploration_weight(start):
+            raise AssertionError(
+                f"{path} instead of {self.reference._shortest_path(start)}"
+            )
+
+    def check_next_direction(
+        self,
+        start: tuple[int, int],
+        target: Optional[tuple[int, int]],
+    ) -> None:
+        """Check that the direction from `start` starts a shortest path.
+
+        Only whether there is a direction at all is compared for the
+        random choices at nodes not completely explored.
+        """
+        expected = self.reference.next_direction(start, target)
+        direction = self.planet.next_direction(start, target)
+        if (direction is None) != (expected is None):
+            raise AssertionError(f"{direction} instead of {expected}")
+        if direction is None or direction not in self.paths.get(start, {}):
+            if direction is not None and (
+                direction not in self.reference.unexplored_directions(start)
+            ):
+                raise AssertionError(f"{direction} is neither known nor unexplored")
+            return
+
+        neighbor, _, weight = self.paths[start][direction]
+        if weight < 0:
+            raise AssertionError(f"{direction} is blocked")
+        weight_from = (
+            self.exploration_weight if target is None
+            else lambda node: self.target_weight(node, target)
+        )
+        if target is not None and weight_from(start) is None:
+            # Heads for exploring instead.
+            weight_from = self.exploration_weight
+        rest = weight_from(neighbor)
+        if rest is None or weight + rest != weight_from(start):
+            raise AssertionError(
+                f"{direction} does not start a shortest path like {expected}"
+            )
+
+    def check(self, starts: list[tuple[int, int]], targets: list) -> None:
+        """Check all queries from the `starts` to the `targets`."""
+        for start in starts:
+            self.check_exploration(start)
+            self.check_next_direction(start, None)
+            for target in targets:
+                self.check_shortest_path(start, target)
+                self.check_next_direction(start, target)
+
+
+def find_mismatch(
+    synthetic: SyntheticPlanet,
+    make_planet: Callable[[], Planet],
+) -> Optional[str]:
+    """Return how the planets of `make_planet` differ, `None` if not.
+
+    Both the planet and the reference are built from `synthetic`.  The
+    queries are compared from all scanned nodes to all nodes and an
+    unknown one: the weights of `Planet.shortest_path` (which may choose
+    another of several shortest paths), `None` and `[]` answers, paths
+    to explore and whether `Planet.next_direction` heads along a
+    shortest path.
+    """
+    reference = synthetic.build(reference_planet())
+    planet = synthetic.build(make_planet())
+    checker = _Checker(reference, planet)
+    starts = sorted(synthetic.node_directions)
+    targets = [*synthetic.nodes, _UNKNOWN_NODE]
+    try:
+        checker.check(starts, targets)
+    except Exception as error:
+        return f"{type(error).__name__}: {error}"
+    return None
+
+
+def shrink(
+    synthetic: SyntheticPlanet,
+    make_planet: Callable[[], Planet],
+) -> SyntheticPlanet:
+    """Return a planet as small as possible still showing a mismatch.
+
+    Removes ever smaller chunks of the paths and then of the scanned
+    nodes of `synthetic` while `find_mismatch` still finds one (delta
+    debugging), until no single one can be removed anymore.
+    """
+    def shrunk(items: list, replace: Callable[[list], SyntheticPlanet]) -> list:
+        chunk_size = max(len(items) // 2, 1)
+        while items:
+            removed = False
+            for first in range(len(items) - chunk_size, -1, -chunk_size):
+                candidate = items[:first] + items[first + chunk_size:]
+                if find_mismatch(replace(candidate), make_planet) is not None:
+                    items = candidate
+                    removed = True
+            if not removed:
+                if chunk_size == 1:
+                    break
+                chunk_size = max(chunk_size // 2, 1)
+        return items
+
+    paths = shrunk(
+        synthetic.paths,
+        lambda paths: dataclasses.replace(synthetic, paths=paths),
+    )
+    synthetic = dataclasses.replace(synthetic, paths=paths)
+    nodes = shrunk(
+        sorted(synthetic.node_directions),
+        lambda nodes: dataclasses.replace(
+            synthetic,
+            node_directions={
+                node: synthetic.node_directions[node] for node in nodes
+            },
+        ),
+    )
+    return dataclasses.replace(
+        synthetic,
+        node_directions={node: synthetic.node_directions[node] for node in nodes},
+    )
+
+
+def random_case(rng: random.Random, max_nodes: int) -> SyntheticPlanet:
+    """Return a random planet of at most `max_nodes` nodes."""
+    return generate_planet(
+        rng.randint(1, max_nodes),
+        seed=rng.getrandbits(32),
+        loop_share=rng.choice((0.0, 0.3, 1.0)),
+        self_loop_share=rng.choice((0.0, 0.1)),
+        blocked_share=rng.choice((0.0, 0.2)),
+        explored_share=rng.choice((0.5, 1.0)),
+    )
+
+
+def run(
+    cases: int,
+    max_nodes: int = 30,
+    seed: int = 0,
+    variants: Optional[dict[str, Callable[[], Planet]]] = None,
+) -> dict[str, tuple[SyntheticPlanet, str]]:
+    """Check the `variants` (all by default) on `cases` random planets.
+
+    Returns the shrunk planet and the mismatch of the first failing
+    case of each variant.
+    """
+    if variants is None:
+        variants = VARIANTS
+    rng = random.Random(seed)
+    failures = {}
+    for _ in range(cases):
+        synthetic = random_case(rng, max_nodes)
+        for name, make_planet in variants.items():
+            if name in failures:
+                continue
+            if find_mismatch(synthetic, make_planet) is not None:
+                synthetic_shrunk = shrink(synthetic, make_planet)
+                failures[name] = (
+                    synthetic_shrunk,
+                    find_mismatch(synthetic_shrunk, make_planet),
+                )
+    return failures
+
+
+def format_case(synthetic: SyntheticPlanet) -> str:
+    """Return the calls building the planet `synthetic`."""
+    lines = [
+        f"planet.add_path({start}, {end}, {weight})"
+        for start, end, weight in synthetic.paths
+    ]
+    lines.extend(
+        f"planet.set_available_node_directions({node}, "
+        f"{sorted(directions) or 'set()'})"
+        for node, directions in sorted(synthetic.node_directions.items())
+    )
+    return "\n".join(lines)
+
+
+def main(arguments: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=100)
+    parser.add_argument(
+        "--nodes", type=int, default=30, help="maximum number of nodes",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--variant", choices=list(VARIANTS), action="append",
+        help="variant to check, may be repeated (all by default)",
+    )
+    options = parser.parse_args(arguments)
+    variants = VARIANTS if options.variant is None else {
+        name: VARIANTS[name] for name in options.variant
+    }
+    failures = run(options.cases, options.nodes, options.seed, variants)
+    for name in variants:
+        if name not in failures:
+            print(f"{name}: same as {PathEngine.SCAN.value}")
+            continue
+        synthetic, mismatch = failures[name]
+        print(f"{name}: {mismatch}")
+        print(format_case(synthetic))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
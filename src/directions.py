@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+# ATTENTION: Do not import the ev3dev.ev3 module in this file.
+"""The directions on the planet and precomputed tables to calculate with them.
+
+All functions return `Direction` members and only look up tables built
+on import.  Sets of directions can be given as 4 bit masks, the bit of
+each direction being `DIRECTION_BITS[direction]` (`1 << direction // 90`,
+like the slots of `planet.CompactPaths`).
+"""
+from enum import IntEnum, unique
+from typing import Iterable
+
+
+@unique
+class Direction(IntEnum):
+    """The orientations on the planet set by the mother ship."""
+    NORTH = 0
+    EAST = 90
+    SOUTH = 180
+    WEST = 270
+
+
+# The bit of each direction in direction masks.
+DIRECTION_BITS: dict[Direction, int] = {
+    direction: 1 << direction // 90 for direction in Direction
+}
+# The change of the coordinates when going one grid step in each
+# direction.
+DIRECTION_STEPS: dict[Direction, tuple[int, int]] = {
+    Direction.NORTH: (0, 1),
+    Direction.EAST: (1, 0),
+    Direction.SOUTH: (0, -1),
+    Direction.WEST: (-1, 0),
+}
+# All directions of each direction mask.
+_MASK_DIRECTIONS: tuple[frozenset[Direction], ...] = tuple(
+    frozenset(
+        direction for direction, bit in DIRECTION_BITS.items() if mask & bit
+    )
+    for mask in range(1 << len(Direction))
+)
+# The directions of each direction mask in the order of `Direction`.
+_ORDERED_MASK_DIRECTIONS: tuple[tuple[Direction, ...], ...] = tuple(
+    tuple(
+        direction for direction in Direction if mask & DIRECTION_BITS[direction]
+    )
+    for mask in range(1 << len(Direction))
+)
+# The direction reached by turning each direction clockwise by each angle.
+_ROTATIONS: dict[Direction, dict[int, Direction]] = {
+    direction: {
+        angle: Direction((direction + angle) % 360) for angle in Direction
+    }
+    for direction in Direction
+}
+# Each direction mask turned clockwise by each angle.
+_MASK_ROTATIONS: dict[int, tuple[int, ...]] = {
+    angle: tuple(
+        sum(
+            DIRECTION_BITS[_ROTATIONS[direction][angle]]
+            for direction in _MASK_DIRECTIONS[mask]
+        )
+        for mask in range(1 << len(Direction))
+    )
+    for angle in Direction
+}
+# The clockwise angle from each direction to each other one.
+_TURNS: dict[Direction, dict[Direction, Direction]] = {
+    direction: {
+        other: Direction((other - direction) % 360) for other in Direction
+    }
+    for direction in Direction
+}
+
+
+def opposite(direction: Direction) -> Direction:
+    """Return the opposite direction of `direction`."""
+    return _ROTATIONS[direction][Direction.SOUTH]
+
+
+def rotate(direction: Direction, angle: int) -> Direction:
+    """Return `direction` turned clockwise by `angle`, a multiple of 90°."""
+    return _ROTATIONS[direction][angle % 360]
+
+
+def turn(direction: Direction, other: Direction) -> Direction:
+    """Return the clockwise angle to turn by from `direction` to `other`.
+
+    Given as the direction reached when turning from north like that.
+    """
+    return _TURNS[direction][other]
+
+
+def round_direction(angle: float) -> Direction:
+    """Return the direction nearest to `angle` in degrees (clockwise)."""
+    return Direction(round(angle / 90) % 4 * 90)
+
+
+def neighbor_node(node: tuple[int, int], direction: Direction) -> tuple[int, int]:
+    """Return the node one grid step from `node` in `direction`."""
+    dx, dy = DIRECTION_STEPS[direction]
+    return (node[0] + dx, node[1] + dy)
+
+
+def direction_mask(directions: Iterable[Direction]) -> int:
+    """Return the direction mask of `directions`."""
+    mask = 0
+    for direction in directions:
+        mask |= DIRECTION_BITS[direction]
+    return mask
+
+
+def mask_directions(mask: int) -> frozenset[Direction]:
+    """Return the directions in the direction `mask`."""
+    return _MASK_DIRECTIONS[mask]
+
+
+def ordered_mask_directions(mask: int) -> tuple[Direction, ...]:
+    """Return the directions in the direction `mask` in their order."""
+    return _ORDERED_MASK_DIRECTIONS[mask]
+
+
+def rotate_mask(mask: int, angle: int) -> int:
+    """Return the direction `mask` turned clockwise by `angle`."""
+    return _MASK_ROTATIONS[angle % 360][mask]
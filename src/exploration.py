@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+
+# ATTENTION: Do not import the ev3dev.ev3 module in this file.
+from collections.abc import Iterable, Sequence
+from math import inf
+from time import process_time
+from typing import Optional
+
+from directions import neighbor_node
+from planet import Direction, Planet, Weight, grid_distance
+
+
+class ExplorationPlanner:
+    """Plans the order in which to explore the frontier of a planet.
+
+    Instead of always heading for the nearest unexplored node like
+    `Planet.next_direction`, all reachable frontier nodes are ordered to
+    a tour starting at the current node.  The tour is built by nearest
+    neighbor construction and improved by 2-opt and Or-opt moves as long
+    as the CPU time budget allows.  Between calls, the tour is kept and
+    only adapted to the changed frontier.  Each step needs the shortest
+    paths from another node, so on large planets the budget may already
+    run out while building the tour; the nodes left are then visited in
+    the order of their distance from the current node.
+
+    While a target is known but not reachable yet, exploration can
+    instead head for the target, see `towards_target`.
+
+    When exploring together with other robots, `assigned` can be set to
+    the frontier nodes assigned to this robot (see `assign_frontier`),
+    only these are planned while any of them is left.
+    """
+
+    __slots__ = (
+        "planet", "time_budget", "target_directed", "assigned", "_tour",
+    )
+
+    def __init__(
+        self,
+        planet: Planet,
+        time_budget: float = 0.05,
+        target_directed: bool = True,
+    ) -> None:
+        """Plan the exploration of `planet`.
+
+        `time_budget` is the CPU time in seconds each planning may spend
+        on improving the tour.  If `target_directed` is set, unreachable
+        targets are explored towards instead of following the tour.
+        """
+        self.planet = planet
+        self.time_budget = time_budget
+        self.target_directed = target_directed
+        self.assigned: Optional[set[tuple[int, int]]] = None
+        # The frontier nodes in the order to visit them.
+        self._tour: list[tuple[int, int]] = []
+
+    def copy(self, planet: Planet) -> "ExplorationPlanner":
+        """Return a planner for `planet` with the same settings and tour.
+
+        Used to plan ahead on a copy of the planet (see `Planet.copy`),
+        see `adopt`.
+        """
+        explorer = ExplorationPlanner(
+            planet, self.time_budget, self.target_directed,
+        )
+        explorer.assigned = self.assigned
+        explorer._tour = list(self._tour)
+        return explorer
+
+    def adopt(self, other: "ExplorationPlanner") -> None:
+        """Continue with the tour planned by the copy `other`."""
+        self._tour = list(other._tour)
+
+    def next_direction(
+        self,
+        start: tuple[int, int],
+        target: Optional[tuple[int, int]] = None,
+        heading: Optional[Direction] = None,
+    ) -> Optional[Direction]:
+        """Return the next direction to head for from `start`.
+
+        Same as `Planet.next_direction`, but exploration follows the
+        planned tour.
+        """
+        planet = self.planet
+        if target is not None:
+            shortest_path = planet.route(start, target, heading)
+            if shortest_path is not None:
+                # Either `[]` as `target` is reached, or the way to it.
+                return shortest_path[0][1] if shortest_path else None
+            if self.target_directed:
+                return self.towards_target(start, target)
+
+        if start in planet.frontier:
+            # Explore the current node first.
+            return planet.next_direction(start, heading=heading)
+
+        tour = self.plan(start)
+        if not tour:
+            # Exploration completed.
+            return None
+        return planet.route(start, tour[0], heading)[0][1]
+
+    def towards_target(
+        self,
+        start: tuple[int, int],
+        target: tuple[int, int],
+    ) -> Optional[Direction]:
+        """Return the direction to explore from `start` to reach `target`.
+
+        Heads for the frontier node with the lowest weight of the path to
+        it plus the estimated weight left from it to `target`
+        (`Planet.heuristic`).  The latter never decreases by more than
+        the weight of a path, so unexplored directions of `start` itself
+        always come first; the one leading closest to `target` is chosen.
+        Returns `None` if no frontier node is reachable.
+        """
+        planet = self.planet
+        if start in planet.frontier:
+            return min(
+                planet.unexplored_directions(start),
+                key=lambda direction: grid_distance(
+                    neighbor_node(start, direction), target,
+                ),
+            )
+
+        best_node = None
+        best_weight = inf
+        # In the order the nodes were reached for deterministic ties.
+        for node, (weight, _, _) in planet.distances_from(start).items():
+            if node in planet.frontier:
+                weight += planet.heuristic(node, target)
+                if weight < best_weight:
+                    best_node = node
+                    best_weight = weight
+        if best_node is None:
+            return None
+        return planet.shortest_path(start, best_node)[0][1]
+
+    def plan(self, start: tuple[int, int]) -> list[tuple[int, int]]:
+        """Return the order to visit all frontier nodes reachable from `start`.
+
+        Takes about `time_budget` seconds of CPU time at most, apart from
+        a single search for the nodes reachable from `start`.
+        """
+        deadline = process_time() + self.time_budget
+        reachable = self.planet.distances_from(start)
+        frontier = {node for node in self.planet.frontier if node in reachable}
+        if self.assigned is not None and not frontier.isdisjoint(self.assigned):
+            # Help the other robots only when done.
+            frontier &= self.assigned
+        # Keep the order of the previous tour for the remaining nodes and
+        # insert the new ones where they cost least.
+        tour = [node for node in self._tour if node in frontier]
+        if tour:
+            # In the order the nodes were reached for deterministic ties.
+            in_tour = set(tour)
+            new_nodes = [
+                node for node in reachable
+                if node in frontier and node not in in_tour
+            ]
+            for index, node in enumerate(new_nodes):
+                if process_time() >= deadline:
+                    # Out of time, visit the rest last.
+                    tour.extend(new_nodes[index:])
+                    break
+                self._insert(start, tour, node, deadline)
+        else:
+            tour = self._nearest_neighbor_tour(
+                start, frontier, reachable, deadline,
+            )
+
+        while process_time() < deadline and (
+            self._two_opt(start, tour, deadline)
+            or self._or_opt(start, tour, deadline)
+        ):
+            pass
+
+        self._tour = tour
+        return list(tour)
+
+    def tour_weight(
+        self,
+        start: tuple[int, int],
+        tour: list[tuple[int, int]],
+    ) -> Weight:
+        """Return the weight of driving from `start` along `tour`."""
+        return sum(
+            self._distance(node, next_node)
+            for node, next_node in zip([start] + tour, tour)
+        )
+
+    def _distance(self, node: tuple[int, int], other: tuple[int, int]) -> Weight:
+        """Return the weight of the shortest path between two nodes."""
+        return self.planet.distances_from(node).get(other, (inf,))[0]
+
+    def _nearest_neighbor_tour(
+        self,
+        start: tuple[int, int],
+        frontier: set[tuple[int, int]],
+        reachable: Iterable[tuple[int, int]],
+        deadline: float,
+    ) -> list[tuple[int, int]]:
+        """Return a tour always continuing with the nearest node left.
+
+        `reachable` are the nodes in the order of their distance from
+        `start`, the nodes left at the `deadline` follow in this order.
+        """
+        tour = []
+        node = start
+        left = set(frontier)
+        while left:
+            if process_time() >= deadline:
+                tour.extend(node for node in reachable if node in left)
+                break
+            distances = self.planet.distances_from(node)
+            # Visit the nodes in the order they are settled for
+            # deterministic ties.
+            node = next(
+                (other for other in distances if other in left),
+                None,
+            )
+            if node is None:
+                # Paths are known in both directions, so this only
+                # happens on inconsistent maps.
+                tour.extend(left)
+                break
+            tour.append(node)
+            left.remove(node)
+        return tour
+
+    def _insert(
+        self,
+        start: tuple[int, int],
+        tour: list[tuple[int, int]],
+        node: tuple[int, int],
+        deadline: float,
+    ) -> None:
+        """Insert `node` into `tour` where it adds the least weight.
+
+        Only the places checked until the `deadline` are considered.
+        """
+        distance = self._distance
+        best_index = len(tour)
+        best_weight = distance(tour[-1], node)
+        for index, next_node in enumerate(tour):
+            if process_time() >= deadline:
+                break
+            previous = tour[index - 1] if index else start
+            weight = (
+                distance(previous, node)
+                + distance(node, next_node)
+                - distance(previous, next_node)
+            )
+            if weight < best_weight:
+                best_index = index
+                best_weight = weight
+        tour.insert(best_index, node)
+
+    def _two_opt(
+        self,
+        start: tuple[int, int],
+        tour: list[tuple[int, int]],
+        deadline: float,
+    ) -> bool:
+        """Reverse the first part of `tour` found to shorten it.
+
+        Returns whether `tour` was improved.
+        """
+        distance = self._distance
+        for i in range(len(tour) - 1):
+            previous = tour[i - 1] if i else start
+            for j in range(i + 1, len(tour)):
+                # Reverse `tour[i:j + 1]`, so `previous` is followed by
+                # `tour[j]` and `tour[i]` by the node after `tour[j]`.
+                weight = distance(previous, tour[j]) - distance(previous, tour[i])
+                if j + 1 < len(tour):
+                    weight += (
+                        distance(tour[i], tour[j + 1])
+                        - distance(tour[j], tour[j + 1])
+                    )
+                if weight < 0:
+                    tour[i:j + 1] = reversed(tour[i:j + 1])
+                    return True
+                if process_time() >= deadline:
+                    return False
+        return False
+
+    def _or_opt(
+        self,
+        start: tuple[int, int],
+        tour: list[tuple[int, int]],
+        deadline: float,
+    ) -> bool:
+        """Move the first segment of up to three nodes found to shorten `tour`.
+
+        Returns whether `tour` was improved.
+        """
+        distance = self._distance
+        for length in (1, 2, 3):
+            for i in range(len(tour) - length + 1):
+                first, last = tour[i], tour[i + length - 1]
+                previous = tour[i - 1] if i else start
+                following = tour[i + length] if i + length < len(tour) else None
+                # Weight saved by taking the segment out.
+                saving = distance(previous, first) - (
+                    0 if following is None
+                    else distance(previous, following) - distance(last, following)
+                )
+                rest = tour[:i] + tour[i + length:]
+                for j in range(len(rest) + 1):
+                    if j == i:
+                        # Same place as before.
+                        continue
+                    before = rest[j - 1] if j else start
+                    after = rest[j] if j < len(rest) else None
+                    weight = distance(before, first) + (
+                        0 if after is None
+                        else distance(last, after) - distance(before, after)
+                    )
+                    if weight < saving:
+                        tour[:] = rest[:j] + tour[i:i + length] + rest[j:]
+                        return True
+                    if process_time() >= deadline:
+                        return False
+        return False
+
+
+def assign_frontier(
+    planet: Planet,
+    starts: Sequence[tuple[int, int]],
+) -> list[list[tuple[int, int]]]:
+    """Split the frontier of `planet` among robots at the nodes `starts`.
+
+    Returns the frontier nodes assigned to each robot in the order to
+    visit them.  Repeatedly, the robot which can reach the nearest
+    frontier node left from its last one first claims it, which keeps
+    the time until the last robot is done low.  Frontier nodes no robot
+    can reach are not assigned.
+    """
+    tours: list[list[tuple[int, int]]] = [[] for _ in starts]
+    left = set(planet.frontier)
+    # The weight driven by each robot so far and the node it ends at.
+    robots = [(0, start) for start in starts]
+    while left:
+        best = None
+        for index, (weight, node) in enumerate(robots):
+            # In the order the nodes were reached for deterministic ties.
+            for other, (distance, _, _) in planet.distances_from(node).items():
+                if other in left:
+                    if best is None or weight + distance < best[0]:
+                        best = (weight + distance, index, other)
+                    break
+        if best is None:
+            # No robot can reach the remaining nodes.
+            break
+        weight, index, node = best
+        left.remove(node)
+        tours[index].append(node)
+        robots[index] = (weight, node)
+    return tours
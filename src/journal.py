@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+
+# ATTENTION: Do not import the ev3dev.ev3 module in this file.
+import os
+from struct import Struct
+from time import monotonic
+from typing import BinaryIO, Optional
+
+from directions import direction_mask, mask_directions
+from planet import Direction, Planet, Weight, bulk_loading
+
+# Each record is a type, two nodes with a direction each and a weight.
+# Node direction records use only the first node and store the
+# directions as a bit mask in place of its direction.
+_RECORD: Struct = Struct("<BiiHiiHi")
+# A call of `Planet.add_path`, storing the path at both ends.
+_PATH_RECORD = 1
+# A call of `Planet.set_available_node_directions`.
+_NODE_DIRECTIONS_RECORD = 2
+# The path stored at the first end only, used by snapshots as the ends
+# of a path differ after it was replaced at one of them.
+_PATH_END_RECORD = 3
+# The path at the first end dropped, see `Planet.merge_paths`.
+_DROPPED_PATH_END_RECORD = 4
+# The direction of each angle stored.
+_DIRECTIONS: dict[int, Direction] = {
+    int(direction): direction for direction in Direction
+}
+
+
+class PlanetJournal:
+    """An append-only binary log of the changes to a planet.
+
+    Every call of `Planet.add_path` and
+    `Planet.set_available_node_directions`, and each path end dropped
+    when merging, is appended as a fixed size record once the planet
+    stored its change, synced to disk at most `sync_interval` seconds
+    later (on the next record).  Opening the journal again replays it
+    into a planet, so the map survives crashes.  Once the journal has
+    grown to `compact_ratio` times the records of a snapshot of the
+    current map (and at least `min_records`), it is replaced by the
+    snapshot, which keeps replaying fast.
+    """
+
+    __slots__ = (
+        "path", "planet", "sync_interval", "compact_ratio", "min_records",
+        "records", "_file", "_synced", "_compact_at",
+    )
+
+    def __init__(
+        self,
+        path: str,
+        planet: Planet,
+        sync_interval: float = 1.0,
+        compact_ratio: float = 2.0,
+        min_records: int = 1024,
+    ) -> None:
+        """Replay the journal at `path` into `planet` and record its changes.
+
+        The journal is created if it does not exist yet.  A record only
+        partially written before a crash is dropped.
+        """
+        self.path = path
+        self.planet = planet
+        self.sync_interval = sync_interval
+        self.compact_ratio = compact_ratio
+        self.min_records = min_records
+        # The number of records in the journal.
+        self.records = replay(path, planet)
+        self._file = open(path, "ab")
+        # Cut off a partial record.
+        self._file.truncate(self.records * _RECORD.size)
+        self._synced = monotonic()
+        # The number of records from which on compaction is checked.
+        self._compact_at = self._next_compaction()
+        planet.journal = self
+
+    def record_path(
+        self,
+        start: tuple[tuple[int, int], Direction],
+        target: tuple[tuple[int, int], Direction],
+        weight: Weight,
+    ) -> None:
+        """Append a call of `Planet.add_path`."""
+        (start_x, start_y), start_direction = start
+        (target_x, target_y), target_direction = target
+        self._write(_RECORD.pack(
+            _PATH_RECORD,
+            start_x, start_y, start_direction,
+            target_x, target_y, target_direction,
+            weight,
+        ))
+
+    def record_node_directions(
+        self,
+        node: tuple[int, int],
+        directions: set[Direction],
+    ) -> None:
+        """Append a call of `Planet.set_available_node_directions`."""
+        self._write(_pack_node_directions(node, directions))
+
+    def record_dropped_path_end(
+        self,
+        node: tuple[int, int],
+        direction: Direction,
+    ) -> None:
+        """Append the removal of the path leaving `node` in `direction`."""
+        self._write(_RECORD.pack(
+            _DROPPED_PATH_END_RECORD, node[0], node[1], direction, 0, 0, 0, 0,
+        ))
+
+    def _write(self, record: bytes) -> None:
+        """Append `record`, syncing and compacting when due.
+
+        The planet must already contain the change recorded, else it is
+        lost when compacting.
+        """
+        self._file.write(record)
+        self.records += 1
+        if monotonic() - self._synced >= self.sync_interval:
+            self.sync()
+        if self.records >= self._compact_at:
+            # Only compact if the map did not grow as much as the
+            # journal, else check again later.
+            snapshot_records = _snapshot_records(self.planet)
+            if self.records >= self.compact_ratio * snapshot_records:
+                self.compact()
+            else:
+                self._compact_at = self._next_compaction(snapshot_records)
+
+    def _next_compaction(self, snapshot_records: Optional[int] = None) -> int:
+        """Return the number of records to check for compaction again at."""
+        if snapshot_records is None:
+            snapshot_records = _snapshot_records(self.planet)
+        return max(
+            self.min_records,
+            int(self.compact_ratio * snapshot_records),
+            self.records + 1,
+        )
+
+    def sync(self) -> None:
+        """Write all records to disk."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._synced = monotonic()
+
+    def compact(self) -> None:
+        """Replace the journal by a snapshot of the current map.
+
+        The snapshot is written next to the journal and then renamed, so
+        either the old or the new journal survives a crash.
+        """
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "wb") as file:
+            self.records = write_snapshot(file, self.planet)
+            file.flush()
+            os.fsync(file.fileno())
+        self._file.close()
+        os.replace(temporary_path, self.path)
+        self._file = open(self.path, "ab")
+        self._synced = monotonic()
+        self._compact_at = self._next_compaction(self.records)
+
+    def close(self) -> None:
+        """Sync and stop recording the changes of the planet."""
+        if self._file.closed:
+            return
+        self.sync()
+        self._file.close()
+        if self.planet.journal is self:
+            self.planet.journal = None
+
+
+def _pack_node_directions(
+    node: tuple[int, int],
+    directions: set[Direction],
+) -> bytes:
+    """Return the record of the `directions` available at `node`."""
+    return _RECORD.pack(
+        _NODE_DIRECTIONS_RECORD,
+        node[0], node[1], direction_mask(directions),
+        0, 0, 0, 0,
+    )
+
+
+def _snapshot_records(planet: Planet) -> int:
+    """Return the number of records of a snapshot of `planet`."""
+    return (
+        sum(len(node_paths) for node_paths in planet.get_paths().values())
+        + len(planet.get_node_directions())
+    )
+
+
+def write_snapshot(file: BinaryIO, planet: Planet) -> int:
+    """Write the records to restore the map of `planet` to `file`.
+
+    Returns the number of records written.
+    """
+    records = [
+        _RECORD.pack(
+            _PATH_END_RECORD,
+            node[0], node[1], direction,
+            target[0], target[1], target_direction,
+            weight,
+        )
+        for node, node_paths in planet.get_paths().items()
+        for direction, (target, target_direction, weight) in node_paths.items()
+    ]
+    records.extend(
+        _pack_node_directions(node, directions)
+        for node, directions in planet.get_node_directions().items()
+    )
+    file.write(b"".join(records))
+    return len(records)
+
+
+def replay(path: str, planet: Planet) -> int:
+    """Restore the map recorded in the journal at `path` into `planet`.
+
+    Only the last path stored at each end and the last directions set
+    at each node are passed to `Planet.restore`, which gives the same
+    map as repeating all calls.  Returns the number of complete records
+    replayed, `0` if there is no journal at `path`.
+    """
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except FileNotFoundError:
+        return 0
+    records = len(data) // _RECORD.size
+    with bulk_loading():
+        _restore_records(
+            memoryview(data)[:records * _RECORD.size], planet, path,
+        )
+    return records
+
+
+def _restore_records(data: memoryview, planet: Planet, path: str) -> None:
+    """Restore the complete records `data` of the journal at `path`."""
+    directions = _DIRECTIONS
+    node_key = planet.node_keys.node_key
+    # The last path stored at each end and the last directions set at
+    # each node.
+    paths: dict[
+        tuple[int, int],
+        dict[Direction, tuple[tuple[int, int], Direction, Weight]],
+    ] = {}
+    node_directions: dict[tuple[int, int], set[Direction]] = {}
+    for (
+        kind, start_x, start_y, start_direction,
+        target_x, target_y, target_direction, weight,
+    ) in _RECORD.iter_unpack(data):
+        start = node_key(start_x, start_y)
+        if kind == _NODE_DIRECTIONS_RECORD:
+            node_directions[start] = set(mask_directions(start_direction))
+            continue
+        elif kind == _DROPPED_PATH_END_RECORD:
+            node_paths = paths.get(start, {})
+            node_paths.pop(directions[start_direction], None)
+            if not node_paths:
+                paths.pop(start, None)
+            continue
+        elif kind != _PATH_RECORD and kind != _PATH_END_RECORD:
+            raise ValueError(f"Unknown record type {kind} in journal {path!r}")
+
+        start_direction = directions[start_direction]
+        target = node_key(target_x, target_y)
+        target_direction = directions[target_direction]
+        try:
+            paths[start][start_direction] = (target, target_direction, weight)
+        except KeyError:
+            paths[start] = {start_direction: (target, target_direction, weight)}
+        if kind == _PATH_RECORD:
+            try:
+                paths[target][target_direction] = (start, start_direction, weight)
+            except KeyError:
+                paths[target] = {target_direction: (start, start_direction, weight)}
+
+    planet.restore(paths, node_directions)
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+
+# ATTENTION: Do not import the ev3dev.ev3 module in this file.
+"""Canonical coordinate tuples of the nodes of a planet.
+
+Nodes are identified by `(x, y)` tuples everywhere.  Tuples do not
+cache their hash, but `dict` and `set` lookups compare keys by identity
+before equality, so looking up the very tuple object stored saves the
+comparison, and storing the same object everywhere saves memory.
+Each planet keeps a `NodeKeys` table returning that canonical object
+for each coordinate pair (`Planet.node_keys`), which is freed together
+with the planet.  Use it wherever nodes enter the planet from outside,
+e.g. when replaying journals.  They are still plain tuples, so code not
+using them keeps working unchanged, only slower.
+"""
+
+
+class NodeKeys:
+    """The canonical tuple of each node seen by a planet."""
+
+    __slots__ = ("_nodes",)
+
+    def __init__(self) -> None:
+        """Create an empty table."""
+        # The canonical tuple of each node seen.
+        self._nodes: dict[tuple[int, int], tuple[int, int]] = {}
+
+    def node_key(self, x: int, y: int) -> tuple[int, int]:
+        """Return the canonical tuple of the node at `x`, `y`."""
+        return self.intern((x, y))
+
+    def intern(self, node: tuple[int, int]) -> tuple[int, int]:
+        """Return the canonical tuple equal to `node`."""
+        return self._nodes.setdefault(node, node)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
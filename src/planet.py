@@ -1,24 +1,32 @@
 #!/usr/bin/env python3
 
 # ATTENTION: Do not import the ev3dev.ev3 module in this file.
-from enum import IntEnum, unique
+from array import array
+from collections.abc import Iterable, Iterator, Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass
+from enum import Enum, unique
+import gc
+from heapq import heapify, heappop, heappush
+from itertools import count
 from math import inf
 from random import choice
-from typing import Final, Optional
+from typing import TYPE_CHECKING, Callable, Final, Optional
 
+# `Direction` and `opposite` are imported from `planet` by other modules.
+from directions import (
+    DIRECTION_BITS, Direction, direction_mask, opposite,
+    ordered_mask_directions, turn,
+)
+from node_keys import NodeKeys
 
-@unique
-class Direction(IntEnum):
-    """The orientations on the planet set by the mother ship."""
-    NORTH = 0
-    EAST = 90
-    SOUTH = 180
-    WEST = 270
+if TYPE_CHECKING:
+    from journal import PlanetJournal
 
 
-def opposite(direction: Direction) -> Direction:
-    """Return the opposite direction of `direction`."""
-    return (direction + 180) % 360
+def grid_distance(node: tuple[int, int], other: tuple[int, int]) -> int:
+    """Return the Manhattan distance between the coordinates of two nodes."""
+    return abs(node[0] - other[0]) + abs(node[1] - other[1])
 
 
 Weight = int
@@ -29,16 +37,598 @@ Value:   `-1` if blocked path
         never `0`
 """
 BLOCKED: Final[Weight] = -1
+# The direction mask of all directions.
+_ALL_DIRECTIONS: Final = direction_mask(Direction)
+
+ShortestPathTree = dict[
+    tuple[int, int],
+    tuple[Optional[tuple[int, int]], Optional[Direction]]
+]
+"""The predecessor of each node on its shortest path from a start node.
+
+Maps each node to its predecessor node and the direction to take from
+the predecessor, or to `(None, None)` for the start node itself.
+"""
+
+DistanceMap = dict[
+    tuple[int, int],
+    tuple[Weight, Optional[tuple[int, int]], Optional[Direction]]
+]
+"""The weight of the shortest path from a start node to each node.
+
+Like `ShortestPathTree`, but with the weight of the shortest path
+preceding the predecessor and the direction to take from it.
+"""
+
+
+@unique
+class PathEngine(Enum):
+    """The algorithms available to `Planet` for shortest path searches.
+
+    All engines find paths of the same (minimal) weight; `SCAN` and `HEAP`
+    even make the same choice between multiple shortest paths of equal
+    weight.
+    """
+    # Linear scan over all nodes to check for the minimum; fastest on
+    # the small planets usually explored.
+    SCAN = "scan"
+    # Binary heap with lazy deletion of outdated entries; scales to
+    # planets with thousands of nodes.
+    HEAP = "heap"
+    # Keeps the shortest paths to the current target and repairs only
+    # the affected part of them on changes of the map (see
+    # `DynamicShortestPaths`); searches for unexplored nodes use `HEAP`.
+    DYNAMIC = "dynamic"
+    # A* search towards the target guided by the grid coordinates of the
+    # nodes (see `Planet.heuristic`); searches for unexplored nodes use
+    # `HEAP`.
+    ASTAR = "astar"
+    # Dijkstra's algorithm from both the start and the target at once
+    # until both searches meet; searches for unexplored nodes use `HEAP`.
+    BIDIRECTIONAL = "bidirectional"
+
+
+PathChange = tuple[
+    tuple[int, int],
+    Direction,
+    Optional[tuple[tuple[int, int], Direction, Weight]],
+    Optional[tuple[tuple[int, int], Direction, Weight]],
+]
+"""A changed path seen from one of its ends.
+
+Consists of the node, the direction of the path at the node and the old
+and new path records (the other end node, the direction at it and the
+weight), where `None` stands for a previously unknown path.
+"""
+
+
+def resolve_path_conflict(
+    path: tuple[tuple[int, int], Direction, Weight],
+    other: tuple[tuple[int, int], Direction, Weight],
+) -> tuple[tuple[int, int], Direction, Weight]:
+    """Return which of two records of the path at a node to keep.
+
+    Used when merging maps of several robots: a blocked path wins, else
+    the heavier one, else the one leading to the greater node and
+    direction, so the result does not depend on the order of merging.
+    """
+    return max(
+        path,
+        other,
+        key=lambda path: (path[2] == BLOCKED, path[2], path[0], path[1]),
+    )
+
+
+@contextmanager
+def bulk_loading() -> Iterator[None]:
+    """Pause the cyclic garbage collector while loading a map.
+
+    Creating the records of many paths at once would trigger it over and
+    over, although none of them is garbage.
+    """
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if collecting:
+            gc.enable()
+
+
+@dataclass
+class PathUpdateCounts:
+    """The number of paths added to a planet by their effect on the map."""
+    # Paths leading to previously unknown directions.
+    new: int = 0
+    # Paths replacing differing paths.
+    changed: int = 0
+    # Paths known exactly like this already.
+    unchanged: int = 0
+
+
+class DisjointSets:
+    """The connected components of the nodes on a planet.
+
+    A union-find structure (with union by size and path halving) over
+    the nodes, where nodes connected by non-blocked paths are united.
+    Additionally counts the frontier nodes in each component.  Paths
+    cannot be removed, so the components have to be rebuilt if a path
+    gets blocked.
+    """
+
+    __slots__ = ("_parents", "_sizes", "_frontier_counts")
+
+    def __init__(self) -> None:
+        """Create the structure with each node in its own component."""
+        # The parent of each node in its component's tree, roots are
+        # their own parents.  Nodes not contained are single components.
+        self._parents: dict[tuple[int, int], tuple[int, int]] = {}
+        # The number of nodes in each component, stored at its root.
+        self._sizes: dict[tuple[int, int], int] = {}
+        # The number of frontier nodes in each component, stored at its
+        # root, possibly missing if none.
+        self._frontier_counts: dict[tuple[int, int], int] = {}
+
+    def find(self, node: tuple[int, int]) -> tuple[int, int]:
+        """Return the root node representing the component of `node`."""
+        parents = self._parents
+        try:
+            parent = parents[node]
+        except KeyError:
+            parents[node] = node
+            self._sizes[node] = 1
+            return node
+
+        while parent != node:
+            # Skip a level for faster finds in the future.
+            parents[node] = parent = parents[parent]
+            node = parent
+            parent = parents[node]
+        return node
+
+    def union(self, node: tuple[int, int], other: tuple[int, int]) -> None:
+        """Unite the components of `node` and `other`."""
+        root = self.find(node)
+        other_root = self.find(other)
+        if root == other_root:
+            return
+        if self._sizes[root] < self._sizes[other_root]:
+            root, other_root = other_root, root
+        self._parents[other_root] = root
+        self._sizes[root] += self._sizes.pop(other_root)
+        other_count = self._frontier_counts.pop(other_root, 0)
+        if other_count:
+            self._frontier_counts[root] = (
+                self._frontier_counts.get(root, 0) + other_count
+            )
+
+    def count_frontier(self, node: tuple[int, int], difference: int) -> None:
+        """Add `difference` to the frontier nodes in the component of `node`."""
+        root = self.find(node)
+        self._frontier_counts[root] = (
+            self._frontier_counts.get(root, 0) + difference
+        )
+
+    def frontier_count(self, node: tuple[int, int]) -> int:
+        """Return the number of frontier nodes in the component of `node`."""
+        return self._frontier_counts.get(self.find(node), 0)
+
+
+class DynamicShortestPaths:
+    """Shortest paths between one source node and all other nodes.
+
+    Instead of searching anew after the map changed, only the part of
+    the shortest path tree affected by the changed paths is repaired:
+    Nodes reached over a removed, blocked or heavier path are detached
+    and searched again from their still valid neighbors, while a new
+    or lighter path propagates its improvements to the nodes behind it.
+
+    As each path is stored in both directions, the shortest path from
+    any node to the source is the reversed path from the source.
+    """
+
+    __slots__ = ("source", "distances", "tree", "_children", "_paths")
+
+    def __init__(
+        self,
+        paths: dict[
+            tuple[int, int],
+            dict[Direction, tuple[tuple[int, int], Direction, Weight]]
+        ],
+        source: tuple[int, int],
+    ) -> None:
+        """Find the shortest paths from `source` on the map `paths`.
+
+        `paths` is not copied, it is expected to be kept up to date and
+        every change of it to be reported to `update`.
+        """
+        self._paths = paths
+        self.source = source
+        # The weight of the shortest path from `source` to each reachable
+        # node.
+        self.distances: dict[tuple[int, int], Weight] = {}
+        self.tree: ShortestPathTree = {}
+        # The successors of each node in `tree`.
+        self._children: dict[tuple[int, int], set[tuple[int, int]]] = {}
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        """Find all shortest paths from scratch."""
+        self.distances.clear()
+        self.tree.clear()
+        self._children.clear()
+        self._propagate([(0, 0, self.source, None, None)])
+
+    def update(self, changes: list[PathChange]) -> None:
+        """Repair the shortest paths after `changes` were made to the map."""
+        distances = self.distances
+        tree = self.tree
+        children = self._children
+
+        # Find the nodes whose shortest path is no longer valid.
+        invalid = []
+        for node, direction, old, new in changes:
+            if old is None or old[2] == BLOCKED:
+                continue
+            if new is not None and new[0] != old[0]:
+                # The path now leads to another node, the path at the old
+                # node does not know about this, so start from scratch.
+                self._rebuild()
+                return
+            if (new is None or new[2] == BLOCKED or new[2] > old[2]) \
+                    and tree.get(old[0]) == (node, direction):
+                invalid.append(old[0])
+
+        # Detach them with their whole subtrees.
+        detached = set()
+        while invalid:
+            node = invalid.pop()
+            if node not in detached:
+                detached.add(node)
+                invalid.extend(children.pop(node, ()))
+        for node in detached:
+            predecessor = tree.pop(node)[0]
+            del distances[node]
+            if predecessor not in detached:
+                children[predecessor].discard(node)
+
+        # Search again starting from the paths into the detached part and
+        # from the new or lighter paths.
+        candidates = []
+        for node in detached:
+            # Nodes might have lost all their paths.
+            node_paths = self._paths.get(node, {})
+            for neighbor, neighbor_direction, _ in node_paths.values():
+                if neighbor in distances:
+                    neighbor_path = self._paths[neighbor][neighbor_direction]
+                    if neighbor_path[2] != BLOCKED:
+                        candidates.append((
+                            distances[neighbor] + neighbor_path[2],
+                            len(candidates),
+                            node,
+                            neighbor,
+                            neighbor_direction,
+                        ))
+        for node, direction, _, new in changes:
+            if new is not None and new[2] != BLOCKED and node in distances:
+                candidates.append((
+                    distances[node] + new[2],
+                    len(candidates),
+                    new[0],
+                    node,
+                    direction,
+                ))
+        self._propagate(candidates)
+
+    def path_to_source(
+        self,
+        node: tuple[int, int],
+    ) -> Optional[list[tuple[tuple[int, int], Direction]]]:
+        """Return the shortest path from `node` to the source.
+
+        Returns `None` if `node` cannot reach the source, `[]` if it is
+        the source itself.
+        """
+        if node not in self.tree:
+            return None
+
+        shortest_path: list[tuple[tuple[int, int], Direction]] = []
+        while (predecessor := self.tree[node])[0] is not None:
+            predecessor, direction = predecessor
+            # Take the path from the predecessor the other way round.
+            shortest_path.append((node, self._paths[predecessor][direction][1]))
+            node = predecessor
+        return shortest_path
+
+    def _propagate(
+        self,
+        candidates: list[
+            tuple[
+                Weight, int, tuple[int, int],
+                Optional[tuple[int, int]], Optional[Direction],
+            ]
+        ],
+    ) -> None:
+        """Run Dijkstra's algorithm from the given `candidates`.
+
+        Each candidate consists of the weight of a new path to a node,
+        a tie-breaker, the node, its predecessor and the direction to
+        take from it.  Only nodes whose distance gets smaller are
+        updated.
+        """
+        distances = self.distances
+        tree = self.tree
+        children = self._children
+        heapify(candidates)
+        order = count(len(candidates))
+
+        while candidates:
+            distance, _, node, predecessor, direction = heappop(candidates)
+            if distance >= distances.get(node, inf):
+                # Outdated candidate.
+                continue
+
+            distances[node] = distance
+            old_predecessor = tree.get(node, (None,))[0]
+            if old_predecessor is not None:
+                children[old_predecessor].discard(node)
+            tree[node] = (predecessor, direction)
+            if predecessor is not None:
+                children.setdefault(predecessor, set()).add(node)
+
+            for direction, (neighbor, _, weight) in self._paths[node].items():
+                if (weight != BLOCKED
+                        and distance + weight < distances.get(neighbor, inf)):
+                    heappush(candidates, (
+                        distance + weight, next(order), neighbor, node, direction,
+                    ))
+
+
+class ContractionHierarchy:
+    """Point-to-point shortest paths on a map that does not change anymore.
+
+    The nodes are contracted one after another, least important first
+    (by the number of shortcuts contracting them would add compared to
+    their paths), where a shortcut replaces a shortest path through the
+    contracted node between two of its remaining neighbors.  A query
+    then only needs to search upwards to more important nodes from both
+    ends, which settles a tiny part of the map.  Shortcuts are unpacked
+    to the original paths afterwards.
+
+    The map is treated as symmetric like all paths are stored in both
+    directions.  Any change of it invalidates the hierarchy.
+    """
+
+    __slots__ = ("_upward", "_directions", "_middles")
+
+    # The number of nodes a witness search may settle before giving up
+    # and adding the shortcut anyway.
+    WITNESS_LIMIT: Final = 64
+
+    def __init__(
+        self,
+        paths: Mapping[
+            tuple[int, int],
+            Mapping[Direction, tuple[tuple[int, int], Direction, Weight]]
+        ],
+    ) -> None:
+        """Contract all nodes of the map `paths`."""
+        # The remaining map with the lightest path to each neighbor.
+        graph: dict[tuple[int, int], dict[tuple[int, int], Weight]] = {}
+        # The direction of the lightest original path between two nodes.
+        self._directions: dict[
+            tuple[tuple[int, int], tuple[int, int]], Direction
+        ] = {}
+        for node, node_paths in paths.items():
+            neighbors = graph.setdefault(node, {})
+            for direction, (neighbor, _, weight) in node_paths.items():
+                if (weight != BLOCKED and neighbor != node
+                        and weight < neighbors.get(neighbor, inf)):
+                    neighbors[neighbor] = weight
+                    self._directions[node, neighbor] = direction
+        # The node each shortcut between two nodes replaces.
+        self._middles: dict[
+            tuple[tuple[int, int], tuple[int, int]], tuple[int, int]
+        ] = {}
+        # The paths of each node to its more important neighbors.
+        self._upward: dict[tuple[int, int], dict[tuple[int, int], Weight]] = {}
+
+        # The number of contracted neighbors of each node, spreading the
+        # contraction over the map.
+        contracted_neighbors = dict.fromkeys(graph, 0)
+
+        def priority(node):
+            shortcuts = self._shortcuts(graph, node)
+            return (
+                len(shortcuts) - len(graph[node])
+                + contracted_neighbors[node]
+            ), shortcuts
+
+        order = count()
+        queue = [(priority(node)[0], next(order), node) for node in graph]
+        heapify(queue)
+        while queue:
+            _, _, node = heappop(queue)
+            # Priorities only get outdated by contracting neighbors, so
+            # update them lazily.
+            node_priority, shortcuts = priority(node)
+            if queue and node_priority > queue[0][0]:
+                heappush(queue, (node_priority, next(order), node))
+                continue
+
+            neighbors = graph.pop(node)
+            self._upward[node] = neighbors
+            for neighbor in neighbors:
+                del graph[neighbor][node]
+                contracted_neighbors[neighbor] += 1
+            for neighbor, other, weight in shortcuts:
+                # Keep the existing path if it is as light.
+                if weight < graph[neighbor].get(other, inf):
+                    graph[neighbor][other] = graph[other][neighbor] = weight
+                    self._middles[neighbor, other] = node
+                    self._middles[other, neighbor] = node
+
+    def _shortcuts(
+        self,
+        graph: dict[tuple[int, int], dict[tuple[int, int], Weight]],
+        node: tuple[int, int],
+    ) -> list[tuple[tuple[int, int], tuple[int, int], Weight]]:
+        """Return the shortcuts needed to contract `node` from `graph`.
+
+        A shortcut between two neighbors is needed unless a search
+        around `node` finds a path between them at most as heavy (a
+        witness).
+        """
+        neighbors = graph[node]
+        shortcuts = []
+        others = list(neighbors)
+        for index, neighbor in enumerate(others):
+            targets = {
+                other: neighbors[neighbor] + neighbors[other]
+                for other in others[index + 1:]
+            }
+            if not targets:
+                break
+            limit = max(targets.values())
+            distances = {neighbor: 0}
+            heap = [(0, neighbor)]
+            settled = 0
+            left = len(targets)
+            while heap and settled < self.WITNESS_LIMIT:
+                distance, current = heappop(heap)
+                if distance > limit:
+                    break
+                if distance > distances[current]:
+                    continue
+                settled += 1
+                if current in targets:
+                    left -= 1
+                    if not left:
+                        # All distances to the other neighbors are known.
+                        break
+                for next_node, weight in graph[current].items():
+                    if next_node != node and (
+                        distance + weight < distances.get(next_node, inf)
+                    ):
+                        distances[next_node] = distance + weight
+                        heappush(heap, (distance + weight, next_node))
+            for other, weight in targets.items():
+                if distances.get(other, inf) > weight:
+                    shortcuts.append((neighbor, other, weight))
+        return shortcuts
+
+    def shortest_path(
+        self,
+        start: tuple[int, int],
+        target: tuple[int, int],
+    ) -> Optional[list[tuple[tuple[int, int], Direction]]]:
+        """Return the shortest path from `start` to `target`.
+
+        Returns `None` if there is none (or any node is unknown), `[]` if
+        `start` is `target`.
+        """
+        if start == target:
+            return [] if start in self._upward else None
+
+        # The weight of the upward paths from both ends and the
+        # predecessor on them.
+        weights = ({start: 0}, {target: 0})
+        predecessors: tuple[
+            dict[tuple[int, int], tuple[int, int]],
+            dict[tuple[int, int], tuple[int, int]],
+        ] = ({}, {})
+        heaps = ([(0, start)], [(0, target)])
+        min_weight = inf
+        meeting = None
+        while heaps[0] or heaps[1]:
+            # Continue on the side with the lighter nodes left.
+            side = 0 if heaps[0] and (
+                not heaps[1] or heaps[0][0][0] <= heaps[1][0][0]
+            ) else 1
+            weight, node = heappop(heaps[side])
+            if weight >= min_weight:
+                # All remaining nodes are heavier than the meeting found.
+                break
+            if weight > weights[side][node]:
+                continue
+            other_weight = weights[1 - side].get(node)
+            if other_weight is not None and weight + other_weight < min_weight:
+                min_weight = weight + other_weight
+                meeting = node
+            for neighbor, path_weight in self._upward.get(node, {}).items():
+                if weight + path_weight < weights[side].get(neighbor, inf):
+                    weights[side][neighbor] = weight + path_weight
+                    predecessors[side][neighbor] = node
+                    heappush(heaps[side], (weight + path_weight, neighbor))
+
+        if meeting is None:
+            return None
+
+        # The nodes along the upward paths with possible shortcuts.
+        nodes = [meeting]
+        while nodes[-1] != start:
+            nodes.append(predecessors[0][nodes[-1]])
+        nodes.reverse()
+        while nodes[-1] != target:
+            nodes.append(predecessors[1][nodes[-1]])
+
+        shortest_path = []
+        for node, next_node in zip(nodes, nodes[1:]):
+            # Unpack the shortcuts depth first.
+            pending = [(node, next_node)]
+            while pending:
+                node, next_node = pending.pop()
+                middle = self._middles.get((node, next_node))
+                if middle is None:
+                    shortest_path.append((node, self._directions[node, next_node]))
+                else:
+                    pending.append((middle, next_node))
+                    pending.append((node, middle))
+        return shortest_path
 
 
 class Planet:
     """The planet map representation with nodes, paths and their weights."""
 
-    __slots__ = ("_paths", "_known_node_directions")
+    __slots__ = (
+        "_paths",
+        "_known_node_directions",
+        "_available_masks",
+        "_explored_masks",
+        "engine",
+        "generation",
+        "_cache_generation",
+        "_search_trees",
+        "_search_goals",
+        "_dynamic_paths",
+        "_frontier",
+        "_target_paths",
+        "_weight_per_distance",
+        "_batches",
+        "_pending_changes",
+        "_pending_nodes",
+        "_distance_maps",
+        "_components",
+        "turn_costs",
+        "drive_time_share",
+        "_drive_times",
+        "hierarchy_min_nodes",
+        "_hierarchy",
+        "journal",
+        "node_keys",
+    )
 
     # DO NOT EDIT THE METHOD SIGNATURE
     def __init__(self) -> None:
-        """Initialize the data structure."""
+        """Initialize the data structure.
+
+        As the signature is fixed, other settings like the `engine` are
+        selected by assigning the public attributes right after
+        construction:
+
+        >>> planet = Planet()
+        >>> planet.engine = PathEngine.HEAP
+        """
         # The registered existing paths on the planet, probably incomplete.
         self._paths: dict[
             tuple[int, int],
@@ -52,6 +642,93 @@ class Planet:
             tuple[int, int],
             set[Direction]
         ] = {}
+        # The same as direction masks (see `directions`), for checking
+        # which directions are explored by bit operations.
+        self._available_masks: dict[tuple[int, int], int] = {}
+        # The directions of the known paths at each node as direction
+        # masks.
+        self._explored_masks: dict[tuple[int, int], int] = {}
+        # The algorithm used for the shortest path searches.
+        self.engine: PathEngine = PathEngine.SCAN
+        # Incremented on each change of the map, used to tell whether
+        # cached search results are still valid.
+        self.generation: int = 0
+        # The `generation` the cached search results below belong to.
+        self._cache_generation: int = 0
+        # The largest shortest path tree found so far from each start
+        # node.  Dijkstra's algorithm settles the nodes in the same
+        # order for each search from the same start, so a smaller tree
+        # is always a part of the larger one.
+        self._search_trees: dict[tuple[int, int], ShortestPathTree] = {}
+        # The node found by previous searches from a start node (first
+        # item) for a target or the next unexplored node (`None`) (second
+        # item), `None` if no such node was found.
+        self._search_goals: dict[
+            tuple[tuple[int, int], Optional[tuple[int, int]]],
+            Optional[tuple[int, int]]
+        ] = {}
+        # The shortest paths to the current target if the `engine` is
+        # `PathEngine.DYNAMIC`, else `None`.
+        self._dynamic_paths: Optional[DynamicShortestPaths] = None
+        # All known nodes which are not completely explored.
+        self._frontier: set[tuple[int, int]] = set()
+        # Cached results of engines searching only the path between two
+        # nodes (first item), belonging to `_cache_generation` as well.
+        self._target_paths: dict[
+            tuple[tuple[int, int], tuple[int, int]],
+            Optional[list[tuple[tuple[int, int], Direction]]]
+        ] = {}
+        # Cached results of `distances_from` for each start node, also
+        # belonging to `_cache_generation`.
+        self._distance_maps: dict[tuple[int, int], DistanceMap] = {}
+        # The nodes connected by non-blocked paths, `None` if it needs to
+        # be rebuilt after a path got blocked.
+        self._components: Optional[DisjointSets] = DisjointSets()
+        # The additional weight of turning by each angle (clockwise, in
+        # degrees like `Direction`) at a node before taking the next
+        # path.  If set, searches given the current heading of the robot
+        # minimize the weight of paths and turns together, see `route`.
+        self.turn_costs: Optional[dict[int, Weight]] = None
+        # The share of the observed drive times in the cost of a path,
+        # from 0 (only the weight) to 1 (only the drive time), see
+        # `path_cost`.  If `None`, drive times are not used for routing.
+        self.drive_time_share: Optional[float] = None
+        # The number and total duration in seconds of the observed
+        # drives on the path starting at each node and direction.
+        self._drive_times: dict[
+            tuple[tuple[int, int], Direction], tuple[int, float]
+        ] = {}
+        # The number of nodes from which on a `ContractionHierarchy` is
+        # built for target queries once the exploration is completed,
+        # answering them instead of `engine`; `None` to never build one.
+        self.hierarchy_min_nodes: Optional[int] = None
+        # The contraction hierarchy of the map, `None` if not built or
+        # dropped after a change.
+        self._hierarchy: Optional[ContractionHierarchy] = None
+        # Where all changes are recorded to be restored after a crash,
+        # see `journal.PlanetJournal`.
+        self.journal: Optional["PlanetJournal"] = None
+        # The canonical tuples of the nodes stored, see `node_keys`.
+        self.node_keys: NodeKeys = NodeKeys()
+        # The lowest ratio of weight and grid distance between the end
+        # nodes of all paths as weight and distance (`None` if not known
+        # yet), used for `heuristic`.  Not increased if paths get heavier,
+        # as it remains a lower bound then.
+        self._weight_per_distance: Optional[tuple[Weight, int]] = None
+        # The counts of all currently open `batch`es.
+        self._batches: list[PathUpdateCounts] = []
+        # The changes made during the open batches, deferred until the
+        # outermost one is closed: the first old and the last new path
+        # leaving each node in a direction, and the nodes to recheck for
+        # the frontier.
+        self._pending_changes: dict[
+            tuple[tuple[int, int], Direction],
+            tuple[
+                Optional[tuple[tuple[int, int], Direction, Weight]],
+                tuple[tuple[int, int], Direction, Weight],
+            ]
+        ] = {}
+        self._pending_nodes: set[tuple[int, int]] = set()
 
     def exploration_completed(self, current_node: tuple[int, int]) -> bool:
         """Return whether planet exploration is completed.
@@ -66,8 +743,11 @@ class Planet:
         to be known on the map, else a `KeyError` is raised.
         """
         # Check whether there is no reachable unexplored node left.
-        # TODO: Check whether really needed (also included in `next_direction`).
-        return self._shortest_path(current_node) is None
+        return (
+            not self._frontier
+            or current_node not in self._paths
+            or not self._get_components().frontier_count(current_node)
+        )
 
     # DO NOT EDIT THE METHOD SIGNATURE
     def add_path(
@@ -82,15 +762,409 @@ class Planet:
 
         >>> planet.add_path(((0, 3), Direction.NORTH), ((0, 3), Direction.WEST), 1)
         """
+        intern = self.node_keys.intern
+        start = (intern(start[0]), start[1])
+        target = (intern(target[0]), target[1])
+        ends = (start, target)
+        changes: list[PathChange] = []
         for (start, start_direction), (target, target_direction) \
                 in ((start, target), (target, start)):
-            try:
-                record = self._paths[start]
-            except KeyError:
-                # No prior paths at node `start` registered.
-                record = self._paths[start] = {}
+            new_path = (target, target_direction, weight)
+            old_path = self._store_path(start, start_direction, new_path)
+            if old_path is None:
+                self._explored_masks[start] = (
+                    self._explored_masks.get(start, 0)
+                    | DIRECTION_BITS[start_direction]
+                )
+            if old_path != new_path:
+                self.generation += 1
+                changes.append((start, start_direction, old_path, new_path))
+                if old_path is None or old_path[:2] != new_path[:2]:
+                    # Observations of another path do not apply anymore.
+                    self._drive_times.pop((start, start_direction), None)
+        if changes:
+            self._hierarchy = None
+        if self.journal is not None:
+            # Only once stored, as the journal may be compacted to a
+            # snapshot of the paths now.
+            self.journal.record_path(*ends, weight)
+
+        for counts in self._batches:
+            if not changes:
+                counts.unchanged += 1
+            elif all(old_path is None for _, _, old_path, _ in changes):
+                counts.new += 1
+            else:
+                counts.changed += 1
+
+        if changes and weight != BLOCKED:
+            distance = grid_distance(start, target)
+            if distance and (
+                self._weight_per_distance is None
+                or weight * self._weight_per_distance[1]
+                    < self._weight_per_distance[0] * distance
+            ):
+                self._weight_per_distance = (weight, distance)
+
+        if changes:
+            self._apply_changes(changes)
+
+    def _apply_changes(self, changes: list[PathChange]) -> None:
+        """Update the data derived from the paths after `changes`.
+
+        Deferred to the end of the batch if one is open.
+        """
+        # Even in batches, as queries check connectivity first.
+        self._update_components(changes)
+        if self._batches:
+            for node, direction, old_path, new_path in changes:
+                old_path = self._pending_changes.get(
+                    (node, direction), (old_path,),
+                )[0]
+                self._pending_changes[node, direction] = (old_path, new_path)
+                self._pending_nodes.add(node)
+        else:
+            for node, _, _, _ in changes:
+                self._update_frontier(node)
+            self._update_dynamic_paths(changes)
+
+    def add_paths(
+        self,
+        paths: Iterable[
+            tuple[
+                tuple[tuple[int, int], Direction],
+                tuple[tuple[int, int], Direction],
+                Weight,
+            ]
+        ],
+    ) -> PathUpdateCounts:
+        """Add all `paths` given as arguments to `add_path` at once.
+
+        The frontier and other data derived from the paths are updated
+        only once after all paths have been added.  Returns how many of
+        the paths were new, changed or unchanged.
+        """
+        with self.batch() as counts:
+            for start, target, weight in paths:
+                self.add_path(start, target, weight)
+        return counts
+
+    def restore(
+        self,
+        paths: Mapping[
+            tuple[int, int],
+            Mapping[Direction, tuple[tuple[int, int], Direction, Weight]]
+        ],
+        node_directions: Mapping[tuple[int, int], set[Direction]],
+    ) -> None:
+        """Store paths and node directions as restored from storage.
+
+        `paths` are given like returned by `get_paths` and stored as
+        they are at each of their ends.  `node_directions` are set like
+        by `set_available_node_directions`.  Much faster than adding the
+        paths one by one, as the data derived from the paths is rebuilt
+        when needed instead of being updated for each one.  Drive times
+        of the restored paths are dropped.  Not recorded in the
+        `journal`.  The nodes are stored as given, callers should pass
+        the canonical ones of `node_keys`.
+        """
+        with self.batch():
+            weight_per_distance = self._weight_per_distance
+            explored_masks = self._explored_masks
+            intern = self.node_keys.intern
+            for node, node_paths in paths.items():
+                # Registers the nodes of copied planets.
+                node = intern(node)
+                self._store_paths(node, node_paths)
+                explored_masks[node] = (
+                    explored_masks.get(node, 0) | direction_mask(node_paths)
+                )
+                x, y = node
+                for (target_x, target_y), _, weight in node_paths.values():
+                    if weight == BLOCKED:
+                        continue
+                    # Inlined `grid_distance`, as this is the hot loop.
+                    distance = abs(target_x - x) + abs(target_y - y)
+                    if distance and (
+                        weight_per_distance is None
+                        or weight * weight_per_distance[1]
+                            < weight_per_distance[0] * distance
+                    ):
+                        weight_per_distance = (weight, distance)
+            self._weight_per_distance = weight_per_distance
+            if self._drive_times:
+                for node, node_paths in paths.items():
+                    for direction in node_paths:
+                        self._drive_times.pop((node, direction), None)
+            self._known_node_directions.update(node_directions)
+            self._available_masks.update(
+                (node, direction_mask(directions))
+                for node, directions in node_directions.items()
+            )
+            self._pending_nodes.update(paths)
+            self._pending_nodes.update(node_directions)
+            # Rebuilt when needed.
+            self._components = None
+            self._dynamic_paths = None
+            self._hierarchy = None
+            self.generation += 1
+
+    def _store_paths(
+        self,
+        node: tuple[int, int],
+        paths: Mapping[Direction, tuple[tuple[int, int], Direction, Weight]],
+    ) -> None:
+        """Store all `paths` leaving `node` by their direction."""
+        try:
+            self._paths[node].update(paths)
+        except KeyError:
+            self._paths[node] = dict(paths)
+
+    def merge_paths(
+        self,
+        paths: Iterable[
+            tuple[
+                tuple[tuple[int, int], Direction],
+                tuple[tuple[int, int], Direction],
+                Weight,
+            ]
+        ],
+    ) -> PathUpdateCounts:
+        """Add `paths` known by another robot like `add_paths`.
+
+        Instead of replacing the known paths, a path is only added if it
+        wins against the known paths at both of its ends by
+        `resolve_path_conflict`.  A known path it replaces is dropped at
+        its other end as well.  The `paths` are added strongest first,
+        so merging the map of one robot into that of another gives the
+        same map either way round, and merging it again changes
+        nothing.  Paths not added count as unchanged.
+
+        Conflicts chaining over the maps of more robots may still depend
+        on the order: a path lost against one which is replaced later is
+        not known anymore.
+        """
+        with self.batch() as counts:
+            for start, target, weight in sorted(
+                paths,
+                key=lambda path: (
+                    path[2] == BLOCKED, path[2], sorted(path[:2]),
+                ),
+                reverse=True,
+            ):
+                ends = ((start, (*target, weight)), (target, (*start, weight)))
+                known_paths = [
+                    self._paths.get(node, {}).get(direction)
+                    for (node, direction), _ in ends
+                ]
+                if not all(
+                    known is None or resolve_path_conflict(known, new) == new
+                    for known, (_, new) in zip(known_paths, ends)
+                ):
+                    for batch_counts in self._batches:
+                        batch_counts.unchanged += 1
+                    continue
+                self.add_path(start, target, weight)
+                for known, ((node, direction), new) in zip(known_paths, ends):
+                    if known is None or known[:2] == new[:2]:
+                        continue
+                    # The replaced path led to another end, which still
+                    # leads back here unless replaced as well.
+                    far_node, far_direction, _ = known
+                    far_path = self._paths.get(far_node, {}).get(far_direction)
+                    if far_path is not None and far_path[:2] == (node, direction):
+                        self._drop_path_end(far_node, far_direction)
+        return counts
+
+    def merge(self, other: "Planet") -> PathUpdateCounts:
+        """Merge the map explored by another robot into this one.
+
+        All paths of `other` are added by `merge_paths`.  The directions
+        available at the nodes scanned by either robot are united.
+        Returns how many of the paths of `other` were new, changed or
+        unchanged.
+        """
+        with self.batch():
+            counts = self.merge_paths(
+                (
+                    (node, direction),
+                    (target, target_direction),
+                    weight,
+                )
+                for node, node_paths in other.get_paths().items()
+                for direction, (target, target_direction, weight)
+                in node_paths.items()
+                # Each path is stored at both ends, take it only once.
+                if (node, direction) <= (target, target_direction)
+            )
+            for node, directions in other._known_node_directions.items():
+                self.set_available_node_directions(
+                    node,
+                    self._known_node_directions.get(node, set()) | directions,
+                )
+        return counts
 
-            record[start_direction] = (target, target_direction, weight)
+    def copy(self) -> "Planet":
+        """Return an independent planet knowing the same as this one.
+
+        The settings and drive times are copied as well, but not the
+        `journal`.  Changes to either planet do not affect the other.
+        """
+        planet = type(self)()
+        planet.engine = self.engine
+        planet.turn_costs = self.turn_costs
+        planet.drive_time_share = self.drive_time_share
+        planet.hierarchy_min_nodes = self.hierarchy_min_nodes
+        planet.restore(self.get_paths(), self._known_node_directions)
+        # Might be lower than derived from the current paths.
+        planet._weight_per_distance = self._weight_per_distance
+        planet._drive_times = dict(self._drive_times)
+        return planet
+
+    @contextmanager
+    def batch(self) -> Iterator[PathUpdateCounts]:
+        """Defer updating data derived from the paths until the end.
+
+        Use for adding many paths at once, e. g. a burst of
+        `pathUnveiled` messages:
+
+        >>> with planet.batch() as counts:
+        ...     planet.add_path(((0, 0), Direction.NORTH), ((0, 1), Direction.SOUTH), 1)
+        ...     planet.add_path(((0, 1), Direction.EAST), ((1, 1), Direction.WEST), 2)
+        >>> counts
+        PathUpdateCounts(new=2, changed=0, unchanged=0)
+
+        Yields the counts of new, changed and unchanged paths added
+        during the batch, filled in while adding them.  Batches can be
+        nested, the derived data is updated when the outermost one ends.
+        Until then, the `frontier` and the shortest paths of
+        `PathEngine.DYNAMIC` are outdated.  Which nodes are connected is
+        always up to date, so `shortest_path` finds targets reached by
+        paths added during the batch with the other engines.
+        """
+        counts = PathUpdateCounts()
+        self._batches.append(counts)
+        try:
+            yield counts
+        finally:
+            self._batches.pop()
+            if not self._batches:
+                self._apply_pending_changes()
+
+    def _apply_pending_changes(self) -> None:
+        """Update the data derived from the paths after a batch."""
+        for node in self._pending_nodes:
+            self._update_frontier(node)
+        changes = [
+            (node, direction, old_path, new_path)
+            for (node, direction), (old_path, new_path)
+            in self._pending_changes.items()
+            if old_path != new_path
+        ]
+        self._update_dynamic_paths(changes)
+        self._pending_nodes.clear()
+        self._pending_changes.clear()
+
+    def _update_components(self, changes: list[PathChange]) -> None:
+        """Unite the nodes connected by the changed paths."""
+        if self._components is None:
+            # Will be rebuilt anyway.
+            return
+        for _, _, old_path, new_path in changes:
+            if (old_path is not None and old_path[2] != BLOCKED
+                    and (new_path is None or new_path[2] == BLOCKED
+                         or new_path[0] != old_path[0])):
+                # A connection might have been removed, so rebuild when
+                # needed.
+                self._components = None
+                return
+        for node, _, _, new_path in changes:
+            if new_path is not None and new_path[2] != BLOCKED:
+                self._components.union(node, new_path[0])
+
+    def _get_components(self) -> DisjointSets:
+        """Return the connected components of the nodes, built if needed."""
+        if self._components is None:
+            components = DisjointSets()
+            for node, node_paths in self._paths.items():
+                for neighbor, _, weight in node_paths.values():
+                    if weight != BLOCKED:
+                        components.union(node, neighbor)
+            for node in self._frontier:
+                components.count_frontier(node, 1)
+            self._components = components
+        return self._components
+
+    def connected(self, node: tuple[int, int], other: tuple[int, int]) -> bool:
+        """Return whether a path between `node` and `other` is known."""
+        if node not in self._paths or other not in self._paths:
+            return False
+        components = self._get_components()
+        return components.find(node) == components.find(other)
+
+    def _update_dynamic_paths(self, changes: list[PathChange]) -> None:
+        """Repair the shortest paths kept for `PathEngine.DYNAMIC`."""
+        if changes and self._dynamic_paths is not None:
+            if self.engine is PathEngine.DYNAMIC:
+                self._dynamic_paths.update(changes)
+            else:
+                # Engine changed, no need to keep it up to date anymore.
+                self._dynamic_paths = None
+
+    def _store_path(
+        self,
+        node: tuple[int, int],
+        direction: Direction,
+        path: tuple[tuple[int, int], Direction, Weight],
+    ) -> Optional[tuple[tuple[int, int], Direction, Weight]]:
+        """Store the path leaving `node` in `direction`.
+
+        Returns the previously stored path, `None` if there was none.
+        """
+        try:
+            record = self._paths[node]
+        except KeyError:
+            # No prior paths at node `node` registered.
+            record = self._paths[node] = {}
+
+        old_path = record.get(direction)
+        record[direction] = path
+        return old_path
+
+    def _remove_path(
+        self,
+        node: tuple[int, int],
+        direction: Direction,
+    ) -> Optional[tuple[tuple[int, int], Direction, Weight]]:
+        """Remove the path leaving `node` in `direction`.
+
+        Returns the removed path, `None` if there was none.  Nodes left
+        without paths are removed as well.
+        """
+        record = self._paths.get(node)
+        if record is None:
+            return None
+        old_path = record.pop(direction, None)
+        if not record:
+            del self._paths[node]
+        return old_path
+
+    def _drop_path_end(self, node: tuple[int, int], direction: Direction) -> None:
+        """Forget the path leaving `node` in `direction`, if any.
+
+        Unlike `add_path`, only this end is changed.  Used for ends
+        leading back to a path replaced by `merge_paths`.
+        """
+        old_path = self._remove_path(node, direction)
+        if old_path is None:
+            return
+        self.generation += 1
+        self._explored_masks[node] &= ~DIRECTION_BITS[direction]
+        self._drive_times.pop((node, direction), None)
+        self._hierarchy = None
+        if self.journal is not None:
+            self.journal.record_dropped_path_end(node, direction)
+        self._apply_changes([(node, direction, old_path, None)])
 
     def set_available_node_directions(
         self,
@@ -102,7 +1176,65 @@ class Planet:
         This method should be called after the robot has scanned the
         paths at `node`, as it is assumed to have visited it.
         """
+        node = self.node_keys.intern(node)
+        if self._known_node_directions.get(node) != directions:
+            self.generation += 1
         self._known_node_directions[node] = directions
+        self._available_masks[node] = direction_mask(directions)
+        if self.journal is not None:
+            self.journal.record_node_directions(node, directions)
+        if self._batches:
+            self._pending_nodes.add(node)
+        else:
+            self._update_frontier(node)
+
+    def get_node_directions(self) -> dict[tuple[int, int], set[Direction]]:
+        """Return the directions available at each scanned node.
+
+        As set by `set_available_node_directions`, must not be modified.
+        """
+        return self._known_node_directions
+
+    @property
+    def frontier(self) -> set[tuple[int, int]]:
+        """Return all known nodes which are not completely explored.
+
+        The returned `set` is kept up to date by the planet and must not
+        be modified.
+        """
+        return self._frontier
+
+    def heuristic(self, node: tuple[int, int], target: tuple[int, int]) -> Weight:
+        """Return a lower bound of the path weight from `node` to `target`.
+
+        Each path weighs at least `grid_distance` between its end nodes
+        times the lowest weight per grid unit found among all known
+        paths, so does any path between `node` and `target`.  Rounded
+        down, as the weights are integers.  Without any known path
+        between two different nodes, no bound is known and `0` is
+        returned.
+        """
+        if self._weight_per_distance is None:
+            return 0
+        weight, distance = self._weight_per_distance
+        return grid_distance(node, target) * weight // distance
+
+    def _update_frontier(self, node: tuple[int, int]) -> None:
+        """Add or remove `node` from the frontier after a change at it."""
+        # Nodes without paths are not reachable at all, only scanned or
+        # their last path was dropped.
+        if node not in self._paths or self.is_completely_explored(node):
+            if node not in self._frontier:
+                return
+            self._frontier.remove(node)
+            difference = -1
+        else:
+            if node in self._frontier:
+                return
+            self._frontier.add(node)
+            difference = 1
+        if self._components is not None:
+            self._components.count_frontier(node, difference)
 
     # DO NOT EDIT THE METHOD SIGNATURE
     def get_paths(self) -> dict[
@@ -134,29 +1266,48 @@ class Planet:
     def is_completely_explored(self, node: tuple[int, int]) -> bool:
         """Return whether the given `node` is fully explored.
 
-        This checks whether `node` was already visited, so the number of
-        paths from it is known, and this number matches the number of
-        already completed paths at this node (either by the robot itself
-        or with the help of the server) or if it was not visited, but
-        all 4 possible directions are already fully explored, so a visit
-        is unnecessary.
+        This checks whether `node` was already visited, so the directions
+        of the paths from it are known, and all of them are completed
+        paths at this node (either by the robot itself or with the help
+        of the server) or if it was not visited, but all 4 possible
+        directions are already fully explored, so a visit is
+        unnecessary.  Both are single bit operations on the direction
+        masks of the node.
 
         It is assumed that `node` is valid, else a `KeyError` will be
         raised.
         """
-        completed_directions_number = len(self._paths[node])
-        return (
-            (visited := node in self._known_node_directions)
-            and len(self._known_node_directions[node])
-                == completed_directions_number
-            or not visited
-            and completed_directions_number == len(Direction)
+        explored = self._explored_masks[node]
+        try:
+            return not self._available_masks[node] & ~explored
+        except KeyError:
+            return explored == _ALL_DIRECTIONS
+
+    def unexplored_directions(self, node: tuple[int, int]) -> list[Direction]:
+        """Return the directions available at `node` without known paths.
+
+        It is assumed that `node` was visited, else a `KeyError` will be
+        raised.
+        """
+        return list(self._unexplored_directions(node))
+
+    def _unexplored_directions(
+        self,
+        node: tuple[int, int],
+    ) -> tuple[Direction, ...]:
+        """Return the directions available at `node` without known paths.
+
+        Like `unexplored_directions`, but as `tuple` from the table.
+        """
+        return ordered_mask_directions(
+            self._available_masks[node] & ~self._explored_masks.get(node, 0)
         )
 
     def next_direction(
         self,
         start: tuple[int, int],
-        target: Optional[tuple[int, int]] = None
+        target: Optional[tuple[int, int]] = None,
+        heading: Optional[Direction] = None,
     ) -> Optional[Direction]:
         """Return the next direction to head for from `start`.
 
@@ -167,26 +1318,38 @@ class Planet:
         signalling the completion of exploration (or that the target
         has been reached).
 
+        If `heading`, the direction the robot is looking to at `start`,
+        is given and `turn_costs` are set, the time for turning at the
+        nodes is taken into account (see `route`).
+
         Both `start` and `target` (if not `None`) are assumed to be
         valid coordinates, else a `KeyError` will be raised.
         """
         def random_direction():
-            return choice([
-                direction
-                for direction in self._known_node_directions[start]
-                if direction not in self._paths[start]
-            ])
-        if target is None and not self.is_completely_explored(start):
+            if heading is not None and self.turn_costs is not None:
+                # Choose the one requiring the fastest turn.
+                return min(
+                    self._unexplored_directions(start),
+                    key=lambda direction: self.turn_costs.get(
+                        turn(heading, direction), 0
+                    ),
+                )
+            return choice(self._unexplored_directions(start))
+        if target is None and start in self._frontier:
             # Choose randomly one of the remaining unexplored
             # directions.
             return random_direction()
         else:
-            shortest_path = self._shortest_path(start, target)
+            shortest_path = self._shortest_path(
+                start, target, heading, fastest=True,
+            )
 
             if target is not None:
                 if shortest_path is None:
                     # `target` not yet reachable, continue exploring normally.
-                    shortest_path = self._shortest_path(start)
+                    shortest_path = self._shortest_path(
+                        start, None, heading, fastest=True,
+                    )
                 elif not shortest_path:
                     # `shortest_path` is `[]` meaning we have already
                     # reached our `target`.
@@ -206,16 +1369,187 @@ class Planet:
                 # Return the direction towards our next target.
                 return shortest_path[0][1]
 
+    def route(
+        self,
+        start: tuple[int, int],
+        target: tuple[int, int],
+        heading: Optional[Direction] = None,
+    ) -> Optional[list[tuple[tuple[int, int], Direction]]]:
+        """Return the fastest known path from `start` to `target`.
+
+        Same as `shortest_path`, but if `heading`, the direction the
+        robot is looking to at `start`, is given and `turn_costs` are
+        set, the path with the lowest weight of all paths plus the
+        `turn_costs` of the turns before taking each of them is
+        returned.  If `drive_time_share` is set, the paths are weighted
+        by `path_cost` instead.
+        """
+        return self._shortest_path(start, target, heading, fastest=True)
+
+    def record_drive_time(
+        self,
+        start: tuple[tuple[int, int], Direction],
+        duration: float,
+    ) -> None:
+        """Record driving the path from `start` to have taken `duration` seconds.
+
+        Observations are kept per direction of driving and are dropped
+        once the path is found to lead somewhere else.  Unknown paths
+        are ignored.
+        """
+        node, direction = start
+        if direction not in self._paths.get(node, {}):
+            return
+        drives, total = self._drive_times.get(start, (0, 0.0))
+        self._drive_times[start] = (drives + 1, total + duration)
+
+    def drive_time(
+        self,
+        start: tuple[tuple[int, int], Direction],
+    ) -> Optional[float]:
+        """Return the mean observed duration of the path from `start`.
+
+        Returns `None` if the path has not been driven yet.
+        """
+        try:
+            drives, total = self._drive_times[start]
+        except KeyError:
+            return None
+        return total / drives
+
+    def path_cost(
+        self,
+        start: tuple[tuple[int, int], Direction],
+        seconds_weight: Optional[float] = None,
+    ) -> float:
+        """Return the cost of taking the path from `start` for routing.
+
+        Mixes the weight of the path with its mean observed drive time
+        by `drive_time_share`, converting seconds to weight by
+        `seconds_weight` (by default the ratio of weight and drive time
+        over all observed paths, see `seconds_weight`).  Falls back to
+        the weight if the path has not been driven yet or drive times
+        are not used.
+        """
+        node, direction = start
+        weight = self._paths[node][direction][2]
+        duration = self.drive_time(start)
+        if duration is None or self.drive_time_share is None:
+            return weight
+        if seconds_weight is None:
+            seconds_weight = self.seconds_weight()
+        return (
+            (1 - self.drive_time_share) * weight
+            + self.drive_time_share * seconds_weight * duration
+        )
+
+    def seconds_weight(self) -> float:
+        """Return the weight per second of driving over all observed paths.
+
+        Returns `1.0` if no free path has been driven yet.
+        """
+        weight = 0
+        duration = 0.0
+        for (node, direction), (drives, total) in self._drive_times.items():
+            path_weight = self._paths[node][direction][2]
+            if path_weight != BLOCKED:
+                weight += path_weight
+                duration += total / drives
+        if weight <= 0 or duration <= 0:
+            return 1.0
+        return weight / duration
+
+    def distances_from(self, start: tuple[int, int]) -> DistanceMap:
+        """Return the shortest paths from `start` to all reachable nodes.
+
+        Maps each node reachable from `start` to the weight of its
+        shortest path, the predecessor node on it and the direction to
+        take from the predecessor (both `None` for `start` itself), see
+        `DistanceMap`.  Unknown `start` nodes reach nothing.
+
+        The returned `dict` is cached until the map changes and must not
+        be modified.
+        """
+        if start not in self._paths:
+            return {}
+        self._check_cache()
+        try:
+            return self._distance_maps[start]
+        except KeyError:
+            pass
+
+        distances: dict[tuple[int, int], Weight] = {}
+        shortest_paths, _ = self._heap_search(start, lambda node: False, distances)
+        # Complete tree, so no other search from `start` is needed anymore.
+        self._search_trees[start] = shortest_paths
+        distance_map = self._distance_maps[start] = {
+            node: (distances[node], predecessor, direction)
+            for node, (predecessor, direction) in shortest_paths.items()
+        }
+        return distance_map
+
+    def nearest_of(
+        self,
+        start: tuple[int, int],
+        targets: Iterable[tuple[int, int]],
+    ) -> Optional[tuple[tuple[int, int], list[tuple[tuple[int, int], Direction]]]]:
+        """Return the nearest of `targets` and the shortest path to it.
+
+        The search stops as soon as the first of the `targets` is
+        reached.  Returns `None` if none of them is reachable from
+        `start`.
+        """
+        if start not in self._paths:
+            return None
+        self._check_cache()
+        targets = set(targets)
+
+        distance_map = self._distance_maps.get(start)
+        if distance_map is not None:
+            # Nodes are stored in the order they were settled.
+            goal = next(
+                (node for node in distance_map if node in targets), None,
+            )
+            shortest_paths = self._search_trees[start]
+        else:
+            shortest_paths, goal = self._heap_search(start, targets.__contains__)
+            if len(shortest_paths) > len(self._search_trees.get(start, ())):
+                self._search_trees[start] = shortest_paths
+
+        return None if goal is None else (goal, self._unroll(shortest_paths, goal))
+
+    def build_hierarchy(self) -> None:
+        """Build the contraction hierarchy answering all target queries.
+
+        Done automatically by the first target query outside of batches
+        after exploration completed if the map has at least
+        `hierarchy_min_nodes` nodes.  The hierarchy is dropped on the
+        next change of the map.
+        """
+        self._hierarchy = ContractionHierarchy(self._paths)
+
+    def _check_cache(self) -> None:
+        """Drop all cached search results if the map changed."""
+        if self._cache_generation != self.generation:
+            self._search_trees.clear()
+            self._search_goals.clear()
+            self._target_paths.clear()
+            self._distance_maps.clear()
+            self._cache_generation = self.generation
+
     def _shortest_path(
         self,
         start: tuple[int, int],
-        target: Optional[tuple[int, int]] = None
+        target: Optional[tuple[int, int]] = None,
+        heading: Optional[Direction] = None,
+        fastest: bool = False,
     ) -> Optional[list[tuple[tuple[int, int], Direction]]]:
         """Return the shortest path either to `target` or the next unexplored node.
 
         If `target` is `None`, returns the shortest path from `start` to
         the next unexplored node, else the shortest path from `start` to
-        `target`.
+        `target`.  If `fastest` is set, turns from `heading` and drive
+        times count as well where enabled (see `route`).
 
         If the `target` or the next unexplored node is the same as
         `start`, returns `[]`, else if no path is found, returns `None`.
@@ -225,12 +1559,124 @@ class Planet:
             # We cannot know a path as we don't even know the node.
             return None
 
+        if target is None:
+            if not self._get_components().frontier_count(start):
+                # No unexplored node reachable.
+                return None
+        elif not self.connected(start, target):
+            return None
+
+        if fastest and (
+            heading is not None and self.turn_costs is not None
+            or self.drive_time_share is not None
+        ):
+            return self._drive_search(
+                start,
+                heading,
+                self._frontier.__contains__ if target is None
+                else target.__eq__,
+            )
+
+        if target is not None:
+            # The frontier is outdated during batches.
+            if (self._hierarchy is None and not self._batches
+                    and not self._frontier
+                    and self.hierarchy_min_nodes is not None
+                    and len(self._paths) >= self.hierarchy_min_nodes):
+                # The map is fully known, only target queries are left.
+                self.build_hierarchy()
+            if self._hierarchy is not None:
+                return self._hierarchy.shortest_path(start, target)
+
+        if target is not None and self.engine is PathEngine.DYNAMIC:
+            if (self._dynamic_paths is None
+                    or self._dynamic_paths.source != target):
+                self._dynamic_paths = DynamicShortestPaths(self._paths, target)
+            return self._dynamic_paths.path_to_source(start)
+
+        self._check_cache()
+
+        if target is not None and self.engine in (
+            PathEngine.ASTAR, PathEngine.BIDIRECTIONAL,
+        ):
+            try:
+                shortest_path = self._target_paths[start, target]
+            except KeyError:
+                if self.engine is PathEngine.ASTAR:
+                    shortest_paths, goal = self._astar_search(start, target)
+                    shortest_path = (
+                        None if goal is None
+                        else self._unroll(shortest_paths, goal)
+                    )
+                else:
+                    shortest_path = self._bidirectional_search(start, target)
+                self._target_paths[start, target] = shortest_path
+            return None if shortest_path is None else list(shortest_path)
+
+        shortest_paths = self._search_trees.get(start)
+        if target is not None and shortest_paths is not None \
+                and target in shortest_paths:
+            # Shortest path to `target` already found.
+            return self._unroll(shortest_paths, target)
+        try:
+            goal = self._search_goals[start, target]
+        except KeyError:
+            pass
+        else:
+            return None if goal is None else self._unroll(shortest_paths, goal)
+
+        if target is None:
+            is_goal = self._frontier.__contains__
+        else:
+            def is_goal(node: tuple[int, int]) -> bool:
+                return node == target
+
+        if self.engine is not PathEngine.SCAN:
+            shortest_paths, goal = self._heap_search(start, is_goal)
+        else:
+            shortest_paths, goal = self._scan_search(start, is_goal)
+
+        if len(shortest_paths) > len(self._search_trees.get(start, ())):
+            self._search_trees[start] = shortest_paths
+        self._search_goals[start, target] = goal
+
+        if goal is None:
+            # No target found.
+            return None
+
+        return self._unroll(shortest_paths, goal)
+
+    @staticmethod
+    def _unroll(
+        shortest_paths: ShortestPathTree,
+        target: tuple[int, int],
+    ) -> list[tuple[tuple[int, int], Direction]]:
+        """Return the path from the start of `shortest_paths` to `target`.
+
+        If `target` is the start node itself, this is an empty `list`.
+        """
+        shortest_path: list[tuple[tuple[int, int], Direction]] = []
+        while (predecessor := shortest_paths[target])[0] is not None:
+            shortest_path.append(predecessor)
+            target = predecessor[0]
+        # Unrolled backwards, so restore the right order.
+        shortest_path.reverse()
+        return shortest_path
+
+    def _scan_search(
+        self,
+        start: tuple[int, int],
+        is_goal: Callable[[tuple[int, int]], bool],
+    ) -> tuple[ShortestPathTree, Optional[tuple[int, int]]]:
+        """Run Dijkstra's algorithm from `start` until `is_goal` holds.
+
+        Returns the predecessor nodes (and the directions to take from
+        them) of all nodes whose shortest path has been found, and the
+        first node fulfilling `is_goal`, or `None` if there is none.
+        """
         # Stores the resulting predecessor nodes forming the shortest path to
         # the desired target node.
-        shortest_paths: dict[
-            tuple[int, int],
-            tuple[Optional[tuple[int, int]], Optional[Direction]]
-        ] = {}
+        shortest_paths: ShortestPathTree = {}
         # A dictionary keeping track of the new neighbor nodes to check,
         # storing the current sum of weights to the node, the node
         # coordinates and the previous node we came from.
@@ -264,21 +1710,14 @@ class Planet:
             # ... and remove it from our checklist.
             del nodes_to_check[min_node]
 
-            min_node_paths = self._paths[min_node]
-
             # If this node is our target or meets our requirements, we
             # have found a shortest path and are finished.
-            if (target is not None and min_node == target
-                    or target is None
-                    and not self.is_completely_explored(min_node)):
-                # Set target to current node in case we are searching
-                # for the next unexplored node.
-                target = min_node
-                break
+            if is_goal(min_node):
+                return shortest_paths, min_node
 
             # Add or update this node's neighbors if shortest path to
             # them not already found and the path to them is not blocked.
-            for direction, (neighbor, _, weight) in min_node_paths.items():
+            for direction, (neighbor, _, weight) in self._paths[min_node].items():
                 if neighbor not in shortest_paths and weight != BLOCKED:
                     new_record = (min_weight + weight, min_node, direction)
                     try:
@@ -289,18 +1728,295 @@ class Planet:
                         if new_record[0] < neighbor_record[0]:
                             # Only update if weight is smaller.
                             nodes_to_check[neighbor] = new_record
-        else:
-            # No target found (`while` loop not aborted).
-            return None
 
-        # Reconstruct shortest path.
-        shortest_path: list[tuple[tuple[int, int], Direction]] = []
-        # If `start` is the same as `target`, this results in an empty `list`.
-        while (predecessor := shortest_paths[target])[0] is not None:
-            # Insert at the beginning as unroll backwards.
-            shortest_path.insert(0, predecessor)
-            target = predecessor[0]
+        # No target found (`while` loop not aborted).
+        return shortest_paths, None
+
+    def _heap_search(
+        self,
+        start: tuple[int, int],
+        is_goal: Callable[[tuple[int, int]], bool],
+        distances: Optional[dict[tuple[int, int], Weight]] = None,
+    ) -> tuple[ShortestPathTree, Optional[tuple[int, int]]]:
+        """Run Dijkstra's algorithm from `start` until `is_goal` holds.
+
+        Same as `_scan_search`, but keeps the nodes to check in a binary
+        heap. Outdated heap entries are not removed when a shorter path
+        to a node is found, but skipped once the node has been settled.
+
+        If `distances` is given, the weight of the shortest path to each
+        settled node is stored in it.
+        """
+        shortest_paths: ShortestPathTree = {}
+        # The current sum of weights to each node to check and the order
+        # in which the node was discovered.  The latter breaks ties the
+        # same way `_scan_search` does, which settles the node inserted
+        # first into its (insertion ordered) `dict`.
+        nodes_to_check: dict[tuple[int, int], tuple[Weight, int]] = {
+            start: (0, 0),
+        }
+        discovery_order = count(1)
+        heap: list[
+            tuple[
+                Weight, int, tuple[int, int],
+                Optional[tuple[int, int]], Optional[Direction],
+            ]
+        ] = [(0, 0, start, None, None)]
+
+        while heap:
+            min_weight, order, min_node, predecessor, direction = heappop(heap)
+            if min_node in shortest_paths:
+                # Outdated entry, a shorter path has already been found.
+                continue
+
+            shortest_paths[min_node] = (predecessor, direction)
+            del nodes_to_check[min_node]
+            if distances is not None:
+                distances[min_node] = min_weight
+
+            if is_goal(min_node):
+                return shortest_paths, min_node
+
+            for direction, (neighbor, _, weight) in self._paths[min_node].items():
+                if neighbor not in shortest_paths and weight != BLOCKED:
+                    new_weight = min_weight + weight
+                    try:
+                        neighbor_weight, order = nodes_to_check[neighbor]
+                    except KeyError:
+                        order = next(discovery_order)
+                    else:
+                        if new_weight >= neighbor_weight:
+                            # Only update if weight is smaller.
+                            continue
+                    nodes_to_check[neighbor] = (new_weight, order)
+                    heappush(
+                        heap,
+                        (new_weight, order, neighbor, min_node, direction),
+                    )
+
+        return shortest_paths, None
+
+    def _astar_search(
+        self,
+        start: tuple[int, int],
+        target: tuple[int, int],
+    ) -> tuple[ShortestPathTree, Optional[tuple[int, int]]]:
+        """Run the A* algorithm from `start` to `target`.
+
+        Same as `_heap_search`, but the nodes are ordered by their
+        current weight plus the `heuristic` weight left to `target`, so
+        nodes in the direction of `target` are searched first.  As the
+        heuristic never decreases by more than the weight of a path,
+        each node is settled only once.
+        """
+        shortest_paths: ShortestPathTree = {}
+        nodes_to_check: dict[tuple[int, int], tuple[Weight, int]] = {
+            start: (0, 0),
+        }
+        discovery_order = count(1)
+        heap: list[
+            tuple[
+                Weight, int, Weight, tuple[int, int],
+                Optional[tuple[int, int]], Optional[Direction],
+            ]
+        ] = [(self.heuristic(start, target), 0, 0, start, None, None)]
+
+        while heap:
+            _, order, min_weight, min_node, predecessor, direction = heappop(heap)
+            if min_node in shortest_paths:
+                # Outdated entry, a shorter path has already been found.
+                continue
+
+            shortest_paths[min_node] = (predecessor, direction)
+            del nodes_to_check[min_node]
+
+            if min_node == target:
+                return shortest_paths, min_node
+
+            for direction, (neighbor, _, weight) in self._paths[min_node].items():
+                if neighbor not in shortest_paths and weight != BLOCKED:
+                    new_weight = min_weight + weight
+                    try:
+                        neighbor_weight, order = nodes_to_check[neighbor]
+                    except KeyError:
+                        order = next(discovery_order)
+                    else:
+                        if new_weight >= neighbor_weight:
+                            # Only update if weight is smaller.
+                            continue
+                    nodes_to_check[neighbor] = (new_weight, order)
+                    heappush(heap, (
+                        new_weight + self.heuristic(neighbor, target),
+                        order, new_weight, neighbor, min_node, direction,
+                    ))
+
+        return shortest_paths, None
 
+    def _drive_search(
+        self,
+        start: tuple[int, int],
+        heading: Optional[Direction],
+        is_goal: Callable[[tuple[int, int]], bool],
+    ) -> Optional[list[tuple[tuple[int, int], Direction]]]:
+        """Return the fastest path from `start` to a node fulfilling `is_goal`.
+
+        Runs Dijkstra's algorithm on the states of the robot, i. e. the
+        node it is at together with the direction it is looking to,
+        starting with `heading` at `start`.  Taking a path first costs
+        the `turn_costs` of turning into its direction (if any and
+        `heading` is known), then its `path_cost`, and the robot arrives
+        looking away from the path.
+        """
+        turn_costs = self.turn_costs if heading is not None else None
+        heading = None if turn_costs is None else Direction(heading)
+        seconds_weight = self.seconds_weight()
+        # The predecessor state of each state settled and the direction
+        # to take from it.
+        shortest_paths: dict[
+            tuple[tuple[int, int], Optional[Direction]],
+            tuple[
+                Optional[tuple[tuple[int, int], Optional[Direction]]],
+                Optional[Direction],
+            ]
+        ] = {}
+        weights: dict[tuple[tuple[int, int], Optional[Direction]], float] = {
+            (start, heading): 0,
+        }
+        discovery_order = count(1)
+        heap: list[
+            tuple[
+                float, int, tuple[tuple[int, int], Optional[Direction]],
+                Optional[tuple[tuple[int, int], Optional[Direction]]],
+                Optional[Direction],
+            ]
+        ] = [(0, 0, (start, heading), None, None)]
+
+        while heap:
+            min_weight, _, state, predecessor, direction = heappop(heap)
+            if state in shortest_paths:
+                # Outdated entry, a shorter path has already been found.
+                continue
+            shortest_paths[state] = (predecessor, direction)
+
+            node, looking = state
+            if is_goal(node):
+                shortest_path = []
+                while (predecessor := shortest_paths[state])[0] is not None:
+                    shortest_path.append((predecessor[0][0], predecessor[1]))
+                    state = predecessor[0]
+                shortest_path.reverse()
+                return shortest_path
+
+            for direction, (neighbor, neighbor_direction, weight) \
+                    in self._paths[node].items():
+                if weight == BLOCKED:
+                    continue
+                new_state = (
+                    neighbor,
+                    None if turn_costs is None
+                    else opposite(neighbor_direction),
+                )
+                new_weight = min_weight + self.path_cost(
+                    (node, direction), seconds_weight,
+                )
+                if turn_costs is not None:
+                    new_weight += turn_costs.get(turn(looking, direction), 0)
+                if (new_state not in shortest_paths
+                        and new_weight < weights.get(new_state, inf)):
+                    weights[new_state] = new_weight
+                    heappush(heap, (
+                        new_weight, next(discovery_order), new_state,
+                        state, direction,
+                    ))
+
+        return None
+
+    def _bidirectional_search(
+        self,
+        start: tuple[int, int],
+        target: tuple[int, int],
+    ) -> Optional[list[tuple[tuple[int, int], Direction]]]:
+        """Return the shortest path from `start` to `target`.
+
+        Runs Dijkstra's algorithm forwards from `start` and backwards
+        from `target` (as each path is stored in both directions),
+        always continuing the search whose next node is closer.  Each
+        path found from a node reached by one search to a node reached by
+        the other one joins both to a path between `start` and `target`.
+        Once the next nodes of both searches are together at least as far
+        as the lightest of these, it is a shortest path.
+        """
+        if start == target:
+            return []
+
+        # The forward (first item) and backward (second item) searches:
+        # the current weights of the nodes reached, the predecessors
+        # of these nodes, the nodes already settled and the nodes to
+        # check.
+        weights: tuple[dict[tuple[int, int], Weight], ...] = (
+            {start: 0}, {target: 0},
+        )
+        predecessors: tuple[ShortestPathTree, ...] = (
+            {start: (None, None)}, {target: (None, None)},
+        )
+        settled: tuple[set[tuple[int, int]], ...] = (set(), set())
+        heaps: tuple[list[tuple[Weight, int, tuple[int, int]]], ...] = (
+            [(0, 0, start)], [(0, 0, target)],
+        )
+        discovery_order = count(1)
+        # The weight of the lightest path found and the path from a node
+        # reached forwards to a node reached backwards it consists of.
+        min_weight = inf
+        meeting: Optional[
+            tuple[tuple[int, int], Direction, tuple[int, int]]
+        ] = None
+
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= min_weight:
+                break
+
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            node_weight, _, node = heappop(heaps[side])
+            if node in settled[side]:
+                # Outdated entry, a shorter path has already been found.
+                continue
+            settled[side].add(node)
+
+            side_weights = weights[side]
+            other_weights = weights[1 - side]
+            for direction, (neighbor, neighbor_direction, weight) \
+                    in self._paths[node].items():
+                if weight == BLOCKED or neighbor in settled[side]:
+                    continue
+
+                new_weight = node_weight + weight
+                if new_weight < side_weights.get(neighbor, inf):
+                    side_weights[neighbor] = new_weight
+                    predecessors[side][neighbor] = (node, direction)
+                    heappush(
+                        heaps[side],
+                        (new_weight, next(discovery_order), neighbor),
+                    )
+                if (neighbor in other_weights
+                        and new_weight + other_weights[neighbor] < min_weight):
+                    min_weight = new_weight + other_weights[neighbor]
+                    meeting = (
+                        (node, direction, neighbor) if side == 0
+                        else (neighbor, neighbor_direction, node)
+                    )
+
+        if meeting is None:
+            return None
+
+        forward_node, direction, node = meeting
+        shortest_path = self._unroll(predecessors[0], forward_node)
+        shortest_path.append((forward_node, direction))
+        # Go back along the backward search, taking its paths the other
+        # way round.
+        while (predecessor := predecessors[1][node])[0] is not None:
+            predecessor, direction = predecessor
+            shortest_path.append((node, self._paths[predecessor][direction][1]))
+            node = predecessor
         return shortest_path
 
     # DO NOT EDIT THE METHOD SIGNATURE
@@ -323,3 +2039,263 @@ class Planet:
         None
         """
         return self._shortest_path(start, target)
+
+
+# The directions in the order of their slots in `CompactPaths`.
+SLOT_DIRECTIONS: Final = tuple(Direction)
+# The value marking an empty slot in `CompactPaths`.
+NO_NODE: Final = -1
+
+
+class CompactNodePaths(Mapping):
+    """The paths of a single node in `CompactPaths`.
+
+    Behaves like the `dict` mapping the directions of a node to its paths
+    in `Planet.get_paths`, but builds the path records on access.  Also
+    used for other stores with the same columns, see
+    `snapshot.PlanetSnapshot`.
+    """
+
+    __slots__ = ("_store", "_slot")
+
+    def __init__(self, store: "CompactPaths", node_id: int) -> None:
+        """Create a view on the paths of the node with `node_id` in `store`."""
+        self._store = store
+        # The first of the four slots of the node.
+        self._slot = node_id * len(Direction)
+
+    def __getitem__(
+        self,
+        direction: Direction,
+    ) -> tuple[tuple[int, int], Direction, Weight]:
+        slot = self._slot + direction // 90
+        store = self._store
+        neighbor = store.neighbors[slot]
+        if neighbor == NO_NODE:
+            raise KeyError(direction)
+        return (
+            store.nodes[neighbor],
+            SLOT_DIRECTIONS[store.arrivals[slot]],
+            store.weights[slot],
+        )
+
+    def __iter__(self) -> Iterator[Direction]:
+        neighbors = self._store.neighbors
+        for slot, direction in enumerate(SLOT_DIRECTIONS, self._slot):
+            if neighbors[slot] != NO_NODE:
+                yield direction
+
+    def __len__(self) -> int:
+        neighbors = self._store.neighbors
+        return sum(
+            neighbors[slot] != NO_NODE
+            for slot in range(self._slot, self._slot + len(Direction))
+        )
+
+    def items(self) -> list[
+        tuple[Direction, tuple[tuple[int, int], Direction, Weight]]
+    ]:
+        # Faster than going through `__getitem__` for each direction.
+        store = self._store
+        return [
+            (
+                direction,
+                (
+                    store.nodes[neighbor],
+                    SLOT_DIRECTIONS[store.arrivals[slot]],
+                    store.weights[slot],
+                ),
+            )
+            for slot, direction in enumerate(SLOT_DIRECTIONS, self._slot)
+            if (neighbor := store.neighbors[slot]) != NO_NODE
+        ]
+
+    def values(self) -> list[tuple[tuple[int, int], Direction, Weight]]:
+        return [path for _, path in self.items()]
+
+
+class CompactPaths(Mapping):
+    """Memory saving storage of the paths on a planet.
+
+    The nodes are numbered in the order they become known.  Each node has
+    four slots, one per direction, in each of the `array`s storing the
+    number of the node a path leads to (`NO_NODE` if there is no path),
+    the direction it arrives in (as index into `SLOT_DIRECTIONS`) and
+    its weight.
+
+    Maps each node to a `CompactNodePaths`, so it can be read like the
+    `dict` returned by `Planet.get_paths`.  Numbers are never reused, a
+    node whose paths were all removed keeps its number, but is left out.
+    """
+
+    __slots__ = ("ids", "nodes", "neighbors", "arrivals", "weights", "_empty")
+
+    def __init__(self) -> None:
+        """Create an empty storage."""
+        # The number of each node and the node for each number.
+        self.ids: dict[tuple[int, int], int] = {}
+        self.nodes: list[tuple[int, int]] = []
+        self.neighbors = array("i")
+        self.arrivals = array("b")
+        self.weights = array("i")
+        # The nodes numbered, but without paths since all were removed.
+        self._empty: set[tuple[int, int]] = set()
+
+    def __getitem__(self, node: tuple[int, int]) -> CompactNodePaths:
+        if node in self._empty:
+            raise KeyError(node)
+        return CompactNodePaths(self, self.ids[node])
+
+    def __contains__(self, node: object) -> bool:
+        return node in self.ids and node not in self._empty
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        if not self._empty:
+            return iter(self.nodes)
+        return (node for node in self.nodes if node not in self._empty)
+
+    def __len__(self) -> int:
+        return len(self.nodes) - len(self._empty)
+
+    def node_id(self, node: tuple[int, int]) -> int:
+        """Return the number of `node`, adding it if not known yet."""
+        try:
+            return self.ids[node]
+        except KeyError:
+            node_id = self.ids[node] = len(self.nodes)
+            self.nodes.append(node)
+            self.neighbors.extend((NO_NODE,) * len(Direction))
+            self.arrivals.extend((0,) * len(Direction))
+            self.weights.extend((0,) * len(Direction))
+            return node_id
+
+    def store(
+        self,
+        node: tuple[int, int],
+        direction: Direction,
+        path: tuple[tuple[int, int], Direction, Weight],
+    ) -> Optional[tuple[tuple[int, int], Direction, Weight]]:
+        """Store the path leaving `node` in `direction`.
+
+        Returns the previously stored path, `None` if there was none.
+        """
+        node_id = self.node_id(node)
+        neighbor_id = self.node_id(path[0])
+        self._empty.discard(node)
+        old_path = CompactNodePaths(self, node_id).get(direction)
+        slot = node_id * len(Direction) + direction // 90
+        self.neighbors[slot] = neighbor_id
+        self.arrivals[slot] = path[1] // 90
+        self.weights[slot] = path[2]
+        return old_path
+
+    def remove(
+        self,
+        node: tuple[int, int],
+        direction: Direction,
+    ) -> Optional[tuple[tuple[int, int], Direction, Weight]]:
+        """Remove the path leaving `node` in `direction`.
+
+        Returns the removed path, `None` if there was none.
+        """
+        if node not in self:
+            return None
+        node_id = self.ids[node]
+        node_paths = CompactNodePaths(self, node_id)
+        old_path = node_paths.get(direction)
+        self.neighbors[node_id * len(Direction) + direction // 90] = NO_NODE
+        if not node_paths:
+            self._empty.add(node)
+        return old_path
+
+
+class _CompactNodeKeys(NodeKeys):
+    """The canonical tuples of a `CompactPlanet`, those of its paths.
+
+    Needs no table of its own, as `CompactPaths` keeps the tuple of each
+    node numbered.  Nodes not numbered yet are returned as given.
+    """
+
+    __slots__ = ("_paths",)
+
+    def __init__(self, paths: CompactPaths) -> None:
+        """Use the nodes numbered by `paths`."""
+        super().__init__()
+        self._paths = paths
+
+    def intern(self, node: tuple[int, int]) -> tuple[int, int]:
+        paths = self._paths
+        try:
+            return paths.nodes[paths.ids[node]]
+        except KeyError:
+            return node
+
+    def __len__(self) -> int:
+        return len(self._paths.nodes)
+
+
+class CompactPlanet(Planet):
+    """A `Planet` storing its paths in `CompactPaths`.
+
+    Needs a fraction of the memory for large planets at the cost of
+    slower searches, as the path records are built on each access.
+    """
+
+    __slots__ = ("_paths_dict", "_paths_dict_generation")
+
+    def __init__(self) -> None:
+        """Initialize the data structure."""
+        super().__init__()
+        self._paths: CompactPaths = CompactPaths()
+        # The result of the last `get_paths` call and the `generation` it
+        # belongs to.
+        self._paths_dict: Optional[dict[
+            tuple[int, int],
+            dict[Direction, tuple[tuple[int, int], Direction, Weight]]
+        ]] = None
+        self._paths_dict_generation: int = 0
+        self.node_keys = _CompactNodeKeys(self._paths)
+
+    def _store_path(
+        self,
+        node: tuple[int, int],
+        direction: Direction,
+        path: tuple[tuple[int, int], Direction, Weight],
+    ) -> Optional[tuple[tuple[int, int], Direction, Weight]]:
+        return self._paths.store(node, direction, path)
+
+    def _remove_path(
+        self,
+        node: tuple[int, int],
+        direction: Direction,
+    ) -> Optional[tuple[tuple[int, int], Direction, Weight]]:
+        return self._paths.remove(node, direction)
+
+    def _store_paths(
+        self,
+        node: tuple[int, int],
+        paths: Mapping[Direction, tuple[tuple[int, int], Direction, Weight]],
+    ) -> None:
+        for direction, path in paths.items():
+            self._paths.store(node, direction, path)
+
+    def get_paths(self) -> dict[
+        tuple[int, int],
+        dict[
+            Direction,
+            tuple[tuple[int, int], Direction, Weight]
+        ]
+    ]:
+        """Return all known paths, see `Planet.get_paths`.
+
+        The `dict` is only built when the paths changed since the last
+        call and must not be modified.
+        """
+        if (self._paths_dict is None
+                or self._paths_dict_generation != self.generation):
+            self._paths_dict = {
+                node: dict(node_paths.items())
+                for node, node_paths in self._paths.items()
+            }
+            self._paths_dict_generation = self.generation
+        return self._paths_dict
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+# ATTENTION: Do not import the ev3dev.ev3 module in this file.
+import random
+from dataclasses import dataclass, field
+from math import isqrt
+from typing import Optional
+
+from directions import neighbor_node, opposite
+from planet import BLOCKED, Direction, Planet, Weight
+
+
+@dataclass
+class SyntheticPlanet:
+    """A generated planet, see `generate_planet`."""
+    # The paths in the order to add them, as arguments to `Planet.add_path`.
+    paths: list[
+        tuple[
+            tuple[tuple[int, int], Direction],
+            tuple[tuple[int, int], Direction],
+            Weight,
+        ]
+    ] = field(default_factory=list)
+    # The directions available at the nodes already scanned.
+    node_directions: dict[tuple[int, int], set[Direction]] = field(
+        default_factory=dict,
+    )
+    # The node the robot starts at, always scanned.
+    start: tuple[int, int] = (0, 0)
+
+    @property
+    def nodes(self) -> list[tuple[int, int]]:
+        """Return all nodes with paths, ordered by coordinates."""
+        return sorted(
+            {node for start, end, _ in self.paths for node, _ in (start, end)}
+        )
+
+    def build(self, planet: Optional[Planet] = None) -> Planet:
+        """Add all paths and scanned nodes to `planet` (a new one by default)."""
+        if planet is None:
+            planet = Planet()
+        for start, end, weight in self.paths:
+            planet.add_path(start, end, weight)
+        for node, directions in self.node_directions.items():
+            planet.set_available_node_directions(node, directions)
+        return planet
+
+
+def generate_planet(
+    nodes: int,
+    seed: int = 0,
+    loop_share: float = 0.3,
+    self_loop_share: float = 0.02,
+    blocked_share: float = 0.05,
+    explored_share: float = 0.7,
+) -> SyntheticPlanet:
+    """Generate a random planet with about `nodes` nodes on a grid.
+
+    Like the planets of the course, the nodes lie on a grid and are
+    connected to their grid neighbors: a random spanning tree keeps the
+    planet connected and `loop_share` of the other neighbors are
+    connected as well, closing loops.  Weights do not depend on the
+    grid distance: paths between neighbors mostly weigh 5, sometimes 10
+    or 15 as for curved paths.  Additionally, `self_loop_share` of the
+    nodes have a path leading back to themselves, weighing 5 to 20,
+    `blocked_share` of the paths closing loops are blocked and
+    `explored_share` of the nodes are already scanned (the others make
+    up the frontier).  Equal arguments always give the same planet.
+    """
+    rng = random.Random(seed)
+    width = max(1, isqrt(nodes - 1) + 1) if nodes > 0 else 0
+    grid = [(x, y) for y in range(width) for x in range(width)][:nodes]
+    on_grid = set(grid)
+
+    # Connect the grid by a random spanning tree (randomized Kruskal).
+    neighbors = [
+        (node, direction)
+        for node in grid
+        for direction in (Direction.NORTH, Direction.EAST)
+        if _grid_neighbor(node, direction)[0] in on_grid
+    ]
+    rng.shuffle(neighbors)
+    parents = {node: node for node in grid}
+
+    def find(node):
+        while parents[node] != node:
+            parents[node] = node = parents[parents[node]]
+        return node
+
+    planet = SyntheticPlanet(start=grid[0] if grid else (0, 0))
+    # The directions used at each node.
+    used: dict[tuple[int, int], set[Direction]] = {node: set() for node in grid}
+    loops = []
+    for node, direction in neighbors:
+        neighbor, arrival = _grid_neighbor(node, direction)
+        root, neighbor_root = find(node), find(neighbor)
+        if root != neighbor_root:
+            parents[root] = neighbor_root
+        elif rng.random() >= loop_share:
+            continue
+        else:
+            loops.append(len(planet.paths))
+        weight = rng.choice((1, 1, 1, 2, 3)) * 5
+        planet.paths.append(((node, direction), (neighbor, arrival), weight))
+        used[node].add(direction)
+        used[neighbor].add(arrival)
+
+    # Only block loops to keep all nodes reachable.
+    for index in loops:
+        if rng.random() < blocked_share:
+            start, end, _ = planet.paths[index]
+            planet.paths[index] = (start, end, BLOCKED)
+
+    for node in grid:
+        free = [
+            direction for direction in Direction if direction not in used[node]
+        ]
+        if len(free) >= 2 and rng.random() < self_loop_share:
+            first, second = rng.sample(free, 2)
+            planet.paths.append(
+                ((node, first), (node, second), rng.randint(1, 4) * 5),
+            )
+            used[node].update((first, second))
+
+    rng.shuffle(planet.paths)
+    for node in grid:
+        if node == planet.start or rng.random() < explored_share:
+            planet.node_directions[node] = set(used[node])
+    return planet
+
+
+def _grid_neighbor(
+    node: tuple[int, int],
+    direction: Direction,
+) -> tuple[tuple[int, int], Direction]:
+    """Return the grid neighbor of `node` in `direction` and the arrival at it."""
+    return neighbor_node(node, direction), opposite(direction)
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+
+# ATTENTION: Do not import the ev3dev.ev3 module in this file.
+from collections import deque
+from dataclasses import dataclass, field
+from itertools import combinations
+from threading import Event, Lock, Thread
+from time import thread_time
+from typing import Iterable, Optional
+
+from exploration import ExplorationPlanner
+from planet import BLOCKED, Direction, Planet, Weight, opposite
+
+
+@dataclass
+class Arrival:
+    """A way the current drive may end, to plan the next direction for."""
+    # The end of the path driven on, as node and direction.
+    start: tuple[tuple[int, int], Direction]
+    # The end of the path arrived at.
+    end: tuple[tuple[int, int], Direction]
+    # The weight of the path the server is to reply, `None` for any
+    # weight of a path not known before, see `odometry_arrivals`.
+    weight: Optional[Weight]
+    # The directions the scan of the node arrived at is to find.
+    directions: set[Direction]
+    # The target to reach, if any.
+    target: Optional[tuple[int, int]] = None
+
+
+@dataclass
+class PlannedAnswer:
+    """The direction to select for an `Arrival`, see `BackgroundPlanner`."""
+    arrival: Arrival
+    # The direction to continue driving in, `None` if finished.
+    direction: Optional[Direction]
+    # The `Planet.generation` the planet has once the arrival happened.
+    generation: int
+    # The planner on the copy of the planet, holding the planned tour.
+    explorer: ExplorationPlanner = field(repr=False)
+
+
+def departure_arrivals(
+    planet: Planet,
+    start: tuple[tuple[int, int], Direction],
+    target: Optional[tuple[int, int]] = None,
+) -> list[Arrival]:
+    """Return the ways driving from `start` may plausibly end.
+
+    If the path from `start` is known, it leads to its known end with
+    the directions found there before, or all direction combinations
+    possible if that node was never scanned.  Either way, the path may
+    turn out to be blocked, leading back to `start`.
+    """
+    node, _ = start
+    arrivals = []
+    path = planet.get_paths().get(node, {}).get(start[1])
+    if path is not None and path[2] != BLOCKED:
+        end_node, end_direction, weight = path
+        arrivals.extend(
+            Arrival(start, (end_node, end_direction), weight, directions, target)
+            for directions in possible_directions(planet, end_node, end_direction)
+        )
+    node_directions = planet.get_node_directions().get(node)
+    if node_directions is not None:
+        arrivals.append(Arrival(start, start, BLOCKED, node_directions, target))
+    return arrivals
+
+
+def odometry_arrivals(
+    planet: Planet,
+    start: tuple[tuple[int, int], Direction],
+    ends: Iterable[tuple[tuple[int, int], Direction]],
+    target: Optional[tuple[int, int]] = None,
+) -> list[Arrival]:
+    """Return the ways driving the unknown path from `start` may end.
+
+    `ends` are the ends the path may lead to according to odometry,
+    most likely first, with all directions their scan may find.  The
+    weight of the path is not known before the server replies, so only
+    answers not depending on it are planned for these arrivals (see
+    `BackgroundPlanner`).  Returns no arrivals if the path from `start`
+    is known, `departure_arrivals` covers those.
+    """
+    node, direction = start
+    if direction in planet.get_paths().get(node, {}):
+        return []
+    return [
+        Arrival(start, end, None, directions, target)
+        for end in ends
+        for directions in possible_directions(planet, *end)
+    ]
+
+
+def possible_directions(
+    planet: Planet,
+    node: tuple[int, int],
+    arrival: Direction,
+) -> list[set[Direction]]:
+    """Return the directions a scan of `node` may find.
+
+    Only those found before if `node` was scanned, else all combinations
+    including the direction `arrival` of the path arrived on and those
+    of the paths known at `node`.
+    """
+    known_directions = planet.get_node_directions().get(node)
+    if known_directions is not None:
+        return [known_directions]
+    required = {arrival, *planet.get_paths().get(node, {})}
+    others = [direction for direction in Direction if direction not in required]
+    return [
+        {*required, *directions}
+        for count in range(len(others) + 1)
+        for directions in combinations(others, count)
+    ]
+
+
+class BackgroundPlanner:
+    """Plans the next direction for the next node while driving there.
+
+    `start` is called when leaving a node with the ways the drive may
+    end, `add` once arrived with those odometry suggests.  A thread then
+    applies each of them to its own copy of the planet, as if the
+    server replied the path and the scan found the directions, and asks
+    a copy of the `ExplorationPlanner` for the next direction.  Once
+    the server replied, `commit` drops the arrivals at other nodes.
+    After the scan, `lookup` returns the answer matching the planet if
+    one is ready, else the direction has to be planned synchronously as
+    before.
+
+    Arrivals with any weight are only answered if the node has
+    unexplored directions left and the target, if any, is not
+    reachable, as the explorer then turns to one of them regardless of
+    the weights.
+
+    The thread competes with driving for the CPU, so each run of it
+    (started by `start`, or by `add` once idle) spends at most about
+    `time_budget` seconds of CPU time and plans at most `max_arrivals`
+    arrivals, the most likely first.  The arrivals left are dropped,
+    their directions are planned synchronously if they happen.
+
+    An answer only matches if the planet changed exactly like its
+    arrival, checked by the path and directions stored at the node and
+    the `Planet.generation`.  Drive times recorded meanwhile are not
+    taken into account.  Only the copies are used from the thread, so
+    the planet may change freely while planning.
+    """
+
+    __slots__ = (
+        "explorer", "time_budget", "max_arrivals", "_base", "_pending",
+        "_thread", "_running", "_cancelled", "_committed", "_answers", "_lock",
+    )
+
+    def __init__(
+        self,
+        explorer: ExplorationPlanner,
+        time_budget: float = 0.2,
+        max_arrivals: int = 12,
+    ) -> None:
+        """Plan ahead for `explorer` and its planet.
+
+        `time_budget` is the CPU time in seconds and `max_arrivals` the
+        number of arrivals each run of the thread may plan.
+        """
+        self.explorer = explorer
+        self.time_budget = time_budget
+        self.max_arrivals = max_arrivals
+        # The copy of the explorer planned from and the generation of the
+        # planet when it was copied, `None` before `start`.
+        self._base: Optional[tuple[ExplorationPlanner, int]] = None
+        # The arrivals left to plan for, most likely first.
+        self._pending: deque[Arrival] = deque()
+        # The thread planning the pending arrivals, if started.
+        self._thread: Optional[Thread] = None
+        # Whether `_thread` is still planning.
+        self._running = False
+        # Set to stop the running thread early.
+        self._cancelled = Event()
+        # The ends of the path the server replied, see `commit`.
+        self._committed: Optional[
+            tuple[
+                tuple[tuple[int, int], Direction],
+                tuple[tuple[int, int], Direction],
+            ]
+        ] = None
+        # The answers planned so far.
+        self._answers: list[PlannedAnswer] = []
+        self._lock = Lock()
+
+    def start(self, arrivals: Iterable[Arrival]) -> None:
+        """Start planning for `arrivals`, dropping all previous answers.
+
+        The planet is copied right away, before it changes again.
+        """
+        self.cancel()
+        planet = self.explorer.planet.copy()
+        self._base = (self.explorer.copy(planet), self.explorer.planet.generation)
+        self.add(arrivals)
+
+    def add(self, arrivals: Iterable[Arrival]) -> None:
+        """Plan for more `arrivals` of the drive planned for by `start`.
+
+        They are planned on the same copy of the planet after all
+        arrivals given before.  Ignored if not `start`ed.
+        """
+        with self._lock:
+            if self._base is None:
+                return
+            self._pending.extend(arrivals)
+            if self._running or not self._pending:
+                return
+            self._running = True
+            self._thread = Thread(
+                target=self._plan,
+                args=(*self._base, self._cancelled),
+                name="planner",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def _next_arrival(
+        self,
+        cancelled: Event,
+        exhausted: bool = False,
+    ) -> Optional[Arrival]:
+        """Return the next arrival to plan for, `None` to stop planning.
+
+        If the run is `exhausted`, the pending arrivals are dropped.
+        """
+        with self._lock:
+            if exhausted and not cancelled.is_set():
+                self._pending.clear()
+            while self._pending and not cancelled.is_set():
+                arrival = self._pending.popleft()
+                if self._matches_committed(arrival):
+                    return arrival
+            if not cancelled.is_set():
+                self._running = False
+            return None
+
+    def _matches_committed(self, arrival: Arrival) -> bool:
+        """Return whether `arrival` agrees with the path replied if any."""
+        return self._committed is None or self._committed == (
+            arrival.start, arrival.end,
+        )
+
+    def _plan(
+        self,
+        explorer: ExplorationPlanner,
+        generation: int,
+        cancelled: Event,
+    ) -> None:
+        """Plan the next direction for the pending arrivals.
+
+        `explorer` plans on a copy of the planet at `generation`, within
+        the `time_budget` and `max_arrivals` of this run.
+        """
+        deadline = thread_time() + self.time_budget
+        planned = 0
+        while (arrival := self._next_arrival(
+            cancelled,
+            planned >= self.max_arrivals or thread_time() >= deadline,
+        )) is not None:
+            planned += 1
+            planet = explorer.planet.copy()
+            arrival_explorer = explorer.copy(planet)
+            # Only the time left of the budget for improving the tour.
+            arrival_explorer.time_budget = min(
+                arrival_explorer.time_budget, max(deadline - thread_time(), 0),
+            )
+            node, end_direction = arrival.end
+            # Any weight gives the same changes of the generation for
+            # paths not known before.
+            planet.add_path(
+                arrival.start,
+                arrival.end,
+                1 if arrival.weight is None else arrival.weight,
+            )
+            planet.set_available_node_directions(node, arrival.directions)
+            if arrival.weight is None and not (
+                node in planet.frontier and (
+                    arrival.target is None
+                    or planet.shortest_path(node, arrival.target) is None
+                )
+            ):
+                # The route and tour depend on the weight, only exploring
+                # the node itself does not.
+                continue
+            # Like `Node.select_path`.
+            direction = arrival_explorer.next_direction(
+                node,
+                arrival.target,
+                heading=opposite(end_direction),
+            )
+            answer = PlannedAnswer(
+                arrival,
+                direction,
+                generation + planet.generation - explorer.planet.generation,
+                arrival_explorer,
+            )
+            with self._lock:
+                if not cancelled.is_set():
+                    self._answers.append(answer)
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """Wait at most `timeout` seconds for the pending arrivals."""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def cancel(self) -> None:
+        """Stop planning and drop all answers."""
+        with self._lock:
+            self._cancelled.set()
+            self._cancelled = Event()
+            self._thread = None
+            self._running = False
+            self._base = None
+            self._pending.clear()
+            self._committed = None
+            self._answers = []
+
+    def commit(
+        self,
+        start: tuple[tuple[int, int], Direction],
+        end: tuple[tuple[int, int], Direction],
+    ) -> None:
+        """Keep only the answers for the path from `start` to `end`.
+
+        Call once the server replied the path driven, planning continues
+        only for the arrivals at `end`, so their answers are ready as
+        soon as possible.
+        """
+        with self._lock:
+            self._committed = (start, end)
+            self._answers = [
+                answer for answer in self._answers
+                if self._matches_committed(answer.arrival)
+            ]
+            self._pending = deque(
+                arrival for arrival in self._pending
+                if self._matches_committed(arrival)
+            )
+
+    def lookup(
+        self,
+        node: tuple[int, int],
+        target: Optional[tuple[int, int]] = None,
+    ) -> Optional[PlannedAnswer]:
+        """Return the answer planned for the arrival at `node`, if any.
+
+        Call after the path and the scanned directions were added to the
+        planet.  The tour of the answer is adopted by the explorer and
+        the planning stopped, `None` is returned if no answer matches.
+        """
+        planet = self.explorer.planet
+        paths = planet.get_paths()
+        node_directions = planet.get_node_directions()
+        with self._lock:
+            answers = self._answers
+        for answer in answers:
+            arrival = answer.arrival
+            (start_node, start_direction), (end_node, end_direction) = (
+                arrival.start, arrival.end,
+            )
+            path = paths.get(start_node, {}).get(start_direction)
+            if (
+                end_node == node
+                and arrival.target == target
+                and answer.generation == planet.generation
+                and path is not None
+                and path[:2] == (end_node, end_direction)
+                and (
+                    path[2] == arrival.weight
+                    or arrival.weight is None and path[2] != BLOCKED
+                )
+                and node_directions.get(node) == arrival.directions
+            ):
+                self.cancel()
+                self.explorer.adopt(answer.explorer)
+                return answer
+        self.cancel()
+        return None
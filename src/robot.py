@@ -14,7 +14,13 @@ from communication import (
     PathRecord, PathStatus, PlanetRecord, ServerMessageType, StartRecord,
     TargetRecord, WeightedPathRecord,
 )
-from planet import BLOCKED, Direction, Planet, opposite
+from exploration import ExplorationPlanner
+from directions import (
+    Direction, direction_mask, mask_directions, opposite, rotate, rotate_mask,
+    round_direction,
+)
+from planet import BLOCKED, Planet
+from planner import BackgroundPlanner, departure_arrivals, odometry_arrivals
 
 
 # class to switch between States
@@ -25,6 +31,10 @@ class Robot:
         # Communication is initialized at first node.
         self.communication: Optional[Communication] = None
         self.planet = Planet()
+        # Plans the order of exploring the unexplored nodes.
+        self.explorer = ExplorationPlanner(self.planet)
+        # Plans the next direction at the next node while driving there.
+        self.planner = BackgroundPlanner(self.explorer)
         # for switching states
         # attribute where current states gets saved
         self.state = None
@@ -63,6 +73,11 @@ class Robot:
         self.start_record: StartRecord = StartRecord(0, 0, 0)
         # The target to reach.
         self.target: Optional[tuple[int, int]] = None
+        # When the robot started following the current path (see
+        # `time.monotonic`) and how long driving the last path took, for
+        # learning the drive times of the paths.
+        self.drive_started: Optional[float] = None
+        self.drive_duration: Optional[float] = None
 
     def set_start_state(self, state):
         # for switching to start state
@@ -414,6 +429,9 @@ class Node(State):
         self.east = []
         self.south = []
         self.west = []
+        # The nodes we may have arrived at, most likely first, see
+        # `round_odo`.
+        self.end_candidates: list[tuple[int, int]] = []
         # true incoming direction
         alpha = 0
         # needed for saving scanned lines after node scan in global directions
@@ -423,9 +441,24 @@ class Node(State):
 
     def run(self):
         # node methods:
+        if self.robot.drive_started is not None:
+            self.robot.drive_duration = time.monotonic() - self.robot.drive_started
         if self.robot.communication is not None:
             # Perform odometry only when needed (starting from second node).
             x, y, direction = self.round_odo()
+            # Plan for the nodes the server may correct us to while
+            # waiting for its reply.
+            self.robot.planner.add(
+                odometry_arrivals(
+                    self.robot.planet,
+                    (
+                        self.robot.start_record.start_node,
+                        self.robot.start_record.startDirection,
+                    ),
+                    [(node, Direction(direction)) for node in self.end_candidates],
+                    self.robot.target,
+                )
+            )
         else:
             # Set dummy values for communication.
             x, y, direction = 0, 0, 0
@@ -464,7 +497,19 @@ class Node(State):
         self.robot.odo_motor_positions.clear()
         # print(f'{len(self.robot.odo_motor_positions)=}')
 
+        # Plan for the next node while driving there.
+        self.robot.planner.start(
+            departure_arrivals(
+                self.robot.planet,
+                (
+                    self.robot.start_record.start_node,
+                    self.robot.start_record.startDirection,
+                ),
+                self.robot.target,
+            )
+        )
         # back to line following
+        self.robot.drive_started = time.monotonic()
         next_state = Follower(self.robot)
         # calling the switch method of robot class which needs new state as an instance
         self.robot.switch_state(next_state)
@@ -488,8 +533,12 @@ class Node(State):
         x = -x * math.pi * 5.6 / 360 / 50
         y = y * math.pi * 5.6 / 360 / 50
         global_direction_change = global_direction_change * 180 / math.pi
-        global_direction_change = round(-global_direction_change / 90) * 90
-        global_direction_change = opposite(self.robot.start_record.startDirection + global_direction_change)
+        global_direction_change = opposite(
+            rotate(
+                self.robot.start_record.startDirection,
+                round_direction(-global_direction_change),
+            )
+        )
         x, y = mat_rotate(self.robot.start_record.startDirection * math.pi / 180, x, y)
         x += self.robot.start_record.startX
         y += self.robot.start_record.startY
@@ -503,11 +552,18 @@ class Node(State):
             x, y, alpha = (self.robot.start_record.startX,
                            self.robot.start_record.startY,
                            self.robot.start_record.startDirection)
+            self.end_candidates = []
         else:
             x, y, alpha = self.odometry()
             # Better rounding using the node colors.
             rounding_methods = (math.ceil, math.floor)
-            _, (x, y) = min(
+            node_key = self.robot.planet.node_keys.node_key
+            points = {
+                node_key(x_method(x), y_method(y))
+                for x_method in rounding_methods
+                for y_method in rounding_methods
+            }
+            candidates = sorted(
                 map(
                     lambda point: (
                         math.sqrt(
@@ -516,26 +572,28 @@ class Node(State):
                         ),
                         point,
                     ),
-                    filter(
-                        lambda point: (
-                            (-1)**(
-                                point[0] - self.robot.start_record.startX
-                                + point[1] - self.robot.start_record.startY
-                            ) == int(
-                                ((self.robot.current_node_colour
-                                    == self.robot.last_node_colour)
-                                    - 0.5)
-                                * 2
-                            )
-                        ),
-                        [
-                            (x_method(x), y_method(y))
-                            for x_method in rounding_methods
-                            for y_method in rounding_methods
-                        ]
-                    )
+                    points,
                 )
             )
+            matching = [
+                point
+                for _, point in candidates
+                if (-1)**(
+                    point[0] - self.robot.start_record.startX
+                    + point[1] - self.robot.start_record.startY
+                ) == int(
+                    ((self.robot.current_node_colour
+                        == self.robot.last_node_colour)
+                        - 0.5)
+                    * 2
+                )
+            ]
+            x, y = matching[0]
+            # The nearest nodes the server may correct us to, in case the
+            # node colors were misread.
+            self.end_candidates = matching + [
+                point for _, point in candidates if point not in matching
+            ]
 
         return x, y, alpha
 
@@ -609,24 +667,26 @@ class Node(State):
                 # north
                 self.north.append(x)
                 self.nodes[0] = True
-        # says how many intervals we need to rotate, for example if incoming at west 270 its looking to the east before
-        # and after scanning that's 90, and it needs to rotate 1 interval, that is from east to north
-        swap = -int(((self.alpha - 180) % 360) / 90)
-        # swap all values 1 interval in contrary to clock direction every iteration
-        if swap > 0:
-            for i in range(swap):
-                self.north, self.east, self.south, self.west = self.east, self.south, self.west, self.north
-                # same for where the lines are
-                self.nodes[0], self.nodes[3], self.nodes[2], self.nodes[1] = (
-                    self.nodes[3], self.nodes[2], self.nodes[1],
-                    self.nodes[0])
-        elif swap < 0:
-            for i in range(0, swap, -1):
-                self.north, self.west, self.south, self.east = self.west, self.south, self.east, self.north
-                # same for where the lines are
-                self.nodes[0], self.nodes[3], self.nodes[2], self.nodes[1] = (
-                    self.nodes[3], self.nodes[2], self.nodes[1],
-                    self.nodes[0])
+        # The intervals are relative to where the robot is looking, away
+        # from the path it arrived on: if incoming at west 270 it's
+        # looking to the east, so what is ahead (north above) is east.
+        looking = opposite(self.alpha)
+        lines = dict(zip(Direction, (self.north, self.east, self.south, self.west)))
+        self.north, self.east, self.south, self.west = (
+            lines[rotate(direction, -looking)] for direction in Direction
+        )
+        # same for where the lines are
+        found = mask_directions(
+            rotate_mask(
+                direction_mask(
+                    direction
+                    for direction, available in zip(Direction, self.nodes)
+                    if available
+                ),
+                looking,
+            )
+        )
+        self.nodes = [direction in found for direction in Direction]
 
     # so Rob can choose a line to continue from Node and move in position there
     def choose_line(self):
@@ -731,16 +791,19 @@ class Node(State):
 
     def handle_messages(self, timeout: float = 0) -> None:
         """Wait at most `timeout` seconds for new messages and handle them."""
-        try:
-            while True:
-                handler, args, kwargs = self.message_queue.get(
-                    block=True,
-                    timeout=timeout,
-                )
-                handler(*args, **kwargs)
-        except Empty:
-            # `timeout` reached and no message arrived, finished.
-            return
+        # Messages often arrive in bursts, so update the planet only once
+        # after handling all of them.
+        with self.robot.planet.batch():
+            try:
+                while True:
+                    handler, args, kwargs = self.message_queue.get(
+                        block=True,
+                        timeout=timeout,
+                    )
+                    handler(*args, **kwargs)
+            except Empty:
+                # `timeout` reached and no message arrived, finished.
+                return
 
     def close_communication(self) -> None:
         """Stop handling messages."""
@@ -760,7 +823,7 @@ class Node(State):
         # The path we came from is most likely not to be used again in
         # the other direction, so mark it as blocked.
         origin = (
-            (self.corrected_record.endX, self.corrected_record.endY),
+            self.corrected_record.end_node,
             self.corrected_record.endDirection,
         )
         self.robot.planet.add_path(origin, origin, BLOCKED)
@@ -775,6 +838,27 @@ class Node(State):
             endDirection=weighted_path_record.endDirection,
         )
         self._handle_path_unveiled_message(weighted_path_record)
+        # Only plan ahead for where we really are.
+        self.robot.planner.commit(
+            (
+                weighted_path_record.start_node,
+                weighted_path_record.startDirection,
+            ),
+            (
+                weighted_path_record.end_node,
+                weighted_path_record.endDirection,
+            ),
+        )
+        if (self.robot.drive_duration is not None
+                and not self.robot.path_blocked):
+            # Driving back from a blocked path is not representative.
+            self.robot.planet.record_drive_time(
+                (
+                    weighted_path_record.start_node,
+                    weighted_path_record.startDirection,
+                ),
+                self.robot.drive_duration,
+            )
 
     def _handle_path_select_message(
             self,
@@ -788,18 +872,18 @@ class Node(State):
     ) -> None:
         self.robot.planet.add_path(
             (
-                (weighted_path_record.startX, weighted_path_record.startY),
+                weighted_path_record.start_node,
                 weighted_path_record.startDirection,
             ),
             (
-                (weighted_path_record.endX, weighted_path_record.endY),
+                weighted_path_record.end_node,
                 weighted_path_record.endDirection,
             ),
             weighted_path_record.pathWeight,
         )
 
     def _handle_target_message(self, target_record: TargetRecord) -> None:
-        self.robot.target = (target_record.targetX, target_record.targetY)
+        self.robot.target = target_record.target_node
 
     def _handle_done_message(self, message_record: MessageRecord) -> None:
         self.close_communication()
@@ -811,17 +895,25 @@ class Node(State):
         """Use `planet` to calculate the best new path."""
         # Add the available directions of current node.
         self.robot.planet.set_available_node_directions(
-            (self.corrected_record.endX, self.corrected_record.endY),
+            self.corrected_record.end_node,
             {
                 direction
                 for direction, available in zip(Direction, self.nodes)
                 if available
             },
         )
-        self.selected_direction = self.robot.planet.next_direction(
-            (self.corrected_record.endX, self.corrected_record.endY),
-            self.robot.target,
-        )
+        node = self.corrected_record.end_node
+        answer = self.robot.planner.lookup(node, self.robot.target)
+        if answer is not None:
+            # Already planned while driving here.
+            self.selected_direction = answer.direction
+        else:
+            self.selected_direction = self.robot.explorer.next_direction(
+                node,
+                self.robot.target,
+                # The robot looks away from the path it arrived on.
+                heading=opposite(self.corrected_record.endDirection),
+            )
         if self.selected_direction is None:
             # No path selected, probably finished.
             return
@@ -838,8 +930,7 @@ class Node(State):
 
     def check_if_finished(self) -> None:
         """Check if exploration is completed or our target reached."""
-        if ((self.corrected_record.endX, self.corrected_record.endY)
-                == self.robot.target):
+        if self.corrected_record.end_node == self.robot.target:
             # Target reached, publishing that.
             self.robot.communication.send_message_type(
                 ClientMessageType.TARGET_REACHED,
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+
+# ATTENTION: Do not import the ev3dev.ev3 module in this file.
+import mmap
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterator, Mapping, Sequence
+from struct import Struct
+from typing import Optional
+
+from directions import direction_mask, mask_directions
+from node_keys import NodeKeys
+from planet import (
+    NO_NODE, SLOT_DIRECTIONS, CompactNodePaths, Direction, Planet, Weight,
+    bulk_loading,
+)
+
+# The file starts with the magic bytes, the format version and the
+# number of nodes, followed by the columns of the node and path tables,
+# all little endian:
+#
+#   x coordinates:        int32 per node, nodes sorted by coordinates
+#   y coordinates:        int32 per node
+#   neighbors:            int32 per direction of each node, the number of
+#                         the node the path leads to, `NO_NODE` if none
+#   weights:              int32 per direction of each node
+#   direction masks:      uint8 per node, bit 4 set if the node was
+#                         scanned and the lower bits its directions
+#   arrival directions:   int8 per direction of each node, the index of
+#                         the direction the path arrives in
+#
+# The slots of the directions of each node are in the order of
+# `Direction`, like in `planet.CompactPaths`.
+_HEADER: Struct = Struct("<8sII")
+_MAGIC = b"PLANET\x00\x00"
+_VERSION = 1
+# The bit marking scanned nodes in the direction masks.
+_SCANNED = 1 << len(Direction)
+
+
+def save_snapshot(
+    path: str,
+    paths: Mapping[
+        tuple[int, int],
+        Mapping[Direction, tuple[tuple[int, int], Direction, Weight]]
+    ],
+    node_directions: Optional[Mapping[tuple[int, int], set[Direction]]] = None,
+) -> None:
+    """Write a snapshot of the map `paths` to the file at `path`.
+
+    `paths` are given like returned by `Planet.get_paths`,
+    `node_directions` like returned by `Planet.get_node_directions`
+    (no node scanned by default).
+    """
+    if node_directions is None:
+        node_directions = {}
+    nodes = sorted({*paths, *node_directions})
+    ids = {node: node_id for node_id, node in enumerate(nodes)}
+    neighbors = array("i", (NO_NODE,) * (len(nodes) * len(Direction)))
+    weights = array("i", bytes(neighbors.itemsize * len(neighbors)))
+    arrivals = array("b", bytes(len(neighbors)))
+    masks = array("B", bytes(len(nodes)))
+    for node, node_paths in paths.items():
+        first_slot = ids[node] * len(Direction)
+        for direction, (target, target_direction, weight) in node_paths.items():
+            slot = first_slot + direction // 90
+            neighbors[slot] = ids[target]
+            arrivals[slot] = target_direction // 90
+            weights[slot] = weight
+    for node, directions in node_directions.items():
+        masks[ids[node]] = _SCANNED | direction_mask(directions)
+
+    columns = [
+        array("i", (x for x, _ in nodes)),
+        array("i", (y for _, y in nodes)),
+        neighbors,
+        weights,
+        masks,
+        arrivals,
+    ]
+    with open(path, "wb") as file:
+        file.write(_HEADER.pack(_MAGIC, _VERSION, len(nodes)))
+        for column in columns:
+            if sys.byteorder != "little":
+                column.byteswap()
+            column.tofile(file)
+
+
+class _SnapshotNodes(Sequence):
+    """The coordinates of the nodes in a snapshot by their number."""
+
+    __slots__ = ("_xs", "_ys")
+
+    def __init__(self, xs: Sequence[int], ys: Sequence[int]) -> None:
+        self._xs = xs
+        self._ys = ys
+
+    def __getitem__(self, node_id: int) -> tuple[int, int]:
+        return (self._xs[node_id], self._ys[node_id])
+
+    def __len__(self) -> int:
+        return len(self._xs)
+
+
+class PlanetSnapshot(Mapping):
+    """A planet snapshot file mapped into memory.
+
+    Maps each node to its paths like the `dict` returned by
+    `Planet.get_paths`, but reads them from the file only on access.
+    Nodes are found by binary search on their coordinates.  Use
+    `load` to build a `Planet` from it.
+    """
+
+    __slots__ = (
+        "nodes", "neighbors", "weights", "masks", "arrivals", "_mmap", "_views",
+    )
+
+    def __init__(self, path: str) -> None:
+        """Map the snapshot file at `path` into memory."""
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, node_count = _HEADER.unpack_from(self._mmap)
+        if magic != _MAGIC or version != _VERSION:
+            self._mmap.close()
+            raise ValueError(f"{path!r} is no planet snapshot")
+        slot_count = node_count * len(Direction)
+        columns = (
+            ("i", node_count), ("i", node_count), ("i", slot_count),
+            ("i", slot_count), ("B", node_count), ("b", slot_count),
+        )
+        size = _HEADER.size + sum(
+            array(format).itemsize * length for format, length in columns
+        )
+        file_size = len(self._mmap)
+        if file_size != size:
+            self._mmap.close()
+            raise ValueError(
+                f"Snapshot {path!r} has {file_size} bytes instead of {size} "
+                f"for {node_count} nodes"
+            )
+        views = []
+        offset = _HEADER.size
+        for format, length in columns:
+            size = array(format).itemsize * length
+            if sys.byteorder == "little":
+                view = memoryview(self._mmap)[offset:offset + size].cast(format)
+            else:
+                # Needs to be converted, so read it into memory.
+                view = array(format, self._mmap[offset:offset + size])
+                view.byteswap()
+            views.append(view)
+            offset += size
+        self._views = views
+        xs, ys, self.neighbors, self.weights, self.masks, self.arrivals = views
+        self.nodes = _SnapshotNodes(xs, ys)
+
+    def close(self) -> None:
+        """Unmap the file, the snapshot cannot be used anymore."""
+        for view in self._views:
+            if isinstance(view, memoryview):
+                view.release()
+        self._views = []
+        self._mmap.close()
+
+    def __enter__(self) -> "PlanetSnapshot":
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.close()
+
+    def node_id(self, node: tuple[int, int]) -> int:
+        """Return the number of `node`, raise `KeyError` if not contained."""
+        node_id = bisect_left(self.nodes, node)
+        if node_id == len(self.nodes) or self.nodes[node_id] != node:
+            raise KeyError(node)
+        return node_id
+
+    def __getitem__(self, node: tuple[int, int]) -> CompactNodePaths:
+        node_paths = CompactNodePaths(self, self.node_id(node))
+        if not node_paths:
+            # Only scanned, like in `Planet.get_paths`.
+            raise KeyError(node)
+        return node_paths
+
+    def __contains__(self, node: object) -> bool:
+        try:
+            self[node]
+        except (KeyError, TypeError):
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        # Only nodes with paths like `Planet.get_paths`.
+        for node_id, node in enumerate(self.nodes):
+            if CompactNodePaths(self, node_id):
+                yield node
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def available_directions(
+        self,
+        node: tuple[int, int],
+    ) -> Optional[set[Direction]]:
+        """Return the directions available at `node`, `None` if not scanned."""
+        try:
+            return _mask_directions(self.masks[self.node_id(node)])
+        except KeyError:
+            return None
+
+    def get_paths(self, node_keys: Optional[NodeKeys] = None) -> dict[
+        tuple[int, int],
+        dict[Direction, tuple[tuple[int, int], Direction, Weight]]
+    ]:
+        """Return all paths as a `dict` like `Planet.get_paths`.
+
+        The nodes are the canonical tuples of `node_keys` if given.
+        """
+        nodes = list(self.nodes)
+        if node_keys is not None:
+            nodes = [node_keys.intern(node) for node in nodes]
+        neighbors = self.neighbors
+        arrivals = self.arrivals
+        weights = self.weights
+        paths = {}
+        with bulk_loading():
+            for node_id, node in enumerate(nodes):
+                first_slot = node_id * len(Direction)
+                node_paths = {
+                    direction: (
+                        nodes[neighbor],
+                        SLOT_DIRECTIONS[arrivals[slot]],
+                        weights[slot],
+                    )
+                    for slot, direction in enumerate(SLOT_DIRECTIONS, first_slot)
+                    if (neighbor := neighbors[slot]) != NO_NODE
+                }
+                if node_paths:
+                    paths[node] = node_paths
+        return paths
+
+    def get_node_directions(self) -> dict[tuple[int, int], set[Direction]]:
+        """Return the directions at all scanned nodes.
+
+        Like `Planet.get_node_directions`.
+        """
+        return {
+            node: _mask_directions(mask)
+            for node, mask in zip(self.nodes, self.masks)
+            if mask & _SCANNED
+        }
+
+    def load(self, planet: Optional[Planet] = None) -> Planet:
+        """Add the whole snapshot to `planet` (a new `Planet` by default)."""
+        if planet is None:
+            planet = Planet()
+        with bulk_loading():
+            planet.restore(
+                self.get_paths(planet.node_keys), self.get_node_directions(),
+            )
+        return planet
+
+
+def _mask_directions(mask: int) -> Optional[set[Direction]]:
+    """Return the directions in a direction mask, `None` if not scanned."""
+    if not mask & _SCANNED:
+        return None
+    return set(mask_directions(mask & ~_SCANNED))
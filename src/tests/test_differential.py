@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from differential import VARIANTS, find_mismatch, format_case, run, shrink
+from planet import Planet
+from planet_generator import generate_planet
+
+
+class LongPathsForgottenPlanet(Planet):
+    """A planet wrongly finding no paths over more than two nodes."""
+
+    def shortest_path(self, start, target):
+        path = super().shortest_path(start, target)
+        return None if path is not None and len(path) > 2 else path
+
+
+class TestDifferential(unittest.TestCase):
+    """Test comparing the path engines on random planets."""
+
+    def test_engines_agree(self):
+        """Check that all engines answer like the scan engine."""
+        self.assertEqual(run(8, max_nodes=20, seed=1), {})
+
+    def test_mismatch_shrunk(self):
+        """Check that mismatches are found and shrunk to small planets."""
+        synthetic = generate_planet(40, seed=2, explored_share=1.0)
+        self.assertIsNone(find_mismatch(synthetic, VARIANTS["heap"]))
+        self.assertIsNotNone(find_mismatch(synthetic, LongPathsForgottenPlanet))
+        shrunk = shrink(synthetic, LongPathsForgottenPlanet)
+        self.assertIsNotNone(find_mismatch(shrunk, LongPathsForgottenPlanet))
+        # Three paths in a row, reached from a single scanned node.
+        self.assertEqual(len(shrunk.paths), 3)
+        self.assertEqual(len(shrunk.node_directions), 1)
+        self.assertEqual(len(format_case(shrunk).splitlines()), 4)
+
+        failures = run(
+            3, max_nodes=20, variants={"forgetful": LongPathsForgottenPlanet},
+        )
+        self.assertEqual(len(failures["forgetful"][0].paths), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
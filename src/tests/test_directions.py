@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from directions import (
+    DIRECTION_BITS, Direction, direction_mask, mask_directions, neighbor_node,
+    opposite, ordered_mask_directions, rotate, rotate_mask, round_direction,
+    turn,
+)
+import planet
+
+
+class TestDirections(unittest.TestCase):
+    """Test the direction tables."""
+
+    def test_opposite(self):
+        """Check that opposite directions are `Direction` members."""
+        self.assertIs(opposite(Direction.NORTH), Direction.SOUTH)
+        self.assertIs(opposite(Direction.WEST), Direction.EAST)
+        self.assertIs(opposite(90), Direction.WEST)
+        self.assertIs(planet.opposite, opposite)
+        self.assertIs(planet.Direction, Direction)
+
+    def test_rotate(self):
+        """Check turning by multiples of 90°."""
+        self.assertIs(rotate(Direction.EAST, 90), Direction.SOUTH)
+        self.assertIs(rotate(Direction.EAST, -90), Direction.NORTH)
+        self.assertIs(rotate(Direction.WEST, 450), Direction.NORTH)
+        self.assertIs(rotate(Direction.SOUTH, Direction.WEST), Direction.EAST)
+
+    def test_turn(self):
+        """Check the angles between directions."""
+        self.assertEqual(turn(Direction.NORTH, Direction.WEST), 270)
+        self.assertEqual(turn(Direction.WEST, Direction.NORTH), 90)
+        for direction in Direction:
+            for other in Direction:
+                self.assertIs(rotate(direction, turn(direction, other)), other)
+
+    def test_round_direction(self):
+        """Check rounding angles to directions."""
+        self.assertIs(round_direction(10.5), Direction.NORTH)
+        self.assertIs(round_direction(-80), Direction.WEST)
+        self.assertIs(round_direction(585), Direction.SOUTH)
+
+    def test_neighbor_node(self):
+        """Check the grid steps in each direction."""
+        self.assertEqual(neighbor_node((2, -3), Direction.NORTH), (2, -2))
+        self.assertEqual(neighbor_node((2, -3), Direction.EAST), (3, -3))
+        self.assertEqual(neighbor_node((2, -3), Direction.SOUTH), (2, -4))
+        self.assertEqual(neighbor_node((2, -3), Direction.WEST), (1, -3))
+
+    def test_masks(self):
+        """Check direction masks."""
+        self.assertEqual(DIRECTION_BITS[Direction.SOUTH], 4)
+        mask = direction_mask({Direction.NORTH, Direction.WEST})
+        self.assertEqual(mask, 9)
+        self.assertEqual(mask_directions(mask), {Direction.NORTH, Direction.WEST})
+        self.assertEqual(
+            mask_directions(rotate_mask(mask, 90)),
+            {Direction.EAST, Direction.NORTH},
+        )
+        self.assertEqual(rotate_mask(mask, -180), direction_mask(
+            {Direction.SOUTH, Direction.EAST},
+        ))
+        self.assertEqual(mask_directions(0), set())
+        self.assertEqual(
+            ordered_mask_directions(mask), (Direction.NORTH, Direction.WEST),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+
+import random
+import unittest
+from math import inf
+from time import process_time
+
+from exploration import ExplorationPlanner, assign_frontier
+from planet import Direction, Planet
+from planet_generator import generate_planet
+
+
+class TestExplorationPlanner(unittest.TestCase):
+    """Test the planning of exploration tours."""
+
+    def setUp(self):
+        """Instantiate a planet with a single line of nodes.
+
+            (-3,0)--(-2,0)--(-1,0)--(0,0)--(1,0)--(2,0)--...--(6,0)
+              ?                    (start)               ?           ?
+
+        Only the nodes marked with `?` are not completely explored.
+        """
+        self.planet = Planet()
+        for x in range(-3, 6):
+            self.planet.add_path(
+                ((x, 0), Direction.EAST), ((x + 1, 0), Direction.WEST), 1,
+            )
+        for x in range(-3, 7):
+            directions = set(self.planet.get_paths()[(x, 0)])
+            if x in (-3, 2, 6):
+                directions.add(Direction.NORTH)
+            self.planet.set_available_node_directions((x, 0), directions)
+        self.planner = ExplorationPlanner(self.planet)
+
+    def test_tour(self):
+        """Check that the tour avoids driving back and forth."""
+        # Heading for the nearest node first means driving back over the
+        # start to reach the last one.
+        self.assertEqual(self.planet.next_direction((0, 0)), Direction.EAST)
+        self.assertEqual(self.planner.plan((0, 0)), [(-3, 0), (2, 0), (6, 0)])
+        self.assertEqual(self.planner.next_direction((0, 0)), Direction.WEST)
+
+    def test_target(self):
+        """Check that reachable targets are preferred."""
+        self.assertEqual(
+            self.planner.next_direction((0, 0), (4, 0)), Direction.EAST,
+        )
+        self.assertIsNone(self.planner.next_direction((4, 0), (4, 0)))
+        # Not reachable, so keep exploring.
+        self.assertEqual(
+            self.planner.next_direction((0, 0), (-9, 9)), Direction.WEST,
+        )
+
+    def test_towards_target(self):
+        """Check that unreachable targets are explored towards."""
+        # The target is beyond the last node, which is further away than
+        # the first one.
+        self.assertEqual(
+            self.planner.next_direction((0, 0), (9, 0)), Direction.EAST,
+        )
+        self.assertEqual(
+            self.planner.next_direction((0, 0), (-9, 1)), Direction.WEST,
+        )
+        self.planner.target_directed = False
+        self.assertEqual(
+            self.planner.next_direction((0, 0), (9, 0)), Direction.WEST,
+        )
+
+    def test_towards_target_at_frontier(self):
+        """Check that unexplored directions leading to the target come first."""
+        self.planet.set_available_node_directions(
+            (0, 0), {Direction.EAST, Direction.WEST, Direction.SOUTH, Direction.NORTH},
+        )
+        self.assertEqual(
+            self.planner.next_direction((0, 0), (0, -4)), Direction.SOUTH,
+        )
+        self.assertEqual(
+            self.planner.next_direction((0, 0), (1, 4)), Direction.NORTH,
+        )
+
+    def test_replanned(self):
+        """Check that the tour follows changes of the frontier."""
+        self.planner.plan((0, 0))
+        self.planet.set_available_node_directions(
+            (-3, 0), {Direction.EAST},
+        )
+        self.planet.set_available_node_directions(
+            (-1, 0), {Direction.EAST, Direction.WEST, Direction.SOUTH},
+        )
+        self.assertEqual(self.planner.plan((0, 0)), [(-1, 0), (2, 0), (6, 0)])
+        for x in (-1, 2, 6):
+            self.planet.set_available_node_directions(
+                (x, 0), set(self.planet.get_paths()[(x, 0)]),
+            )
+        self.assertEqual(self.planner.plan((0, 0)), [])
+        self.assertIsNone(self.planner.next_direction((0, 0)))
+
+    def test_not_worse_than_nearest(self):
+        """Check that tours are never heavier than nearest node first."""
+        rng = random.Random(102)
+        planet = Planet()
+        for x in range(8):
+            for y in range(8):
+                if x < 7:
+                    planet.add_path(
+                        ((x, y), Direction.EAST), ((x + 1, y), Direction.WEST),
+                        rng.randint(1, 5),
+                    )
+                if y < 7:
+                    planet.add_path(
+                        ((x, y), Direction.NORTH), ((x, y + 1), Direction.SOUTH),
+                        rng.randint(1, 5),
+                    )
+        for node, paths in planet.get_paths().items():
+            if rng.random() < 0.7:
+                planet.set_available_node_directions(node, set(paths))
+        start = min(node for node in planet.get_paths() if node not in planet.frontier)
+        planner = ExplorationPlanner(planet)
+        tour = planner.plan(start)
+        self.assertEqual(sorted(tour), sorted(planet.frontier))
+        self.assertLessEqual(
+            planner.tour_weight(start, tour),
+            planner.tour_weight(
+                start,
+                planner._nearest_neighbor_tour(
+                    start, planet.frontier, planet.distances_from(start), inf,
+                ),
+            ),
+        )
+
+    def test_time_budget(self):
+        """Check that planning on large planets keeps to the time budget."""
+        synthetic = generate_planet(4000, seed=1)
+        planet = synthetic.build()
+        planner = ExplorationPlanner(planet, time_budget=0.05)
+        for _ in range(2):
+            time = process_time()
+            tour = planner.plan(synthetic.start)
+            # Some slack for the search from the start.
+            self.assertLess(process_time() - time, 0.5)
+            self.assertEqual(sorted(tour), sorted(planet.frontier))
+            # Changed map, the previous tour is adapted.
+            node, node_paths = next(iter(planet.get_paths().items()))
+            direction, (end, end_direction, weight) = next(iter(node_paths.items()))
+            planet.add_path((node, direction), (end, end_direction), weight + 5)
+
+    def test_assign_frontier(self):
+        """Check that the frontier is split among the robots."""
+        self.assertEqual(
+            assign_frontier(self.planet, [(0, 0)]), [[(2, 0), (6, 0), (-3, 0)]],
+        )
+        # Each robot explores its own side.
+        self.assertEqual(
+            assign_frontier(self.planet, [(-1, 0), (4, 0)]),
+            [[(-3, 0)], [(2, 0), (6, 0)]],
+        )
+        self.assertEqual(
+            assign_frontier(self.planet, [(-1, 0), (4, 0), (5, 0)]),
+            [[(-3, 0)], [(2, 0)], [(6, 0)]],
+        )
+        # Unreachable starts get nothing.
+        self.assertEqual(
+            assign_frontier(self.planet, [(9, 9), (0, 0)])[0], [],
+        )
+
+    def test_assigned(self):
+        """Check that only the assigned nodes are planned while left."""
+        self.planner.assigned = {(6, 0)}
+        self.assertEqual(self.planner.plan((0, 0)), [(6, 0)])
+        self.assertEqual(self.planner.next_direction((0, 0)), Direction.EAST)
+        self.planet.set_available_node_directions(
+            (6, 0), set(self.planet.get_paths()[(6, 0)]),
+        )
+        # Help exploring the rest.
+        self.assertEqual(self.planner.plan((0, 0)), [(2, 0), (-3, 0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import unittest
+
+from journal import PlanetJournal
+from planet import CompactPlanet, Direction, Planet
+
+
+class TestPlanetJournal(unittest.TestCase):
+    """Test recording planets to journals and replaying them."""
+
+    def setUp(self):
+        """Create a journal in a temporary directory."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "planet.journal")
+        self.planet = Planet()
+        self.journal = PlanetJournal(self.path, self.planet)
+        self.addCleanup(self.journal.close)
+
+    def fill(self, planet):
+        """Explore some paths on `planet`, replacing some of them."""
+        planet.add_path(((0, 0), Direction.NORTH), ((0, 1), Direction.SOUTH), 1)
+        planet.add_path(((0, 1), Direction.EAST), ((1, 1), Direction.WEST), 2)
+        planet.add_path(((0, 0), Direction.EAST), ((0, 0), Direction.EAST), -1)
+        planet.set_available_node_directions(
+            (0, 0), {Direction.NORTH, Direction.EAST, Direction.SOUTH},
+        )
+        planet.set_available_node_directions(
+            (0, 1), {Direction.SOUTH, Direction.EAST},
+        )
+        # Replaced at one end only, the other end keeps the old path.
+        planet.add_path(((0, 1), Direction.EAST), ((1, 0), Direction.NORTH), 3)
+        planet.add_path(((0, 0), Direction.NORTH), ((0, 1), Direction.SOUTH), 4)
+
+    def assertSamePlanet(self, planet, other):
+        """Assert that both planets know the same."""
+        self.assertEqual(planet.get_paths(), other.get_paths())
+        self.assertEqual(planet.get_node_directions(), other.get_node_directions())
+        self.assertEqual(planet.frontier, other.frontier)
+        self.assertEqual(
+            planet.shortest_path((0, 0), (1, 0)),
+            other.shortest_path((0, 0), (1, 0)),
+        )
+
+    def test_replay(self):
+        """Check that a replayed planet knows the same as the recorded one."""
+        self.fill(self.planet)
+        self.journal.close()
+        self.assertEqual(self.journal.records, 7)
+        for planet_class in (Planet, CompactPlanet):
+            planet = planet_class()
+            journal = PlanetJournal(self.path, planet)
+            self.addCleanup(journal.close)
+            self.assertSamePlanet(planet, self.planet)
+            self.assertIs(planet.journal, journal)
+            journal.close()
+            self.assertIsNone(planet.journal)
+
+    def test_partial_record(self):
+        """Check that a record cut off by a crash is dropped."""
+        self.fill(self.planet)
+        self.journal.close()
+        size = os.path.getsize(self.path)
+        with open(self.path, "ab") as file:
+            file.write(b"\x01\x02")
+        planet = Planet()
+        journal = PlanetJournal(self.path, planet)
+        self.addCleanup(journal.close)
+        self.assertSamePlanet(planet, self.planet)
+        planet.add_path(((1, 0), Direction.EAST), ((2, 0), Direction.WEST), 1)
+        journal.sync()
+        self.assertEqual(os.path.getsize(self.path), size + size // 7)
+
+    def test_compact(self):
+        """Check that the journal is replaced by a snapshot when too long."""
+        self.journal.close()
+        os.remove(self.path)
+        recorded = Planet()
+        journal = PlanetJournal(self.path, recorded, min_records=16)
+        self.addCleanup(journal.close)
+        self.fill(recorded)
+        for weight in range(1, 21):
+            recorded.add_path(
+                ((1, 1), Direction.NORTH), ((1, 2), Direction.SOUTH), weight,
+            )
+        # Compacted at 20 records to 8 path ends and 2 nodes, followed by
+        # the remaining 7 records.
+        self.assertEqual(journal.records, 17)
+        journal.sync()
+        self.assertEqual(os.path.getsize(self.path) // journal.records, 25)
+        planet = Planet()
+        replayed = PlanetJournal(self.path, planet)
+        self.addCleanup(replayed.close)
+        self.assertSamePlanet(planet, recorded)
+
+    def test_compact_last_record(self):
+        """Check that the change triggering compaction is kept."""
+        self.journal.close()
+        os.remove(self.path)
+        recorded = Planet()
+        journal = PlanetJournal(
+            self.path, recorded, compact_ratio=1.0, min_records=1,
+        )
+        self.addCleanup(journal.close)
+        recorded.add_path(((1, 0), Direction.EAST), ((2, 0), Direction.WEST), 1)
+        recorded.set_available_node_directions((1, 0), {Direction.EAST})
+        journal.close()
+        planet = Planet()
+        replayed = PlanetJournal(self.path, planet)
+        self.addCleanup(replayed.close)
+        self.assertSamePlanet(planet, recorded)
+        self.assertIn(Direction.WEST, planet.get_paths()[2, 0])
+        self.assertEqual(planet.get_node_directions(), {(1, 0): {Direction.EAST}})
+
+    def test_merge(self):
+        """Check that path ends dropped when merging are replayed."""
+        self.planet.add_path(((0, 0), Direction.NORTH), ((0, 1), Direction.SOUTH), 2)
+        other = Planet()
+        other.add_path(((0, 0), Direction.NORTH), ((1, 1), Direction.WEST), 3)
+        self.planet.merge(other)
+        self.journal.close()
+        planet = Planet()
+        journal = PlanetJournal(self.path, planet)
+        self.addCleanup(journal.close)
+        self.assertEqual(planet.get_paths(), other.get_paths())
+        self.assertEqual(planet.frontier, other.frontier)
+
+    def test_unknown_record(self):
+        """Check that foreign files are not taken for journals."""
+        self.journal.close()
+        with open(self.path, "wb") as file:
+            file.write(bytes(range(100)))
+        with self.assertRaises(ValueError):
+            PlanetJournal(self.path, Planet())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from node_keys import NodeKeys
+from planet import CompactPlanet, Direction, Planet
+
+
+class TestNodeKeys(unittest.TestCase):
+    """Test the canonical node tuples."""
+
+    def test_canonical(self):
+        """Check that equal coordinates give the same object."""
+        node_keys = NodeKeys()
+        x = 1000
+        node = node_keys.node_key(x, -x)
+        self.assertEqual(node, (1000, -1000))
+        self.assertIs(node_keys.node_key(x, -x), node)
+        self.assertIs(node_keys.intern((x, -x)), node)
+        self.assertEqual(len(node_keys), 1)
+        # Each table has its own tuples.
+        self.assertIsNot(NodeKeys().node_key(x, -x), node)
+
+    def test_planet(self):
+        """Check that the planet stores canonical nodes only."""
+        for planet_class in (Planet, CompactPlanet):
+            planet = planet_class()
+            node_keys = planet.node_keys
+            x = 2000
+            planet.add_path(
+                ((x, 0), Direction.NORTH), ((x, 1), Direction.SOUTH), 1,
+            )
+            planet.set_available_node_directions((x, 1), {Direction.SOUTH})
+            paths = planet.get_paths()
+            for node in paths:
+                self.assertIs(node, node_keys.intern(node))
+            self.assertIs(
+                paths[node_keys.node_key(x, 0)][Direction.NORTH][0],
+                node_keys.node_key(x, 1),
+            )
+            (node,) = planet.get_node_directions()
+            self.assertIs(node, node_keys.node_key(x, 1))
+            self.assertEqual(len(node_keys), 2)
+
+    def test_copy(self):
+        """Check that copies know the canonical nodes of their planet."""
+        planet = Planet()
+        planet.add_path(((0, 0), Direction.NORTH), ((0, 1), Direction.SOUTH), 1)
+        copy = planet.copy()
+        self.assertIsNot(copy.node_keys, planet.node_keys)
+        for node in planet.get_paths():
+            self.assertIs(copy.node_keys.intern((node[0], node[1])), node)
+
+
+if __name__ == "__main__":
+    unittest.main()
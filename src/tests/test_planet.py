@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 
+import random
+import tracemalloc
 import unittest
 
-from planet import Direction, Planet
+from planet import CompactPlanet, Direction, PathEngine, PathUpdateCounts, Planet
 
 
 class ExampleTestPlanet(unittest.TestCase):
@@ -44,6 +46,9 @@ class ExampleTestPlanet(unittest.TestCase):
 class TestRoboLabPlanet(unittest.TestCase):
     """Test `Planet` data structure and shortest path algorithm."""
 
+    # The `Planet` implementation tested.
+    planet_class = Planet
+
     def setUp(self):
         """Instantiate planet data structure and fill it with paths.
 
@@ -64,7 +69,7 @@ class TestRoboLabPlanet(unittest.TestCase):
         # Set to see full dictionary diffs.
         self.maxDiff = None
         # Initialize your data structure here.
-        self.planet = Planet()
+        self.planet = self.planet_class()
         self.planet.add_path(((0, 0), Direction.NORTH), ((0, 2), Direction.SOUTH), 2)
         self.planet.add_path(((0, 0), Direction.EAST),  ((3, 0), Direction.WEST),  3)
         self.planet.add_path(((0, 0), Direction.SOUTH), ((0,-1), Direction.NORTH), 1)
@@ -286,6 +291,616 @@ class TestRoboLabPlanet(unittest.TestCase):
         self.assertIsNone(self.planet.shortest_path((6, -1), (5, -1)))
         self.assertIsNone(self.planet.shortest_path((0, 0), (7, 0)))
 
+    def test_generation(self):
+        """Check that only actual changes of the map count as new generation."""
+        generation = self.planet.generation
+        self.planet.add_path(((0, 0), Direction.NORTH), ((0, 2), Direction.SOUTH), 2)
+        self.planet.set_available_node_directions((5, 1), {Direction.WEST})
+        self.planet.set_available_node_directions((5, 1), {Direction.WEST})
+        self.assertEqual(self.planet.generation, generation + 1)
+        self.planet.add_path(((0, 0), Direction.NORTH), ((0, 2), Direction.SOUTH), 3)
+        self.assertGreater(self.planet.generation, generation + 1)
+
+    def test_cached_path_updated(self):
+        """Check that cached shortest paths are not used after map changes."""
+        path = [
+            ((2, 2), Direction.SOUTH),
+            ((2, 1), Direction.SOUTH),
+        ]
+        self.assertEqual(self.planet.shortest_path((2, 2), (3, 0)), path)
+        # Cached result stays the same.
+        self.assertEqual(self.planet.shortest_path((2, 2), (3, 0)), path)
+        # Nodes settled on the way are answered from the cached tree.
+        self.assertEqual(
+            self.planet.shortest_path((2, 2), (2, 1)),
+            [((2, 2), Direction.SOUTH)],
+        )
+        self.planet.add_path(((2, 1), Direction.SOUTH), ((3, 0), Direction.NORTH), -1)
+        self.assertEqual(self.planet.shortest_path((2, 2), (3, 0)), [
+            ((2, 2), Direction.WEST),
+            ((0, 2), Direction.SOUTH),
+            ((0, 0), Direction.EAST),
+        ])
+
+    def test_cached_exploration_updated(self):
+        """Check that cached exploration results follow newly scanned nodes."""
+        self.assertEqual(self.planet._shortest_path((5, 1)), [])
+        self.planet.set_available_node_directions((5, 1), {Direction.WEST})
+        self.assertEqual(
+            self.planet._shortest_path((5, 1)),
+            [((5, 1), Direction.WEST)],
+        )
+
+    def test_frontier(self):
+        """Check that the frontier follows explored nodes."""
+        self.assertEqual(self.planet.frontier, set(self.planet.get_paths()))
+        self.planet.set_available_node_directions((5, 1), {Direction.WEST})
+        self.assertNotIn((5, 1), self.planet.frontier)
+        self.planet.set_available_node_directions(
+            (5, 1), {Direction.WEST, Direction.NORTH},
+        )
+        self.assertIn((5, 1), self.planet.frontier)
+        self.planet.add_path(((5, 1), Direction.NORTH), ((4, 2), Direction.NORTH), 3)
+        self.assertNotIn((5, 1), self.planet.frontier)
+
+    def test_unexplored_directions(self):
+        """Check that paths the scan missed do not count as explored."""
+        # Paths at (5, 1) lead north (just added) and west.
+        self.planet.add_path(((5, 1), Direction.NORTH), ((4, 2), Direction.NORTH), 3)
+        self.planet.set_available_node_directions(
+            (5, 1), {Direction.EAST, Direction.WEST},
+        )
+        self.assertEqual(self.planet.unexplored_directions((5, 1)), [Direction.EAST])
+        self.assertIn((5, 1), self.planet.frontier)
+        self.assertEqual(self.planet.next_direction((5, 1)), Direction.EAST)
+        self.planet.set_available_node_directions((5, 1), {Direction.WEST})
+        self.assertEqual(self.planet.unexplored_directions((5, 1)), [])
+        self.assertNotIn((5, 1), self.planet.frontier)
+
+    def test_exploration_completed(self):
+        """Check that exploration only considers the reachable nodes."""
+        self.assertFalse(self.planet.exploration_completed((6, -1)))
+        for node, paths in self.planet.get_paths().items():
+            if node[0] >= 6:
+                self.planet.set_available_node_directions(node, set(paths))
+        self.assertTrue(self.planet.exploration_completed((6, -1)))
+        self.assertIsNone(self.planet.next_direction((6, -1)))
+        self.assertFalse(self.planet.exploration_completed((0, 0)))
+        self.planet.set_available_node_directions(
+            (0, 0), {Direction.NORTH, Direction.EAST, Direction.SOUTH},
+        )
+        self.assertEqual(self.planet.next_direction((0, 0)), Direction.SOUTH)
+
+    def test_add_paths(self):
+        """Check that adding paths at once reports their effect."""
+        counts = self.planet.add_paths([
+            (((0, 0), Direction.NORTH), ((0, 2), Direction.SOUTH), 2),
+            (((0, 0), Direction.EAST), ((3, 0), Direction.WEST), 4),
+            (((5, 1), Direction.NORTH), ((4, 2), Direction.NORTH), 3),
+            (((5, 1), Direction.EAST), ((5, 1), Direction.SOUTH), -1),
+        ])
+        self.assertEqual((counts.new, counts.changed, counts.unchanged), (2, 1, 1))
+        self.assertEqual(
+            self.planet.get_paths()[(0, 0)][Direction.EAST],
+            ((3, 0), Direction.WEST, 4),
+        )
+
+    def test_batch(self):
+        """Check that derived data is updated at the end of a batch."""
+        with self.planet.batch() as counts:
+            self.planet.set_available_node_directions((5, 1), {Direction.WEST})
+            self.planet.add_path(((2, 1), Direction.SOUTH), ((3, 0), Direction.NORTH), -1)
+            with self.planet.batch():
+                self.planet.add_path(((2, 1), Direction.SOUTH), ((3, 0), Direction.NORTH), 2)
+            self.assertIn((5, 1), self.planet.frontier)
+        self.assertEqual((counts.new, counts.changed, counts.unchanged), (0, 2, 0))
+        self.assertNotIn((5, 1), self.planet.frontier)
+        self.assertEqual(
+            self.planet.shortest_path((2, 2), (3, 0)),
+            [((2, 2), Direction.SOUTH), ((2, 1), Direction.SOUTH)],
+        )
+        self.planet.add_paths([
+            (((2, 1), Direction.SOUTH), ((3, 0), Direction.NORTH), -1),
+        ])
+        self.assertEqual(
+            self.planet.shortest_path((2, 2), (3, 0)),
+            [((2, 2), Direction.WEST), ((0, 2), Direction.SOUTH), ((0, 0), Direction.EAST)],
+        )
+
+    def test_batch_queries(self):
+        """Check that paths added during a batch are found in it."""
+        with self.planet.batch():
+            self.planet.add_path(((7, 0), Direction.NORTH), ((5, 1), Direction.EAST), 1)
+            self.assertTrue(self.planet.connected((6, 0), (2, 2)))
+            self.assertEqual(
+                self.planet.shortest_path((6, 0), (5, 1)),
+                [((6, 0), Direction.EAST), ((7, 0), Direction.NORTH)],
+            )
+
+    def test_distances_from(self):
+        """Check the shortest paths from a node to all others."""
+        distances = self.planet.distances_from((6, 0))
+        self.assertEqual(distances, {
+            (6, 0): (0, None, None),
+            (6, -1): (1, (6, 0), Direction.SOUTH),
+            (7, 0): (1, (6, 0), Direction.EAST),
+        })
+        distances = self.planet.distances_from((0, -1))
+        self.assertEqual(len(distances), 11)
+        self.assertEqual(distances[(5, -1)], (7, (5, 0), Direction.SOUTH))
+        self.assertEqual(distances[(4, 1)][0], 8)
+        self.assertEqual(self.planet.distances_from((-2, 0)), {})
+
+    def test_nearest_of(self):
+        """Check finding the nearest of multiple targets."""
+        self.assertEqual(
+            self.planet.nearest_of((0, 0), [(5, 1), (5, -1), (2, 2)]),
+            ((2, 2), [((0, 0), Direction.NORTH), ((0, 2), Direction.EAST)]),
+        )
+        self.assertEqual(
+            self.planet.nearest_of((0, 0), {(0, 0), (2, 2)}),
+            ((0, 0), []),
+        )
+        self.assertIsNone(self.planet.nearest_of((0, 0), [(7, 0), (8, 8)]))
+        # Same results with all distances known.
+        self.planet.distances_from((0, 0))
+        self.assertEqual(
+            self.planet.nearest_of((0, 0), [(5, 1), (5, -1), (2, 2)]),
+            ((2, 2), [((0, 0), Direction.NORTH), ((0, 2), Direction.EAST)]),
+        )
+
+    def test_connected(self):
+        """Check which nodes are known to be connected."""
+        self.assertTrue(self.planet.connected((0, -1), (5, -1)))
+        self.assertTrue(self.planet.connected((7, 0), (6, -1)))
+        self.assertFalse(self.planet.connected((0, 0), (7, 0)))
+        self.assertFalse(self.planet.connected((0, 0), (8, 8)))
+        self.planet.add_path(((5, 0), Direction.SOUTH), ((5, -1), Direction.NORTH), -1)
+        self.assertFalse(self.planet.connected((0, -1), (5, -1)))
+        self.planet.add_path(((0, -1), Direction.EAST), ((5, -1), Direction.WEST), 4)
+        self.assertTrue(self.planet.connected((0, -1), (5, -1)))
+
+    def test_route(self):
+        """Check that turns are only taken into account with turn costs."""
+        self.assertEqual(
+            self.planet.route((0, 0), (2, 2), Direction.SOUTH),
+            self.planet.shortest_path((0, 0), (2, 2)),
+        )
+        self.planet.turn_costs = {90: 1, 180: 10, 270: 1}
+        self.assertEqual(
+            self.planet.route((0, 0), (2, 2)),
+            self.planet.shortest_path((0, 0), (2, 2)),
+        )
+        # Turning around costs more than the longer way.
+        self.assertEqual(
+            self.planet.route((0, 0), (2, 2), Direction.SOUTH),
+            [
+                ((0, 0), Direction.EAST),
+                ((3, 0), Direction.NORTH),
+                ((2, 1), Direction.NORTH),
+            ],
+        )
+        self.assertEqual(
+            self.planet.route((0, 0), (2, 2), Direction.NORTH),
+            [((0, 0), Direction.NORTH), ((0, 2), Direction.EAST)],
+        )
+        self.assertEqual(self.planet.route((0, 0), (0, 0), Direction.NORTH), [])
+        self.assertIsNone(self.planet.route((0, 0), (7, 0), Direction.NORTH))
+        self.assertEqual(
+            self.planet.next_direction((0, 0), (2, 2), Direction.SOUTH),
+            Direction.EAST,
+        )
+
+    def test_next_direction_turn_costs(self):
+        """Check that the unexplored direction turned to fastest is chosen."""
+        self.planet.turn_costs = {90: 2, 180: 5, 270: 1}
+        self.planet.set_available_node_directions((7, 0), set(Direction))
+        self.assertEqual(
+            self.planet.next_direction((7, 0), heading=Direction.SOUTH),
+            Direction.EAST,
+        )
+        self.assertEqual(
+            self.planet.next_direction((7, 0), heading=Direction.WEST),
+            Direction.NORTH,
+        )
+
+    def test_drive_times(self):
+        """Check recording drive times and routing by them."""
+        self.assertIsNone(self.planet.drive_time(((0, 0), Direction.NORTH)))
+        self.planet.record_drive_time(((0, 0), Direction.NORTH), 19.0)
+        self.planet.record_drive_time(((0, 0), Direction.NORTH), 21.0)
+        self.planet.record_drive_time(((0, 0), Direction.EAST), 3.0)
+        self.planet.record_drive_time(((3, 0), Direction.NORTH), 2.0)
+        # Unknown paths are ignored.
+        self.planet.record_drive_time(((8, 8), Direction.NORTH), 1.0)
+        self.assertIsNone(self.planet.drive_time(((8, 8), Direction.NORTH)))
+        self.assertEqual(self.planet.drive_time(((0, 0), Direction.NORTH)), 20.0)
+        self.assertIsNone(self.planet.drive_time(((0, 2), Direction.SOUTH)))
+        self.assertAlmostEqual(self.planet.seconds_weight(), 7 / 25)
+
+        # Drive times are not used by default.
+        self.assertEqual(self.planet.path_cost(((0, 0), Direction.NORTH)), 2)
+        self.assertEqual(
+            self.planet.route((0, 0), (2, 2)),
+            [((0, 0), Direction.NORTH), ((0, 2), Direction.EAST)],
+        )
+        self.planet.drive_time_share = 0.5
+        self.assertAlmostEqual(
+            self.planet.path_cost(((0, 0), Direction.NORTH)), 1 + 10 * 7 / 25,
+        )
+        # Falls back to the weight without observations.
+        self.assertEqual(self.planet.path_cost(((0, 2), Direction.EAST)), 2)
+        self.planet.drive_time_share = 1.0
+        self.assertEqual(
+            self.planet.route((0, 0), (2, 2)),
+            [
+                ((0, 0), Direction.EAST),
+                ((3, 0), Direction.NORTH),
+                ((2, 1), Direction.NORTH),
+            ],
+        )
+        # The shortest path by weight is not affected.
+        self.assertEqual(
+            self.planet.shortest_path((0, 0), (2, 2)),
+            [((0, 0), Direction.NORTH), ((0, 2), Direction.EAST)],
+        )
+
+        # Observations are kept on weight changes only.
+        self.planet.add_path(((0, 0), Direction.NORTH), ((0, 2), Direction.SOUTH), 3)
+        self.assertEqual(self.planet.drive_time(((0, 0), Direction.NORTH)), 20.0)
+        self.planet.add_path(((0, 0), Direction.NORTH), ((2, 2), Direction.WEST), 3)
+        self.assertIsNone(self.planet.drive_time(((0, 0), Direction.NORTH)))
+
+    def test_merge(self):
+        """Check merging the map of another robot."""
+        other = self.planet_class()
+        other.add_path(((0, 0), Direction.NORTH), ((0, 2), Direction.SOUTH), 5)
+        other.add_path(((5, 0), Direction.SOUTH), ((5, -1), Direction.NORTH), -1)
+        other.add_path(((2, 1), Direction.EAST), ((4, 1), Direction.WEST), 1)
+        other.add_path(((7, 0), Direction.NORTH), ((7, 1), Direction.SOUTH), 4)
+        other.set_available_node_directions((7, 1), {Direction.SOUTH})
+        self.planet.set_available_node_directions((7, 1), {Direction.EAST})
+        merged = self.planet_class()
+        merged.merge(self.planet)
+        merged.merge(other)
+
+        self.assertEqual(
+            self.planet.merge(other),
+            PathUpdateCounts(new=1, changed=2, unchanged=1),
+        )
+        paths = self.planet.get_paths()
+        self.assertEqual(paths[(0, 0)][Direction.NORTH], ((0, 2), Direction.SOUTH, 5))
+        self.assertEqual(paths[(5, -1)][Direction.NORTH], ((5, 0), Direction.SOUTH, -1))
+        self.assertEqual(paths[(2, 1)][Direction.EAST], ((4, 1), Direction.WEST, 2))
+        self.assertEqual(paths[(7, 1)][Direction.SOUTH], ((7, 0), Direction.NORTH, 4))
+        # The directions scanned at a node are united.
+        self.assertEqual(
+            self.planet.unexplored_directions((7, 1)), [Direction.EAST],
+        )
+
+        # The same map in the other order.
+        other.merge(self.planet)
+        self.assertEqual(other.get_paths(), self.planet.get_paths())
+        self.assertEqual(merged.get_paths(), self.planet.get_paths())
+        self.assertEqual(merged.frontier, self.planet.frontier)
+
+    def test_merge_conflicting_ends(self):
+        """Check merging paths leading to different ends in both orders."""
+        first = self.planet_class()
+        first.add_path(((0, 0), Direction.NORTH), ((0, 1), Direction.SOUTH), 2)
+        second = self.planet_class()
+        second.add_path(((0, 0), Direction.NORTH), ((1, 1), Direction.WEST), 3)
+        merged = []
+        for planets in ((first, second), (second, first)):
+            planet = self.planet_class()
+            for other in planets:
+                planet.merge(other)
+            merged.append(planet)
+        for planet in merged:
+            # The heavier path wins, the other one is dropped at both ends.
+            self.assertEqual(planet.get_paths(), second.get_paths())
+            self.assertEqual(planet.frontier, {(0, 0), (1, 1)})
+            self.assertIsNone(planet.shortest_path((0, 0), (0, 1)))
+        first.merge(second)
+        self.assertEqual(first.get_paths(), second.get_paths())
+        self.assertEqual(first.frontier, second.frontier)
+
+    def test_connected_like_search(self):
+        """Check connections and exploration against searches on random maps."""
+        rng = random.Random(102)
+        nodes = [(x, y) for x in range(5) for y in range(5)]
+        ends = [(node, direction) for node in nodes for direction in Direction]
+        rng.shuffle(ends)
+        paths = list(zip(ends[::2], ends[1::2]))[:30]
+        planet = self.planet_class()
+        for _ in range(60):
+            start, end = rng.choice(paths)
+            planet.add_path(start, end, rng.choice([-1, 1, 2]))
+            node = rng.choice(nodes)
+            planet.set_available_node_directions(
+                node, set(rng.sample(list(Direction), rng.randint(1, 4))),
+            )
+            for node in planet.get_paths():
+                _, goal = planet._heap_search(
+                    node, planet.frontier.__contains__,
+                )
+                self.assertEqual(
+                    planet.exploration_completed(node), goal is None,
+                )
+                for other in planet.get_paths():
+                    self.assertEqual(
+                        planet.connected(node, other),
+                        other in planet.distances_from(node),
+                    )
+
+
+class TestRoboLabPlanetHeapEngine(TestRoboLabPlanet):
+    """Run the shortest path tests with the heap based engine."""
+
+    def setUp(self):
+        """Use the planet from `TestRoboLabPlanet` with another engine."""
+        super().setUp()
+        self.planet.engine = PathEngine.HEAP
+
+    def test_same_as_scan_engine(self):
+        """Check that both engines choose exactly the same paths."""
+        nodes = list(self.planet.get_paths())
+        scan_planet = Planet()
+        for node, paths in self.planet.get_paths().items():
+            for direction, (neighbor, neighbor_direction, weight) in paths.items():
+                scan_planet.add_path(
+                    (node, direction), (neighbor, neighbor_direction), weight
+                )
+        scan_planet.set_available_node_directions((0, 0), set(Direction))
+        self.planet.set_available_node_directions((0, 0), set(Direction))
+
+        for start in nodes:
+            self.assertEqual(
+                self.planet._shortest_path(start),
+                scan_planet._shortest_path(start),
+            )
+            for target in nodes:
+                self.assertEqual(
+                    self.planet.shortest_path(start, target),
+                    scan_planet.shortest_path(start, target),
+                )
+
+
+class TestRoboLabPlanetDynamicEngine(TestRoboLabPlanet):
+    """Run the shortest path tests with the dynamically updated engine."""
+
+    def setUp(self):
+        """Use the planet from `TestRoboLabPlanet` with another engine."""
+        super().setUp()
+        self.planet.engine = PathEngine.DYNAMIC
+
+    @staticmethod
+    def path_weight(planet, path):
+        """Return the sum of weights along `path` on `planet`."""
+        return None if path is None else sum(
+            planet.get_paths()[node][direction][2] for node, direction in path
+        )
+
+    def test_updates_like_new_search(self):
+        """Check that repaired paths weigh as much as newly searched ones."""
+        rng = random.Random(102)
+        nodes = [(x, y) for x in range(5) for y in range(5)]
+        # Pair up the directions at the nodes to paths, using each only once,
+        # so the map stays consistent when paths are added again.
+        ends = [(node, direction) for node in nodes for direction in Direction]
+        rng.shuffle(ends)
+        paths = list(zip(ends[::2], ends[1::2]))[:40]
+        dynamic_planet = Planet()
+        dynamic_planet.engine = PathEngine.DYNAMIC
+        scan_planet = Planet()
+        for _ in range(200):
+            start, end = rng.choice(paths)
+            weight = rng.choice([-1, 1, 2, 3, 5, 8])
+            dynamic_planet.add_path(start, end, weight)
+            scan_planet.add_path(start, end, weight)
+            target = nodes[0]
+            for node in scan_planet.get_paths():
+                if target not in scan_planet.get_paths():
+                    break
+                self.assertEqual(
+                    self.path_weight(
+                        dynamic_planet,
+                        dynamic_planet.shortest_path(node, target),
+                    ),
+                    self.path_weight(
+                        scan_planet,
+                        scan_planet.shortest_path(node, target),
+                    ),
+                )
+
+
+class TestRoboLabPlanetAStarEngine(TestRoboLabPlanet):
+    """Run the shortest path tests with the A* engine."""
+
+    def setUp(self):
+        """Use the planet from `TestRoboLabPlanet` with another engine."""
+        super().setUp()
+        self.planet.engine = PathEngine.ASTAR
+
+    def test_heuristic(self):
+        """Check that the heuristic follows the lightest path per grid unit."""
+        self.assertEqual(Planet().heuristic((0, 0), (4, 1)), 0)
+        self.assertEqual(self.planet.heuristic((0, 0), (4, 1)), 5)
+        self.assertEqual(self.planet.heuristic((4, 1), (4, 1)), 0)
+        self.planet.add_path(((5, 1), Direction.NORTH), ((4, 2), Direction.NORTH), 1)
+        self.assertEqual(self.planet.heuristic((0, 0), (4, 1)), 2)
+        # Heavier paths keep the bound.
+        self.planet.add_path(((5, 1), Direction.NORTH), ((4, 2), Direction.NORTH), 9)
+        self.assertEqual(self.planet.heuristic((0, 0), (4, 1)), 2)
+
+    def test_fewer_nodes_searched(self):
+        """Check that nodes away from the target are not searched."""
+        shortest_paths, goal = self.planet._astar_search((0, -1), (5, 0))
+        self.assertEqual(goal, (5, 0))
+        self.assertNotIn((0, 2), shortest_paths)
+        shortest_paths, goal = self.planet._heap_search(
+            (0, -1), lambda node: node == (5, 0),
+        )
+        self.assertIn((0, 2), shortest_paths)
+
+
+class TestRoboLabPlanetBidirectionalEngine(TestRoboLabPlanet):
+    """Run the shortest path tests with the bidirectional engine."""
+
+    def setUp(self):
+        """Use the planet from `TestRoboLabPlanet` with another engine."""
+        super().setUp()
+        self.planet.engine = PathEngine.BIDIRECTIONAL
+
+    def test_adjacent_nodes(self):
+        """Check paths where both searches meet right away."""
+        self.assertEqual(
+            self.planet.shortest_path((0, 0), (0, -1)),
+            [((0, 0), Direction.SOUTH)],
+        )
+        self.assertEqual(
+            self.planet.shortest_path((6, 0), (6, -1)),
+            [((6, 0), Direction.SOUTH)],
+        )
+
+
+class TestRoboLabCompactPlanet(TestRoboLabPlanet):
+    """Run the planet tests with the compact path storage."""
+
+    planet_class = CompactPlanet
+
+    @staticmethod
+    def build_grid(planet, size):
+        """Add a grid of `size` times `size` nodes to `planet`."""
+        for x in range(size):
+            for y in range(size):
+                if x + 1 < size:
+                    planet.add_path(
+                        ((x, y), Direction.EAST), ((x + 1, y), Direction.WEST), 1,
+                    )
+                if y + 1 < size:
+                    planet.add_path(
+                        ((x, y), Direction.NORTH), ((x, y + 1), Direction.SOUTH), 2,
+                    )
+
+    def test_same_as_planet(self):
+        """Check that the compact storage contains the same paths."""
+        planet = Planet()
+        compact_planet = CompactPlanet()
+        self.build_grid(planet, 8)
+        self.build_grid(compact_planet, 8)
+        self.assertEqual(compact_planet.get_paths(), planet.get_paths())
+        self.assertEqual(
+            compact_planet.shortest_path((0, 0), (7, 7)),
+            planet.shortest_path((0, 0), (7, 7)),
+        )
+
+    def test_get_paths_rebuilt(self):
+        """Check that `get_paths` is only rebuilt after changes."""
+        paths = self.planet.get_paths()
+        self.assertIs(self.planet.get_paths(), paths)
+        self.planet.add_path(((5, 1), Direction.NORTH), ((4, 2), Direction.NORTH), 3)
+        self.assertIn(Direction.NORTH, self.planet.get_paths()[(5, 1)])
+
+    def test_memory(self):
+        """Check that the compact storage needs much less memory."""
+        sizes = []
+        for planet_class in (Planet, CompactPlanet):
+            tracemalloc.start()
+            planet = planet_class()
+            self.build_grid(planet, 40)
+            sizes.append(tracemalloc.get_traced_memory()[0])
+            tracemalloc.stop()
+            del planet
+        self.assertLess(sizes[1], sizes[0] / 2)
+
+
+class TestRoboLabPlanetHierarchy(unittest.TestCase):
+    """Test target queries answered by a contraction hierarchy."""
+
+    def setUp(self):
+        """Build a fully explored random grid planet."""
+        rng = random.Random(102)
+        self.nodes = [(x, y) for x in range(12) for y in range(12)]
+        self.planet = Planet()
+        self.planet.hierarchy_min_nodes = 100
+        # The same map searched without a hierarchy.
+        self.search_planet = Planet()
+        self.search_planet.hierarchy_min_nodes = None
+        for x, y in self.nodes:
+            for start, end in (
+                (((x, y), Direction.EAST), ((x + 1, y), Direction.WEST)),
+                (((x, y), Direction.NORTH), ((x, y + 1), Direction.SOUTH)),
+            ):
+                if end[0] in self.nodes:
+                    weight = rng.choice([-1, 1, 2, 3, 5, 8])
+                    self.planet.add_path(start, end, weight)
+                    self.search_planet.add_path(start, end, weight)
+        for planet in (self.planet, self.search_planet):
+            for node in self.nodes:
+                planet.set_available_node_directions(
+                    node, set(planet.get_paths()[node]),
+                )
+
+    def path_weight(self, path, start, target):
+        """Return the weight of `path`, checking it leads from `start` to `target`."""
+        if path is None:
+            return None
+        weight = 0
+        node = start
+        for path_node, direction in path:
+            self.assertEqual(path_node, node)
+            node, _, path_weight = self.planet.get_paths()[node][direction]
+            self.assertNotEqual(path_weight, -1)
+            weight += path_weight
+        self.assertEqual(node, target)
+        return weight
+
+    def test_same_weights_as_search(self):
+        """Check that all shortest paths weigh as much as searched ones."""
+        self.assertTrue(self.planet.exploration_completed((0, 0)))
+        for start in self.nodes[::7]:
+            for target in self.nodes:
+                self.assertEqual(
+                    self.path_weight(
+                        self.planet.shortest_path(start, target), start, target,
+                    ),
+                    self.path_weight(
+                        self.search_planet.shortest_path(start, target),
+                        start,
+                        target,
+                    ),
+                )
+        self.assertIsNotNone(self.planet._hierarchy)
+        self.assertEqual(self.planet.shortest_path((0, 0), (0, 0)), [])
+        self.assertIsNone(self.planet.shortest_path((0, 0), (20, 20)))
+
+    def test_built_and_dropped(self):
+        """Check that the hierarchy only exists for a fully known map."""
+        self.planet.set_available_node_directions((0, 0), set(Direction))
+        self.planet.shortest_path((0, 0), (11, 11))
+        self.assertIsNone(self.planet._hierarchy)
+        self.planet.set_available_node_directions(
+            (0, 0), set(self.planet.get_paths()[(0, 0)]),
+        )
+        self.planet.shortest_path((0, 0), (11, 11))
+        self.assertIsNotNone(self.planet._hierarchy)
+        # Adding known paths again keeps it.
+        east = self.planet.get_paths()[(0, 0)][Direction.EAST]
+        self.planet.add_path(((0, 0), Direction.EAST), east[:2], east[2])
+        self.assertIsNotNone(self.planet._hierarchy)
+        self.planet.add_path(((0, 0), Direction.EAST), east[:2], east[2] + 1)
+        self.assertIsNone(self.planet._hierarchy)
+        # Not built from the outdated frontier of a batch.
+        with self.planet.batch():
+            self.planet.shortest_path((0, 0), (11, 11))
+            self.assertIsNone(self.planet._hierarchy)
+        self.planet.shortest_path((0, 0), (11, 11))
+        self.assertIsNotNone(self.planet._hierarchy)
+        # Only built if enabled.
+        self.assertIsNone(self.search_planet.hierarchy_min_nodes)
+        self.assertIsNone(Planet().hierarchy_min_nodes)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import tempfile
+import unittest
+import unittest.mock
+from collections import Counter
+
+from benchmark import OPERATIONS, main
+from planet import BLOCKED
+from planet_generator import generate_planet
+
+
+class TestGeneratePlanet(unittest.TestCase):
+    """Test the planets generated for benchmarks."""
+
+    def setUp(self):
+        self.synthetic = generate_planet(400, seed=3)
+        self.planet = self.synthetic.build()
+
+    def test_deterministic(self):
+        """Check that equal seeds give equal planets, others differ."""
+        self.assertEqual(generate_planet(400, seed=3), self.synthetic)
+        self.assertNotEqual(generate_planet(400, seed=4), self.synthetic)
+
+    def test_shape(self):
+        """Check the number of nodes and that each path end is used once."""
+        self.assertEqual(len(self.synthetic.nodes), 400)
+        ends = Counter(
+            end for start, target, _ in self.synthetic.paths
+            for end in (start, target)
+        )
+        self.assertEqual(max(ends.values()), 1)
+        self.assertTrue(any(
+            start[0] == target[0] for start, target, _ in self.synthetic.paths
+        ))
+        self.assertTrue(any(
+            weight == BLOCKED for _, _, weight in self.synthetic.paths
+        ))
+
+    def test_planet(self):
+        """Check that all nodes are reachable and some are unexplored."""
+        start = self.synthetic.start
+        self.assertIn(start, self.synthetic.node_directions)
+        self.assertTrue(self.planet.frontier)
+        self.assertLess(len(self.synthetic.node_directions), 400)
+        distances = self.planet.distances_from(start)
+        self.assertEqual(set(distances), set(self.synthetic.nodes))
+
+    def test_benchmark(self):
+        """Check the results written by the benchmark."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.json")
+            with open(os.devnull, "w") as devnull:
+                with unittest.mock.patch("sys.stdout", devnull):
+                    main([
+                        "--sizes", "10", "50", "--queries", "2", "--output", path,
+                    ])
+            with open(path) as file:
+                report = json.load(file)
+        self.assertEqual(
+            [result["nodes"] for result in report["results"]], [10, 50],
+        )
+        for result in report["results"]:
+            self.assertEqual(set(result["operations"]), set(OPERATIONS))
+            self.assertEqual(result["operations"]["shortest_path"]["calls"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
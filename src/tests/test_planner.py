@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+
+import unittest
+from time import monotonic
+
+from exploration import ExplorationPlanner
+from planet import BLOCKED, Direction, Planet
+from planet_generator import generate_planet
+from planner import (
+    BackgroundPlanner, departure_arrivals, odometry_arrivals, possible_directions,
+)
+
+
+class TestBackgroundPlanner(unittest.TestCase):
+    """Test planning the next direction while driving."""
+
+    def setUp(self):
+        """Explore a small planet, standing at (0, 0).
+
+            (0,1)--2--(1,1)
+              |         |
+              1         4
+              |         |
+            (0,0)--1--(1,0)
+        """
+        self.planet = Planet()
+        self.planet.add_path(((0, 0), Direction.NORTH), ((0, 1), Direction.SOUTH), 1)
+        self.planet.add_path(((0, 1), Direction.EAST), ((1, 1), Direction.WEST), 2)
+        self.planet.add_path(((0, 0), Direction.EAST), ((1, 0), Direction.WEST), 1)
+        self.planet.add_path(((1, 0), Direction.NORTH), ((1, 1), Direction.SOUTH), 4)
+        for node, directions in (
+            ((0, 0), {Direction.NORTH, Direction.EAST}),
+            ((0, 1), {Direction.SOUTH, Direction.EAST}),
+            ((1, 1), {Direction.WEST, Direction.SOUTH}),
+        ):
+            self.planet.set_available_node_directions(node, directions)
+        self.explorer = ExplorationPlanner(self.planet)
+        self.planner = BackgroundPlanner(self.explorer)
+        self.addCleanup(self.planner.cancel)
+
+    def plan(self, start, target=None):
+        """Plan for driving from `start` and wait for all answers."""
+        self.planner.start(departure_arrivals(self.planet, start, target))
+        self.planner.join()
+
+    def test_departure_arrivals(self):
+        """Check the ways drives may end."""
+        start = ((0, 0), Direction.NORTH)
+        arrivals = departure_arrivals(self.planet, start, (1, 1))
+        self.assertEqual(
+            [(arrival.end, arrival.weight) for arrival in arrivals],
+            [(((0, 1), Direction.SOUTH), 1), (start, BLOCKED)],
+        )
+        self.assertEqual(arrivals[0].directions, {Direction.SOUTH, Direction.EAST})
+        self.assertEqual(arrivals[0].target, (1, 1))
+        # Not scanned yet.
+        self.assertEqual(
+            len(departure_arrivals(self.planet, ((0, 0), Direction.EAST))), 5,
+        )
+        self.assertEqual(
+            possible_directions(self.planet, (1, 0), Direction.WEST)[-1],
+            set(Direction),
+        )
+
+    def test_known_path(self):
+        """Check that driving a known path uses the planned direction."""
+        self.plan(((0, 0), Direction.NORTH), (1, 0))
+        self.planet.add_path(((0, 0), Direction.NORTH), ((0, 1), Direction.SOUTH), 1)
+        self.planet.set_available_node_directions(
+            (0, 1), {Direction.SOUTH, Direction.EAST},
+        )
+        answer = self.planner.lookup((0, 1), (1, 0))
+        self.assertIsNotNone(answer)
+        self.assertEqual(answer.direction, Direction.SOUTH)
+        self.assertEqual(
+            answer.direction, self.explorer.next_direction((0, 1), (1, 0)),
+        )
+        # Used up.
+        self.assertIsNone(self.planner.lookup((0, 1), (1, 0)))
+
+    def test_scanned_like_planned(self):
+        """Check answers for nodes scanned for the first time."""
+        self.plan(((0, 0), Direction.EAST))
+        self.planet.set_available_node_directions(
+            (1, 0), {Direction.WEST, Direction.NORTH, Direction.EAST},
+        )
+        answer = self.planner.lookup((1, 0))
+        self.assertIsNotNone(answer)
+        self.assertEqual(answer.direction, Direction.EAST)
+
+    def test_blocked(self):
+        """Check the answer when driving back from a blocked path."""
+        self.plan(((0, 0), Direction.NORTH), (0, 1))
+        self.planet.add_path(
+            ((0, 0), Direction.NORTH), ((0, 0), Direction.NORTH), BLOCKED,
+        )
+        answer = self.planner.lookup((0, 0), (0, 1))
+        self.assertEqual(answer.direction, Direction.EAST)
+
+    def test_mismatch(self):
+        """Check that answers are not used after other changes."""
+        self.plan(((0, 0), Direction.NORTH), (1, 1))
+        self.assertIsNone(self.planner.lookup((0, 1), (1, 0)))
+
+        self.plan(((0, 0), Direction.NORTH), (1, 1))
+        # Found another path on the way.
+        self.planet.add_path(((1, 0), Direction.EAST), ((2, 0), Direction.WEST), 1)
+        self.assertIsNone(self.planner.lookup((0, 1), (1, 1)))
+
+        self.plan(((0, 0), Direction.NORTH), (1, 1))
+        self.planet.set_available_node_directions((0, 1), set(Direction))
+        self.assertIsNone(self.planner.lookup((0, 1), (1, 1)))
+
+    def test_copies_used(self):
+        """Check that planning does not change the planet."""
+        generation = self.planet.generation
+        self.plan(((0, 0), Direction.EAST))
+        self.assertEqual(self.planet.generation, generation)
+        self.assertNotIn((1, 0), self.planet.get_node_directions())
+
+    def test_odometry_arrivals(self):
+        """Check the arrivals of unknown paths."""
+        start = ((1, 1), Direction.NORTH)
+        ends = [((1, 2), Direction.SOUTH), ((2, 2), Direction.SOUTH)]
+        arrivals = odometry_arrivals(self.planet, start, ends, (0, 0))
+        self.assertEqual(len(arrivals), 16)
+        self.assertEqual(arrivals[0].end, ends[0])
+        self.assertIsNone(arrivals[0].weight)
+        self.assertEqual(arrivals[0].target, (0, 0))
+        self.assertEqual(
+            odometry_arrivals(self.planet, ((0, 0), Direction.NORTH), ends), [],
+        )
+
+    def unknown_path(self, target=None):
+        """Plan for exploring north of (1, 1), found to lead to (1, 2)."""
+        self.planet.set_available_node_directions(
+            (1, 1), {Direction.WEST, Direction.SOUTH, Direction.NORTH},
+        )
+        start = ((1, 1), Direction.NORTH)
+        self.planner.start(departure_arrivals(self.planet, start, target))
+        self.planner.add(
+            odometry_arrivals(
+                self.planet,
+                start,
+                [((2, 2), Direction.SOUTH), ((1, 2), Direction.SOUTH)],
+                target,
+            )
+        )
+        self.planner.join()
+        self.planet.add_path(start, ((1, 2), Direction.SOUTH), 7)
+        self.planner.commit(start, ((1, 2), Direction.SOUTH))
+        self.planet.set_available_node_directions(
+            (1, 2), {Direction.SOUTH, Direction.EAST},
+        )
+
+    def test_unknown_path(self):
+        """Check answers for the nodes odometry suggested."""
+        self.unknown_path()
+        answer = self.planner.lookup((1, 2))
+        self.assertIsNotNone(answer)
+        self.assertEqual(answer.direction, Direction.EAST)
+
+    def test_unknown_path_weight_needed(self):
+        """Check that routes over paths of unknown weight are not planned."""
+        self.unknown_path((0, 0))
+        self.assertIsNone(self.planner.lookup((1, 2), (0, 0)))
+
+    def test_commit(self):
+        """Check that answers for other nodes are dropped."""
+        self.unknown_path()
+        self.assertTrue(all(
+            answer.arrival.end == ((1, 2), Direction.SOUTH)
+            for answer in self.planner._answers
+        ))
+        self.planner.add(
+            odometry_arrivals(
+                self.planet, ((0, 1), Direction.NORTH), [((0, 2), Direction.SOUTH)],
+            )
+        )
+        self.planner.join()
+        self.assertTrue(all(
+            answer.arrival.end == ((1, 2), Direction.SOUTH)
+            for answer in self.planner._answers
+        ))
+
+    def test_max_arrivals(self):
+        """Check that only the most likely arrivals are planned."""
+        self.planner.max_arrivals = 1
+        self.plan(((0, 0), Direction.NORTH))
+        (answer,) = self.planner._answers
+        self.assertEqual(answer.arrival.end, ((0, 1), Direction.SOUTH))
+
+    def test_time_budget(self):
+        """Check that planning on large planets keeps to the time budget."""
+        planet = generate_planet(4000, seed=1).build()
+        paths = planet.get_paths()
+        # An unknown path which may lead to several nodes not scanned
+        # yet, so all their directions are possible.
+        start = next(
+            (node, direction)
+            for node in paths
+            for direction in Direction
+            if direction not in paths[node]
+        )
+        ends = [
+            (node, next(
+                direction for direction in Direction
+                if direction not in paths[node]
+            ))
+            for node in paths
+            if node not in planet.get_node_directions() and len(paths[node]) == 1
+        ][:8]
+        planner = BackgroundPlanner(
+            ExplorationPlanner(planet, time_budget=0.05), time_budget=0.05,
+        )
+        self.addCleanup(planner.cancel)
+        arrivals = odometry_arrivals(planet, start, ends)
+        time = monotonic()
+        planner.start(arrivals)
+        planner.join()
+        # Some slack for the copies and searches of the last arrival.
+        self.assertLess(monotonic() - time, 0.5)
+        self.assertLess(len(planner._answers), len(arrivals))
+        self.assertGreater(len(planner._answers), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import unittest
+
+from planet import CompactPlanet, Direction, Planet
+from snapshot import PlanetSnapshot, save_snapshot
+
+
+class TestPlanetSnapshot(unittest.TestCase):
+    """Test writing planet snapshots and reading them mapped into memory."""
+
+    def setUp(self):
+        """Save a small planet to a snapshot in a temporary directory.
+
+            (0,1)--3--(1,1)
+              |
+              1
+              |
+            (0,0)   (5,-2)
+        """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "planet.snapshot")
+        self.planet = Planet()
+        self.planet.add_path(((0, 0), Direction.NORTH), ((0, 1), Direction.SOUTH), 1)
+        self.planet.add_path(((0, 1), Direction.EAST), ((1, 1), Direction.WEST), 3)
+        self.planet.add_path(((0, 0), Direction.EAST), ((0, 0), Direction.EAST), -1)
+        self.planet.set_available_node_directions(
+            (0, 0), {Direction.NORTH, Direction.EAST},
+        )
+        # Scanned, but no path known yet.
+        self.planet.set_available_node_directions((5, -2), {Direction.WEST})
+        save_snapshot(
+            self.path,
+            self.planet.get_paths(),
+            self.planet.get_node_directions(),
+        )
+        self.snapshot = PlanetSnapshot(self.path)
+        self.addCleanup(self.snapshot.close)
+
+    def test_mapping(self):
+        """Check that the snapshot reads like `get_paths`."""
+        self.assertEqual(dict(self.snapshot[(0, 1)]), self.planet.get_paths()[(0, 1)])
+        self.assertEqual(
+            self.snapshot[(0, 0)][Direction.EAST], ((0, 0), Direction.EAST, -1),
+        )
+        self.assertIn((1, 1), self.snapshot)
+        self.assertNotIn((5, -2), self.snapshot)
+        self.assertNotIn((2, 2), self.snapshot)
+        with self.assertRaises(KeyError):
+            self.snapshot[(5, -2)]
+        self.assertEqual(len(self.snapshot), 3)
+        self.assertEqual(self.snapshot.get_paths(), self.planet.get_paths())
+
+    def test_available_directions(self):
+        """Check the directions stored for scanned nodes."""
+        self.assertEqual(
+            self.snapshot.available_directions((0, 0)),
+            {Direction.NORTH, Direction.EAST},
+        )
+        self.assertEqual(
+            self.snapshot.available_directions((5, -2)), {Direction.WEST},
+        )
+        self.assertIsNone(self.snapshot.available_directions((1, 1)))
+        self.assertIsNone(self.snapshot.available_directions((2, 2)))
+        self.assertEqual(
+            self.snapshot.get_node_directions(),
+            self.planet.get_node_directions(),
+        )
+
+    def test_load(self):
+        """Check that loaded planets know the same as the saved one."""
+        for planet in (self.snapshot.load(), self.snapshot.load(CompactPlanet())):
+            self.assertEqual(planet.get_paths(), self.planet.get_paths())
+            self.assertEqual(
+                planet.get_node_directions(), self.planet.get_node_directions(),
+            )
+            self.assertEqual(planet.frontier, self.planet.frontier)
+            self.assertEqual(
+                planet.shortest_path((0, 0), (1, 1)),
+                self.planet.shortest_path((0, 0), (1, 1)),
+            )
+
+    def test_invalid(self):
+        """Check that other files are not taken for snapshots."""
+        path = self.path + ".other"
+        with open(path, "wb") as file:
+            file.write(bytes(100))
+        with self.assertRaises(ValueError):
+            PlanetSnapshot(path)
+
+    def test_truncated(self):
+        """Check that a snapshot cut off is rejected."""
+        with open(self.path, "rb") as file:
+            data = file.read()
+        for end in (len(data) - 1, 20):
+            path = self.path + ".truncated"
+            with open(path, "wb") as file:
+                file.write(data[:end])
+            with self.assertRaises(ValueError):
+                PlanetSnapshot(path)
+
+    def test_no_node_directions(self):
+        """Check that snapshots can be saved without scanned nodes."""
+        save_snapshot(self.path + ".paths", self.planet.get_paths())
+        with PlanetSnapshot(self.path + ".paths") as snapshot:
+            self.assertEqual(snapshot.get_node_directions(), {})
+            self.assertEqual(snapshot.get_paths(), self.planet.get_paths())
+
+
+if __name__ == "__main__":
+    unittest.main()